@@ -4,13 +4,14 @@ AI-Enhanced Molecular Biology Educational Query System
 Integrates LLMs for intelligent explanations and natural language queries
 """
 
-import json
 import sys
 import argparse
 import os
 from collections import defaultdict
 import requests
 
+from framework_snapshot import load_framework
+
 class AIBackend:
     """Base class for AI backends"""
     
@@ -142,14 +143,8 @@ class AIEnhancedQuery:
     def load_educational_data(self):
         """Load all educational framework data files"""
         try:
-            with open('educational_framework/concept_map.json', 'r') as f:
-                self.concept_map = json.load(f)
-            
-            with open('educational_framework/extracted_concepts.json', 'r') as f:
-                self.concepts_data = json.load(f)
-            
-            with open('educational_framework/lesson_templates.json', 'r') as f:
-                self.lesson_templates = json.load(f)
+            self.concept_map, self.concepts_data, self.lesson_templates = load_framework(
+                'concept_map', 'structures', 'lesson_templates')
             
             return True
         except FileNotFoundError as e:
@@ -281,36 +276,36 @@ class AIEnhancedQuery:
     
     def _explain_pdb_structure(self, pdb_id):
         """Explain a specific PDB structure with AI enhancement"""
-        for struct in self.concepts_data:
-            if struct.get('pdb_id') == pdb_id:
-                basic_info = f"""
+        struct = self.concepts_data.find(pdb_id)
+        if struct is not None:
+            basic_info = f"""
 🧬 PDB ID: {pdb_id}
 Title: {struct.get('title', 'N/A')}
 Complexity: {struct.get('complexity_level', 'N/A')}
 Concepts: {', '.join(struct.get('concepts', []))}
 """
-                
-                # Generate AI explanation
-                prompt = f"""
-                Explain this protein structure for students:
-                
-                PDB ID: {pdb_id}
-                Title: {struct.get('title', '')}
-                Biological concepts: {', '.join(struct.get('concepts', []))}
-                Complexity level: {struct.get('complexity_level', '')}
-                
-                Please explain:
-                1. What this protein does in living organisms
-                2. Why its structure is important
-                3. What students can learn from studying it
-                4. How they can explore it further
-                
-                Make it educational and engaging.
-                """
-                
-                ai_explanation = self.active_backend.generate_explanation(prompt)
-                
-                return basic_info + f"\n🤖 AI Explanation:\n{ai_explanation}"
+            
+            # Generate AI explanation
+            prompt = f"""
+            Explain this protein structure for students:
+            
+            PDB ID: {pdb_id}
+            Title: {struct.get('title', '')}
+            Biological concepts: {', '.join(struct.get('concepts', []))}
+            Complexity level: {struct.get('complexity_level', '')}
+            
+            Please explain:
+            1. What this protein does in living organisms
+            2. Why its structure is important
+            3. What students can learn from studying it
+            4. How they can explore it further
+            
+            Make it educational and engaging.
+            """
+            
+            ai_explanation = self.active_backend.generate_explanation(prompt)
+            
+            return basic_info + f"\n🤖 AI Explanation:\n{ai_explanation}"
         
         return f"❌ PDB ID {pdb_id} not found in dataset"
 
@@ -4,12 +4,13 @@ AI-Ready Molecular Biology Educational Query System
 Mock AI responses built-in, ready to connect to real AI APIs
 """
 
-import json
 import sys
 import argparse
 import os
 from collections import defaultdict
 
+from framework_snapshot import load_framework
+
 class MockAIBackend:
     """Mock AI backend with educational molecular biology responses"""
     
@@ -195,11 +196,7 @@ class AIReadyQuery:
     def load_educational_data(self):
         """Load educational framework data"""
         try:
-            with open('educational_framework/concept_map.json', 'r') as f:
-                self.concept_map = json.load(f)
-            
-            with open('educational_framework/extracted_concepts.json', 'r') as f:
-                self.concepts_data = json.load(f)
+            self.concept_map, self.concepts_data = load_framework('concept_map', 'structures')
             
             return True
         except FileNotFoundError as e:
@@ -244,9 +241,9 @@ class AIReadyQuery:
     
     def _explain_pdb_structure(self, pdb_id):
         """Explain specific PDB structure with AI enhancement"""
-        for struct in self.concepts_data:
-            if struct.get('pdb_id') == pdb_id:
-                basic_info = f"""
+        struct = self.concepts_data.find(pdb_id)
+        if struct is not None:
+            basic_info = f"""
 🧬 PDB ID: {pdb_id}
 📖 Title: {struct.get('title', 'N/A')}
 📚 Complexity: {struct.get('complexity_level', 'N/A')}
@@ -255,14 +252,14 @@ class AIReadyQuery:
 
 📝 Learning Objectives:
 """
-                for obj in struct.get('key_learning_objectives', []):
-                    basic_info += f"   • {obj}\n"
-                
-                # Add AI explanation based on concepts
-                main_concept = struct.get('concepts', ['protein structure'])[0]
-                ai_explanation = self.ai_backend.generate_explanation(main_concept)
-                
-                return basic_info + "\n" + "=" * 80 + "\n🤖 AI EXPLANATION:\n" + ai_explanation
+            for obj in struct.get('key_learning_objectives', []):
+                basic_info += f"   • {obj}\n"
+            
+            # Add AI explanation based on concepts
+            main_concept = struct.get('concepts', ['protein structure'])[0]
+            ai_explanation = self.ai_backend.generate_explanation(main_concept)
+            
+            return basic_info + "\n" + "=" * 80 + "\n🤖 AI EXPLANATION:\n" + ai_explanation
         
         return f"❌ PDB ID {pdb_id} not found in your dataset of {len(self.concepts_data)} structures"
     
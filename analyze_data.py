@@ -1,87 +1,129 @@
-import json
 import statistics
 
-# Load the extracted features
-with open('model_data/features.json') as f:
-    features = json.load(f)
+from feature_store import load_features
+from streaming_stats import ALPHA, Metric
+
+# Resolutions kept for an exact median; past this many, the sketch estimate is shown
+EXACT_MEDIAN_LIMIT = 100_000
+
+# Load the extracted features (columnar store, or features.json from older runs)
+features = load_features()
+
+
+def keep(values, x):
+    """values with x appended, or None once there are too many for an exact median"""
+    if values is None or len(values) >= EXACT_MEDIAN_LIMIT:
+        return None
+    values.append(x)
+    return values
+
+
+def print_median(metric, values):
+    if values is not None:
+        print(f"    Median: {statistics.median(values):.2f}")
+    else:
+        print(f"    ≈ Median (±{ALPHA:.0%}): {metric.quantile(0.5):.2f}")
+
 
 print("=" * 70)
 print("PDB DATASET ANALYSIS & MODEL INSIGHTS")
 print("=" * 70)
 
-# Filter by experiment type
-xray = [f for f in features if f['is_xray'] == 1]
-em = [f for f in features if f['is_em'] == 1]
-nmr = [f for f in features if f['is_nmr'] == 1]
+# One pass over the columns; every statistic is a constant-size accumulator,
+# plus the resolutions themselves while there are few enough for an exact median
+xray_count = em_count = nmr_count = high_res = 0
+xray_res, em_res = Metric(), Metric()
+xray_values, em_values = [], []
+for xray_flag, em_flag, nmr_flag, res in zip(features.column('is_xray'), features.column('is_em'),
+                                             features.column('is_nmr'), features.column('resolution')):
+    if xray_flag == 1:
+        xray_count += 1
+        if res > 0:
+            xray_res.add(res)
+            xray_values = keep(xray_values, res)
+            high_res += res < 2.5
+    if em_flag == 1:
+        em_count += 1
+        if res > 0:
+            em_res.add(res)
+            em_values = keep(em_values, res)
+            high_res += res < 2.5
+    if nmr_flag == 1:
+        nmr_count += 1
 
 print(f"\n[DATA SUMMARY]")
 print(f"  Total structures: {len(features)}")
-print(f"  X-Ray Diffraction: {len(xray)}")
-print(f"  Electron Microscopy: {len(em)}")
-print(f"  NMR: {len(nmr)}")
-
-# Resolution analysis
-xray_res = [f['resolution'] for f in xray if f['resolution'] > 0]
-em_res = [f['resolution'] for f in em if f['resolution'] > 0]
+print(f"  X-Ray Diffraction: {xray_count}")
+print(f"  Electron Microscopy: {em_count}")
+print(f"  NMR: {nmr_count}")
 
 print(f"\n[RESOLUTION QUALITY]")
-if xray_res:
+if xray_res.stats.count:
     print(f"  X-Ray Resolution (Å):")
-    print(f"    Count: {len(xray_res)}/{len(xray)}")
-    print(f"    Range: {min(xray_res):.2f} - {max(xray_res):.2f}")
-    print(f"    Mean: {statistics.mean(xray_res):.2f}")
-    print(f"    Median: {statistics.median(xray_res):.2f}")
+    print(f"    Count: {xray_res.stats.count}/{xray_count}")
+    print(f"    Range: {xray_res.stats.min:.2f} - {xray_res.stats.max:.2f}")
+    print(f"    Mean: {xray_res.stats.mean:.2f}")
+    print_median(xray_res, xray_values)
 
-if em_res:
+if em_res.stats.count:
     print(f"\n  Cryo-EM Resolution (Å):")
-    print(f"    Count: {len(em_res)}/{len(em)}")
-    print(f"    Range: {min(em_res):.2f} - {max(em_res):.2f}")
-    print(f"    Mean: {statistics.mean(em_res):.2f}")
-    print(f"    Median: {statistics.median(em_res):.2f}")
+    print(f"    Count: {em_res.stats.count}/{em_count}")
+    print(f"    Range: {em_res.stats.min:.2f} - {em_res.stats.max:.2f}")
+    print(f"    Mean: {em_res.stats.mean:.2f}")
+    print_median(em_res, em_values)
+
+
+def column_stats(name, positive_only=False):
+    metric = Metric()
+    for value in features.column(name):
+        if value > 0 or not positive_only:
+            metric.add(value)
+    return metric.stats
+
 
 # Complexity analysis
-poly_counts = [f['polymer_entity_count'] for f in features]
-water_counts = [f['water_entity_count'] for f in features]
-nonpoly_counts = [f['nonpolymer_entity_count'] for f in features]
+poly_counts = column_stats('polymer_entity_count')
+water_counts = column_stats('water_entity_count')
+nonpoly_counts = column_stats('nonpolymer_entity_count')
 
 print(f"\n[STRUCTURAL COMPLEXITY]")
 print(f"  Polymer Entities:")
-print(f"    Range: {min(poly_counts)} - {max(poly_counts)}")
-print(f"    Mean: {statistics.mean(poly_counts):.1f}")
+print(f"    Range: {poly_counts.min} - {poly_counts.max}")
+print(f"    Mean: {poly_counts.mean:.1f}")
 print(f"  Water Molecules:")
-print(f"    Range: {min(water_counts)} - {max(water_counts)}")
-print(f"    Mean: {statistics.mean(water_counts):.1f}")
+print(f"    Range: {water_counts.min} - {water_counts.max}")
+print(f"    Mean: {water_counts.mean:.1f}")
 print(f"  Non-Polymer Entities:")
-print(f"    Range: {min(nonpoly_counts)} - {max(nonpoly_counts)}")
-print(f"    Mean: {statistics.mean(nonpoly_counts):.1f}")
+print(f"    Range: {nonpoly_counts.min} - {nonpoly_counts.max}")
+print(f"    Mean: {nonpoly_counts.mean:.1f}")
 
 # Cell dimensions
-cell_volumes = [f['cell_volume'] for f in features if f['cell_volume'] > 0]
-cell_a_vals = [f['cell_a'] for f in features if f['cell_a'] > 0]
+cell_volumes = column_stats('cell_volume', positive_only=True)
+cell_a_vals = column_stats('cell_a', positive_only=True)
 
 print(f"\n[UNIT CELL]")
-if cell_volumes:
+if cell_volumes.count:
     print(f"  Volume (Ų):")
-    print(f"    Range: {min(cell_volumes):.0f} - {max(cell_volumes):.0f}")
-    print(f"    Mean: {statistics.mean(cell_volumes):.0f}")
+    print(f"    Range: {cell_volumes.min:.0f} - {cell_volumes.max:.0f}")
+    print(f"    Mean: {cell_volumes.mean:.0f}")
 
-if cell_a_vals:
+if cell_a_vals.count:
     print(f"  Dimension A (Å):")
-    print(f"    Range: {min(cell_a_vals):.1f} - {max(cell_a_vals):.1f}")
-    print(f"    Mean: {statistics.mean(cell_a_vals):.1f}")
+    print(f"    Range: {cell_a_vals.min:.1f} - {cell_a_vals.max:.1f}")
+    print(f"    Mean: {cell_a_vals.mean:.1f}")
 
 # Insights
 print(f"\n[KEY INSIGHTS FOR MODELING]")
 print(f"  ✓ Good size dataset: {len(features)} structures")
 print(f"  ✓ Diverse methods: X-ray, Cryo-EM")
-print(f"  ✓ Variable complexity: Polymers range from 1-{max(poly_counts)} entities")
+print(f"  ✓ Variable complexity: Polymers range from 1-{poly_counts.max} entities")
 
-if xray_res or em_res:
-    print(f"  ✓ Resolution data available for {len(xray_res) + len(em_res)} structures")
+with_resolution = xray_res.stats.count + em_res.stats.count
+if with_resolution:
+    print(f"  ✓ Resolution data available for {with_resolution} structures")
     print(f"  → Can predict resolution quality from structural features")
 
-high_res = sum(1 for r in (xray_res + em_res) if r < 2.5)
-print(f"  → {high_res}/{len(xray_res) + len(em_res)} structures have high resolution (< 2.5 Å)")
+print(f"  → {high_res}/{with_resolution} structures have high resolution (< 2.5 Å)")
 
 print(f"\n[RECOMMENDED MODEL TARGETS]")
 print(f"  1. Predict resolution quality (regression)")
@@ -2,6 +2,8 @@
 
 # Script to download files from RCSB http file download services.
 # Use the -h switch to get help on usage.
+# download_files.py takes the same flags and fetches everything in one process
+# over pooled keep-alive connections.
 
 if ! command -v curl &> /dev/null
 then
@@ -2,6 +2,8 @@
 
 # Script to download JSON files from RCSB PDB API.
 # Downloads entry data in JSON format for each PDB id.
+# For large id lists prefer download_entries.py, which fetches concurrently
+# under a rate limit instead of sleeping between sequential requests.
 
 if ! command -v curl &> /dev/null
 then
@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+"""
+Benchmarks
+Micro-benchmarks for the extraction pipeline, run against real entries
+
+Usage:
+  python3 benchmarks.py schema                  # compiled schema vs hand-written extractor
+  python3 benchmarks.py schema --source pdb_data.pack --repeat 20
+  python3 benchmarks.py decode                  # selective-key decoder vs json.loads, largest entries
+  python3 benchmarks.py decode --largest 100 --inflate 1 4 16 64
+  python3 benchmarks.py codec                   # load time of our JSON outputs per backend and format,
+                                                # and whether every backend writes them (and edge-case values) alike
+  python3 benchmarks.py catalog --records 200000  # catalog queries vs scanning extracted_concepts.json
+  python3 benchmarks.py startup                 # query script start-up: JSON files vs framework snapshot
+  python3 benchmarks.py startup --records 200000
+  python3 benchmarks.py records --records 200000  # memory of dict records vs the compact StructureTable
+"""
+
+import argparse
+import json
+import time
+
+from entry_pack import iter_entries, iter_raw_entries
+
+JSON_DIR = "./pdb_data"
+
+
+def best_rate(function, items, repeat):
+    """Best-of-`repeat` throughput of function over items, in items per second"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            function(item)
+        best = min(best, time.perf_counter() - start)
+    return len(items) / best if best else float('inf')
+
+
+def handwritten_features(json_data):
+    """The hand-written extract_features.extract_features the schema replaced"""
+    features = {}
+
+    try:
+        features['pdb_id'] = json_data.get('rcsb_id', '')
+
+        exptl_method = json_data.get('exptl', [{}])[0].get('method', 'UNKNOWN')
+        features['method'] = exptl_method
+        features['is_xray'] = 1 if 'X-RAY' in exptl_method else 0
+        features['is_nmr'] = 1 if 'NMR' in exptl_method else 0
+        features['is_em'] = 1 if 'ELECTRON' in exptl_method or 'CRYO-EM' in exptl_method else 0
+
+        reflns = json_data.get('reflns', [{}])[0]
+        features['resolution'] = float(reflns.get('d_resolution_high', 0)) if reflns.get('d_resolution_high') else 0
+
+        cell = json_data.get('cell', {})
+        features['cell_volume'] = float(cell.get('volume', 0)) if cell.get('volume') else 0
+        features['cell_a'] = float(cell.get('length_a', 0)) if cell.get('length_a') else 0
+        features['cell_b'] = float(cell.get('length_b', 0)) if cell.get('length_b') else 0
+        features['cell_c'] = float(cell.get('length_c', 0)) if cell.get('length_c') else 0
+
+        struct = json_data.get('struct', {})
+        features['title'] = struct.get('title', '')
+
+        refine = json_data.get('refine', [{}])[0]
+        features['r_work'] = float(refine.get('ls_R_factor_R_work', 0)) if refine.get('ls_R_factor_R_work') else 0
+        features['r_free'] = float(refine.get('ls_R_factor_R_free', 0)) if refine.get('ls_R_factor_R_free') else 0
+
+        entry_info = json_data.get('rcsb_entry_info', {})
+        features['polymer_entity_count'] = int(entry_info.get('polymer_entity_count', 0)) or 0
+        features['nonpolymer_entity_count'] = int(entry_info.get('nonpolymer_entity_count', 0)) or 0
+        features['water_entity_count'] = int(entry_info.get('water_entity_count', 0)) or 0
+
+        accession = json_data.get('rcsb_accession_info', {})
+        features['has_deposition_date'] = 1 if accession.get('deposit_date') else 0
+
+        return features
+    except Exception:
+        return None
+
+
+# Fields the schema deliberately reads differently from the hand-written extractor
+# (the entry JSON has no water_entity_count; the schema reads solvent_entity_count)
+SCHEMA_CHANGED_FIELDS = {'water_entity_count'}
+
+
+def _split_changed(record):
+    """(fields both extractors read alike, deliberately changed fields) of a record"""
+    if record is None:
+        return None, None
+    same = {key: value for key, value in record.items() if key not in SCHEMA_CHANGED_FIELDS}
+    return same, {key: record.get(key) for key in SCHEMA_CHANGED_FIELDS}
+
+
+def bench_schema(args):
+    from feature_schema import FEATURE_SCHEMA, extract_features
+
+    documents = [document for _, document in iter_entries(args.source)]
+    if not documents:
+        print(f"No entries found in {args.source}")
+        return
+    print(f"Benchmarking feature extraction on {len(documents)} entries "
+          f"({len(FEATURE_SCHEMA)} fields, best of {args.repeat})...")
+
+    pairs = [(_split_changed(handwritten_features(d)), _split_changed(extract_features(d))) for d in documents]
+    mismatches = sum(1 for old, new in pairs if old[0] != new[0])
+    changed = sum(1 for old, new in pairs if old[1] != new[1])
+    hand = best_rate(handwritten_features, documents, args.repeat)
+    compiled = best_rate(extract_features, documents, args.repeat)
+
+    print(f"  Hand-written:     {hand:>10,.0f} records/s")
+    print(f"  Compiled schema:  {compiled:>10,.0f} records/s  ({compiled / hand:.2f}x)")
+    if mismatches:
+        print(f"  ⚠️  {mismatches} records differ between the two extractors")
+    else:
+        print(f"  ✓ Both extractors produce identical records apart from {', '.join(sorted(SCHEMA_CHANGED_FIELDS))}")
+    print(f"  {changed} records differ in {', '.join(sorted(SCHEMA_CHANGED_FIELDS))}, which the schema reads "
+          f"from rcsb_entry_info.solvent_entity_count")
+
+
+def inflate(data, keys, factor):
+    """Grow an entry by repeating every list the features don't read, as in large assemblies"""
+    if factor == 1:
+        return data
+    document = json.loads(data)
+    for key, value in document.items():
+        if key not in keys and isinstance(value, list):
+            document[key] = value * factor
+    return json.dumps(document).encode()
+
+
+def bench_decode(args):
+    import json_codec
+    from feature_schema import FEATURE_KEYS, extract_features
+    from selective_json import SELECTIVE_MIN_BYTES, decode_keys, np
+
+    if np is None:
+        print("numpy is not installed; decode_keys falls back to json.loads")
+    entries = sorted((data for _, data in iter_raw_entries(args.source)), key=len, reverse=True)
+    entries = entries[:args.largest]
+    if not entries:
+        print(f"No entries found in {args.source}")
+        return
+    print(f"Decoding the {len(entries)} largest entries, keeping {len(FEATURE_KEYS)} of their top-level keys "
+          f"(best of {args.repeat})...")
+    full_name = json_codec.BACKEND
+    print(f"  {'inflate':>7} {'avg size':>10} {'json.loads':>12} {full_name:>12} {'decode_keys':>12} "
+          f"{'vs json':>8} {'vs ' + full_name:>10}")
+
+    for factor in args.inflate:
+        documents = [inflate(data, FEATURE_KEYS, factor) for data in entries]
+        mismatches = sum(1 for data in documents
+                         if extract_features(decode_keys(data, FEATURE_KEYS)) != extract_features(json.loads(data)))
+        stdlib = best_rate(json.loads, documents, args.repeat)
+        full = best_rate(json_codec.decode, documents, args.repeat)
+        selective = best_rate(lambda data: decode_keys(data, FEATURE_KEYS), documents, args.repeat)
+        size = sum(map(len, documents)) / len(documents)
+        print(f"  {factor:>6}x {size / 1e3:>8.0f}kB {stdlib:>10,.0f}/s {full:>10,.0f}/s {selective:>10,.0f}/s "
+              f"{selective / stdlib:>7.2f}x {selective / full:>9.2f}x")
+        if mismatches:
+            print(f"  ⚠️  {mismatches} entries extract differently")
+    print("  Records/s; extract_features output is compared for every entry")
+    print(f"  Extraction uses decode_keys for entries of {SELECTIVE_MIN_BYTES[json_codec.BACKEND] // 1024} kB "
+          f"and more with the {json_codec.BACKEND} backend")
+
+
+def bench_codec(args):
+    import gzip
+    import sys
+
+    import json_codec
+
+    print(f"JSON backends: {', '.join(json_codec.DECODERS)} (in use: {json_codec.BACKEND}), "
+          f"best of {args.repeat}")
+    mismatched = False
+    for path in args.files:
+        try:
+            document = json_codec.read(path)
+        except FileNotFoundError:
+            print(f"\n{path}: not found, skipped")
+            continue
+        pretty = json.dumps(document, indent=2).encode()
+        compact = json.dumps(document, separators=(',', ':')).encode()
+        variants = [('pretty', pretty, False), ('compact', compact, False),
+                    ('compact.gz', gzip.compress(compact, json_codec.GZIP_LEVEL), True)]
+
+        print(f"\n{path}")
+        print(f"  {'format':<11} {'size':>9}" + ''.join(f" {name:>10}" for name in json_codec.DECODERS))
+        for label, data, compressed in variants:
+            timings = []
+            for decoder in json_codec.DECODERS.values():
+                if compressed:
+                    load = lambda data, decoder=decoder: decoder(gzip.decompress(data))
+                else:
+                    load = decoder
+                timings.append(1000 / best_rate(load, [data], args.repeat))
+            print(f"  {label:<11} {len(data) / 1e3:>7.0f}kB" + ''.join(f" {ms:>8.2f}ms" for ms in timings))
+
+        for style in json_codec.FORMATS:
+            mismatched |= not codec_parity(document, style)
+
+    # Values our outputs happen not to contain, but summaries and features can
+    for label, probe in CODEC_PROBES.items():
+        print(f"\nProbe: {label}")
+        for style in json_codec.FORMATS:
+            mismatched |= not codec_parity(probe, style)
+    if mismatched:
+        sys.exit(1)
+
+
+CODEC_PROBES = {
+    'floats in exponent form': {'small': 1e-05, 'large': 1e20, 'resolution': 2.5},
+    'NaN and Infinity': {'mean': float('nan'), 'range': [float('-inf'), float('inf')], 'missing': None},
+    'non-ASCII text': {'title': 'Na⁺/K⁺-ATPase — \U0001f9ec'},
+}
+
+
+def codec_parity(document, style):
+    """Print whether every backend writes document alike; False if they write different values"""
+    import json_codec
+
+    outputs = {backend: json_codec.encode(document, style, backend) for backend in json_codec.DECODERS}
+    backends = ', '.join(outputs)
+    # Decoded and re-written by the stdlib, so NaN compares equal and floats by value
+    values = {json.dumps(json_codec.decode(data)) for data in outputs.values()}
+    if len(values) > 1:
+        print(f"  ❌ {style} output has different values between {backends}")
+        return False
+    if style == json_codec.PRETTY and not all(data.isascii() for data in outputs.values()):
+        print(f"  ❌ {style} output is not ASCII-only with every backend")
+        return False
+    if len(set(outputs.values())) > 1:
+        print(f"  ✓ {style} output has the same values with {backends} (exponent floats spelled differently)")
+    else:
+        print(f"  ✓ {style} output identical with {backends}")
+    return True
+
+
+def synthetic_records(records, count):
+    """`count` copies of records cycled, each under a new unique pdb_id"""
+    copies = []
+    for i in range(count):
+        record = dict(records[i % len(records)])
+        record['pdb_id'] = f"S{i:07d}"
+        copies.append(record)
+    return copies
+
+
+def bench_catalog(args):
+    import os
+    import random
+    import tempfile
+
+    import catalog
+    import json_codec
+    from bitmap_index import BitmapIndex
+    from feature_store import load_features
+
+    concept_map = json_codec.read(catalog.CONCEPT_MAP)
+    all_concepts = synthetic_records(json_codec.read(catalog.EXTRACTED_CONCEPTS), args.records)
+    with load_features(catalog.FEATURE_STORE, catalog.FEATURES_JSON) as features:
+        feature_records = synthetic_records(list(features.records()), args.records)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog.sqlite")
+        start = time.perf_counter()
+        catalog.build_catalog(concept_map, all_concepts, feature_records, path)
+        print(f"Catalog of {args.records} structures built in {time.perf_counter() - start:.1f}s "
+              f"({os.path.getsize(path) / 1e6:.0f} MB)")
+
+        # The linear scans query.py did over extracted_concepts.json
+        def scan_pdb_id(pdb_id):
+            return next((s for s in all_concepts if s.get('pdb_id') == pdb_id), None)
+
+        def scan_method(text):
+            return [s for s in all_concepts if any(text in c.lower() for c in s.get('concepts', []))][:10]
+
+        def scan_complexity(text):
+            return [s for s in all_concepts if text in s.get('complexity_level', '').lower()][:10]
+
+        def scan_statistics(_):
+            counts = {}
+            for s in all_concepts:
+                level = s.get('complexity_level', 'Unknown')
+                counts[level] = counts.get(level, 0) + 1
+                group = catalog.method_group(s.get('concepts', []))
+                counts[group] = counts.get(group, 0) + 1
+            return counts
+
+        def scan_boolean(_):
+            return sum(1 for s in all_concepts
+                       if 'Cryo-EM' in s['concepts'] and 'Enzyme Function' in s['concepts']
+                       and 'Gene Expression' not in s['concepts'])
+
+        def scan_titles(text):
+            words = text.lower().split()
+            return [s['pdb_id'] for s in all_concepts
+                    if any(word in (s.get('title') or '').lower() for word in words)][:10]
+
+        ids = random.Random(0).sample([s['pdb_id'] for s in all_concepts], args.lookups)
+        with catalog.Catalog(path) as cat:
+            index = BitmapIndex(cat)
+            queries = [
+                ('search_by_pdb_id', ids, cat.structure, scan_pdb_id),
+                ('filter_by_method', ['x-ray', 'cryo'], cat.with_concept_matching, scan_method),
+                ('filter_by_complexity', ['advanced', 'intermediate'],
+                 cat.with_complexity_matching, scan_complexity),
+                ('show_statistics', ['complexity', 'method'], cat.statistics, scan_statistics),
+                ('boolean_search count', ['Cryo-EM AND Enzyme Function AND NOT Gene Expression'],
+                 lambda expression: len(index.search(expression)), scan_boolean),
+                ('search_titles (BM25)', ['topoisomerase', 'human 80S ribosome', 'cryo-em structure'],
+                 cat.search_titles, scan_titles),
+            ]
+            print(f"\n  {'query':<22} {'catalog':>10} {'list scan':>12}")
+            for label, items, query, scan in queries:
+                indexed = 1000 / best_rate(query, items, args.repeat)
+                scanned = 1000 / best_rate(scan, items[:2], 1)
+                print(f"  {label:<22} {indexed:>8.3f}ms {scanned:>10.1f}ms")
+
+
+# How each query script loads the framework, run in a fresh interpreter.
+# query.py used to read these three JSON files; it now opens the catalog.
+STARTUP_LOADERS = [
+    ('query.py', "import argparse, json_codec; [json_codec.read(f'educational_framework/{name}.json') "
+                 "for name in ('concept_map', 'extracted_concepts', 'lesson_templates')]",
+     "import query; query.load_educational_data()"),
+    ('query_model.py', "import query_model; query_model.load_data()", None),
+    ('explain_structures.py', "import explain_structures; explain_structures.load_data()", None),
+    ('ai_query.py', "import types, ai_query; ai_query.AIEnhancedQuery.load_educational_data(types.SimpleNamespace())",
+     None),
+    ('ai_query_simple.py', "import ai_query_simple; ai_query_simple.AIReadyQuery().load_educational_data()", None),
+]
+
+
+def write_synthetic_framework(directory, records):
+    """Framework JSON, catalog and snapshot with `records` structures under directory/educational_framework"""
+    import os
+
+    import catalog
+    import framework_snapshot
+    import json_codec
+
+    documents = {name: json_codec.read(path) for name, path in framework_snapshot.DOCUMENTS.items()
+                 if name not in framework_snapshot.BUILDERS}
+    documents['extracted_concepts'] = synthetic_records(documents['extracted_concepts'], records)
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        os.makedirs(framework_snapshot.FRAMEWORK_DIR)
+        for name, document in documents.items():
+            json_codec.write(framework_snapshot.DOCUMENTS[name], document)
+        catalog.write_catalog(documents['concept_map'], documents['extracted_concepts'])
+        framework_snapshot.write_snapshot(documents)
+    finally:
+        os.chdir(cwd)
+
+
+def bench_startup(args):
+    import os
+    import subprocess
+    import sys
+    import tempfile
+
+    import framework_snapshot
+
+    def wall_time(code, snapshot, cwd):
+        env = dict(os.environ, PDB_FRAMEWORK_SNAPSHOT='1' if snapshot else '0',
+                   PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = subprocess.run([sys.executable, '-c', code], env=env, cwd=cwd,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            if result.returncode:
+                return None
+            best = min(best, time.perf_counter() - start)
+        return best * 1000
+
+    def run(cwd):
+        print(f"Start-up wall time, best of {args.repeat} "
+              f"(interpreter alone: {wall_time('pass', False, cwd):.0f} ms)")
+        print(f"\n  {'script':<22} {'JSON':>9} {'snapshot':>10}")
+        for script, before, after in STARTUP_LOADERS:
+            json_ms = wall_time(before, False, cwd)
+            snapshot_ms = wall_time(after or before, True, cwd)
+            if json_ms is None or snapshot_ms is None:
+                print(f"  {script:<22} skipped (fails to start here, e.g. a missing dependency)")
+                continue
+            print(f"  {script:<22} {json_ms:>7.0f}ms {snapshot_ms:>8.0f}ms")
+
+    if args.records:
+        with tempfile.TemporaryDirectory() as tmp:
+            write_synthetic_framework(tmp, args.records)
+            print(f"Synthetic framework of {args.records} structures")
+            run(tmp)
+        return
+
+    if not os.path.exists(framework_snapshot.SNAPSHOT_PATH):
+        print(f"{framework_snapshot.SNAPSHOT_PATH} not found: run build_educational_model.py "
+              f"or python3 framework_snapshot.py build")
+        return
+    fresh = framework_snapshot.load_snapshot(list(framework_snapshot.DOCUMENTS))
+    stale = [name for name in framework_snapshot.DOCUMENTS if name not in fresh]
+    if stale:
+        print(f"⚠️  Snapshot is stale for {', '.join(stale)}; those are still read from JSON")
+    run(os.getcwd())
+
+
+def bench_records(args):
+    import gc
+    import pickle
+    import random
+    import tracemalloc
+
+    import json_codec
+    from compact_records import StructureTable
+    from framework_snapshot import DOCUMENTS
+
+    # Serialised first so the records are decoded fresh, each with its own strings as in a real load
+    data = json_codec.encode(synthetic_records(json_codec.read(DOCUMENTS['extracted_concepts']), args.records))
+
+    def traced(build):
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = build()
+        elapsed = time.perf_counter() - start
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return result, size, elapsed
+
+    records, records_size, records_time = traced(lambda: json_codec.decode(data))
+    table, table_size, table_time = traced(lambda: StructureTable.from_records(records))
+    blob = pickle.dumps(table, protocol=pickle.HIGHEST_PROTOCOL)
+    _, loaded_size, loaded_time = traced(lambda: pickle.loads(blob))
+
+    print(f"{args.records} structures (tracemalloc, live memory after loading)")
+    print(f"  {'dict records (JSON)':<28} {records_size / 1e6:>8.1f} MB  {records_time * 1000:>7.0f} ms to decode")
+    print(f"  {'StructureTable':<28} {table_size / 1e6:>8.1f} MB  {table_time * 1000:>7.0f} ms to build")
+    print(f"  {'StructureTable (snapshot)':<28} {loaded_size / 1e6:>8.1f} MB  {loaded_time * 1000:>7.0f} ms to unpickle")
+
+    ids = random.Random(0).sample([record['pdb_id'] for record in records], 20)
+    concept = 'Enzyme Function'
+    timings = [
+        ('find by pdb_id',
+         lambda pdb_id: next((r for r in records if r.get('pdb_id') == pdb_id), None), table.find, ids),
+        (f"count '{concept}'",
+         lambda name: sum(1 for r in records if name in r.get('concepts', [])),
+         lambda name: sum(1 for _ in table.with_concepts([name])), [concept]),
+    ]
+    print(f"\n  {'operation':<28} {'dicts':>10} {'table':>10}")
+    for label, scan, compact, items in timings:
+        print(f"  {label:<28} {1000 / best_rate(scan, items[:3], 1):>8.2f}ms "
+              f"{1000 / best_rate(compact, items, args.repeat):>8.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extraction pipeline benchmarks')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_schema = sub.add_parser('schema', help='Compiled feature schema vs the hand-written extractor')
+    p_schema.add_argument('--source', default=JSON_DIR,
+                          help=f'Directory of <ID>.json files or an entry pack (default: {JSON_DIR})')
+    p_schema.add_argument('--repeat', type=int, default=10, help='Timing runs; the best is reported')
+    p_schema.set_defaults(run=bench_schema)
+
+    p_decode = sub.add_parser('decode', help='Selective-key decoder vs full json.loads on the largest entries')
+    p_decode.add_argument('--source', default=JSON_DIR,
+                          help=f'Directory of <ID>.json files or an entry pack (default: {JSON_DIR})')
+    p_decode.add_argument('--largest', type=int, default=50, help='Number of largest entries to decode')
+    p_decode.add_argument('--inflate', type=int, nargs='+', default=[1, 4, 16],
+                          help='Also time the entries with their unread lists repeated this many times')
+    p_decode.add_argument('--repeat', type=int, default=10, help='Timing runs; the best is reported')
+    p_decode.set_defaults(run=bench_decode)
+
+    p_codec = sub.add_parser('codec', help='Load time of our JSON outputs for each backend and format, '
+                                                  'and output parity between the backends')
+    p_codec.add_argument('files', nargs='*', default=['model_data/features.json',
+                                                      'educational_framework/extracted_concepts.json',
+                                                      'educational_framework/concept_map.json',
+                                                      'educational_framework/concept_hierarchy.json'])
+    p_codec.add_argument('--repeat', type=int, default=10, help='Timing runs; the best is reported')
+    p_codec.set_defaults(run=bench_codec)
+
+    p_catalog = sub.add_parser('catalog', help='Indexed catalog queries vs list scans at a synthetic scale')
+    p_catalog.add_argument('--records', type=int, default=200000,
+                           help='Structures in the synthetic catalog (real records replicated)')
+    p_catalog.add_argument('--lookups', type=int, default=1000, help='Random PDB ids looked up')
+    p_catalog.add_argument('--repeat', type=int, default=5, help='Timing runs; the best is reported')
+    p_catalog.set_defaults(run=bench_catalog)
+
+    p_startup = sub.add_parser('startup', help='Query script start-up with the JSON files vs the snapshot')
+    p_startup.add_argument('--records', type=int, default=0,
+                           help='Time a synthetic framework of this many structures instead of the real one')
+    p_startup.add_argument('--repeat', type=int, default=10, help='Timing runs; the best is reported')
+    p_startup.set_defaults(run=bench_startup)
+
+    p_records = sub.add_parser('records', help='Memory and speed of dict records vs the compact StructureTable')
+    p_records.add_argument('--records', type=int, default=200000, help='Synthetic structures (real records replicated)')
+    p_records.add_argument('--repeat', type=int, default=5, help='Timing runs; the best is reported')
+    p_records.set_defaults(run=bench_records)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
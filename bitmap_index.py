@@ -0,0 +1,215 @@
+"""
+Bitmap Index
+One bitset per concept, experimental method and complexity level over the
+dense structure ordinals of the catalog (structures.id), so boolean concept
+questions are answered with a few bitwise operations instead of a scan of
+extracted_concepts.json:
+
+  Cryo-EM AND Enzyme Function AND NOT Gene Expression
+  (method:"X-RAY DIFFRACTION" OR method:"ELECTRON MICROSCOPY") AND complexity:Advanced
+
+Bitsets are Python ints in memory (AND/OR/NOT run in C over whole machine
+words) and zlib-compressed in the catalog, where sparse ones shrink to a few
+hundred bytes. Counts are a popcount; matching ordinals are produced lazily.
+
+Expressions:
+  AND, OR, NOT (any case) and parentheses; AND binds tighter than OR
+  a term is a name, quoted if it contains a keyword or parenthesis
+  concept:, method: and complexity: prefixes pick the kind (default: concept)
+  a name matches exactly (ignoring case), or else every name containing it
+"""
+
+import re
+import zlib
+
+CONCEPT = 'concept'
+METHOD = 'method'
+COMPLEXITY = 'complexity'
+KINDS = (CONCEPT, METHOD, COMPLEXITY)
+
+_TOKEN = re.compile(r'\s*(?:(\()|(\))|((?:\w+:)?"[^"]*")|([^\s()"]+))')
+_KEYWORDS = ('AND', 'OR', 'NOT')
+
+
+class Bitmap:
+    """A set of structure ordinals in 0..size-1"""
+
+    __slots__ = ('bits', 'size')
+
+    def __init__(self, bits=0, size=0):
+        self.bits = bits
+        self.size = size
+
+    @classmethod
+    def from_ordinals(cls, ordinals, size):
+        bits = bytearray((size + 7) // 8)
+        for ordinal in ordinals:
+            bits[ordinal >> 3] |= 1 << (ordinal & 7)
+        return cls(int.from_bytes(bits, 'little'), size)
+
+    @classmethod
+    def from_blob(cls, blob, size):
+        return cls(int.from_bytes(zlib.decompress(blob), 'little'), size)
+
+    def to_blob(self):
+        return zlib.compress(self.bits.to_bytes((self.size + 7) // 8, 'little'))
+
+    def __len__(self):
+        return self.bits.bit_count()
+
+    def __and__(self, other):
+        return Bitmap(self.bits & other.bits, self.size)
+
+    def __or__(self, other):
+        return Bitmap(self.bits | other.bits, self.size)
+
+    def __sub__(self, other):
+        return Bitmap(self.bits & ~other.bits, self.size)
+
+    def __invert__(self):
+        return Bitmap(~self.bits & ((1 << self.size) - 1), self.size)
+
+    def __iter__(self):
+        """Ordinals in increasing order, generated as they are consumed"""
+        data = self.bits.to_bytes((self.size + 7) // 8, 'little')
+        for offset, byte in enumerate(data):
+            if byte:
+                base = offset << 3
+                while byte:
+                    low = byte & -byte
+                    yield base + low.bit_length() - 1
+                    byte ^= low
+
+
+def tokenize(text):
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if not match:
+            raise ValueError(f"unbalanced quote in {text!r}")
+        position = match.end()
+        opening, closing, quoted, word = match.groups()
+        if opening or closing:
+            tokens.append(opening or closing)
+        elif quoted:
+            tokens.append(('name', quoted.replace('"', '')))
+        elif word.upper() in _KEYWORDS:
+            tokens.append(word.upper())
+        else:
+            tokens.append(('name', word))
+    return tokens
+
+
+def parse(text):
+    """Parse an expression into nested tuples: ('and'|'or', a, b), ('not', a), ('term', kind, name)"""
+    tokens = tokenize(text)
+    position = 0
+
+    def peek():
+        return tokens[position] if position < len(tokens) else None
+
+    def take():
+        nonlocal position
+        position += 1
+        return tokens[position - 1]
+
+    def parse_or():
+        node = parse_and()
+        while peek() == 'OR':
+            take()
+            node = ('or', node, parse_and())
+        return node
+
+    def parse_and():
+        node = parse_not()
+        while peek() == 'AND':
+            take()
+            node = ('and', node, parse_not())
+        return node
+
+    def parse_not():
+        if peek() == 'NOT':
+            take()
+            return ('not', parse_not())
+        return parse_atom()
+
+    def parse_atom():
+        token = peek()
+        if token == '(':
+            take()
+            node = parse_or()
+            if peek() != ')':
+                raise ValueError(f"missing ')' in {text!r}")
+            take()
+            return node
+        if not isinstance(token, tuple):
+            raise ValueError(f"expected a name at {token or 'end'!r} in {text!r}")
+        # Consecutive words form one name: Enzyme Function
+        words = []
+        while isinstance(peek(), tuple):
+            words.append(take()[1])
+        name = ' '.join(words)
+        kind, sep, rest = name.partition(':')
+        if sep and kind.lower() in KINDS:
+            return ('term', kind.lower(), rest.strip())
+        return ('term', CONCEPT, name)
+
+    if not tokens:
+        raise ValueError("empty expression")
+    tree = parse_or()
+    if peek() is not None:
+        raise ValueError(f"unexpected {peek()!r} in {text!r}")
+    return tree
+
+
+class BitmapIndex:
+    """Evaluates expressions against the bitmaps stored in a catalog"""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.size = len(catalog)
+        self.names = {kind: catalog.bitmap_names(kind) for kind in KINDS}
+        self._bitmaps = {}
+
+    def bitmap(self, kind, name):
+        key = (kind, name)
+        if key not in self._bitmaps:
+            self._bitmaps[key] = Bitmap.from_blob(self.catalog.bitmap_blob(kind, name), self.size)
+        return self._bitmaps[key]
+
+    def resolve(self, kind, text):
+        """Names of `kind` a term stands for: the exact name, or every name containing it"""
+        names = self.names[kind]
+        exact = [name for name in names if name.lower() == text.lower()]
+        if exact:
+            return exact
+        matches = [name for name in names if text.lower() in name.lower()]
+        if not matches:
+            raise ValueError(f"no {kind} matches {text!r}")
+        return matches
+
+    def evaluate(self, tree, resolved=None):
+        """Bitmap of the structures matching a parsed expression.
+
+        resolved, if given, collects {(kind, term): [names]} for display.
+        """
+        op = tree[0]
+        if op == 'term':
+            _, kind, text = tree
+            names = self.resolve(kind, text)
+            if resolved is not None:
+                resolved[(kind, text)] = names
+            result = Bitmap(0, self.size)
+            for name in names:
+                result = result | self.bitmap(kind, name)
+            return result
+        if op == 'not':
+            return ~self.evaluate(tree[1], resolved)
+        left = self.evaluate(tree[1], resolved)
+        right = self.evaluate(tree[2], resolved)
+        return left & right if op == 'and' else left | right
+
+    def search(self, text, resolved=None):
+        return self.evaluate(parse(text), resolved)
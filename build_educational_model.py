@@ -10,11 +10,16 @@ This system helps teachers:
 4. Connect multiple concepts through concept hierarchies
 """
 
-import json
+import argparse
 import os
-from pathlib import Path
 from collections import defaultdict
 
+import json_codec
+from catalog import write_catalog
+from framework_snapshot import write_snapshot
+from entry_pack import count_entries, iter_entries
+from sharding import parse_shard, shard_dir, shard_filter
+
 # Configuration
 JSON_DIR = "./pdb_data"
 OUTPUT_DIR = "./educational_framework"
@@ -246,26 +251,27 @@ class MolecularBiologyConceptMapper:
             }
         }
     
-    def process_pdb_files(self):
-        """Process all PDB files and extract concepts"""
-        files = list(Path(JSON_DIR).glob("*.json"))
+    def process_pdb_files(self, source=JSON_DIR, select=None):
+        """Process all PDB files (a directory or an entry pack) and extract concepts.
+        
+        select(pdb_id), if given, limits the entries (e.g. to one shard).
+        Concepts are returned sorted by pdb_id.
+        """
+        total = count_entries(source, select)
         all_concepts = []
         
-        print(f"Processing {len(files)} PDB structures for educational concepts...\n")
+        print(f"Processing {total} PDB structures for educational concepts...\n")
         
-        for i, json_file in enumerate(files):
+        for i, (pdb_id, pdb_data) in enumerate(iter_entries(source, select=select)):
             if i % 200 == 0:
-                print(f"  [{i}/{len(files)}] Processing structures...")
+                print(f"  [{i}/{total}] Processing structures...")
             
-            try:
-                with open(json_file, 'r') as f:
-                    pdb_data = json.load(f)
-                    concepts = self.extract_biology_concepts(pdb_data, json_file.stem)
-                    if concepts['concepts']:
-                        all_concepts.append(concepts)
-            except Exception as e:
-                pass
+            concepts = self.extract_biology_concepts(pdb_data, pdb_id)
+            if concepts['concepts']:
+                all_concepts.append(concepts)
         
+        # Directory order is arbitrary; sorting keeps outputs identical across runs and shards
+        all_concepts.sort(key=lambda data: data['pdb_id'])
         return all_concepts
     
     def generate_concept_map(self, all_concepts):
@@ -307,31 +313,12 @@ class MolecularBiologyConceptMapper:
         return dict(distribution)
 
 
-def main():
-    print("=" * 70)
-    print("MOLECULAR BIOLOGY CONCEPT MAPPER")
-    print("Educational Framework for Teaching Protein Science")
-    print("=" * 70)
-    
-    mapper = MolecularBiologyConceptMapper()
-    
-    # Step 1: Build concept hierarchy
-    print("\n[1/5] Building concept hierarchy...")
-    hierarchy = mapper.build_concept_hierarchy()
-    with open(f"{OUTPUT_DIR}/concept_hierarchy.json", 'w') as f:
-        json.dump(hierarchy, f, indent=2)
-    print("   ✓ Concept hierarchy created")
-    
-    # Step 2: Process PDB structures
-    print("\n[2/5] Extracting educational concepts from PDB structures...")
-    all_concepts = mapper.process_pdb_files()
-    print(f"   ✓ Extracted concepts from {len(all_concepts)} structures")
-    
+def save_framework(mapper, all_concepts, hierarchy):
+    """Write concept map, lesson templates, extracted concepts and teacher guide (steps 3-6)"""
     # Step 3: Generate concept map
     print("\n[3/5] Generating concept maps...")
     concept_map = mapper.generate_concept_map(all_concepts)
-    with open(f"{OUTPUT_DIR}/concept_map.json", 'w') as f:
-        json.dump(concept_map, f, indent=2)
+    json_codec.write(f"{OUTPUT_DIR}/concept_map.json", concept_map)
     print(f"   ✓ {concept_map['total_concepts']} unique concepts identified")
     
     # Step 4: Create lesson templates
@@ -341,19 +328,71 @@ def main():
     for concept in top_concepts:
         lesson_templates[concept] = mapper.create_lesson_template(concept, "Intermediate")
     
-    with open(f"{OUTPUT_DIR}/lesson_templates.json", 'w') as f:
-        json.dump(lesson_templates, f, indent=2)
+    json_codec.write(f"{OUTPUT_DIR}/lesson_templates.json", lesson_templates)
     print(f"   ✓ Created templates for {len(lesson_templates)} key concepts")
     
     # Step 5: Save detailed concepts
     print("\n[5/5] Saving detailed concept data...")
-    with open(f"{OUTPUT_DIR}/extracted_concepts.json", 'w') as f:
-        json.dump(all_concepts, f, indent=2)
+    json_codec.write(f"{OUTPUT_DIR}/extracted_concepts.json", all_concepts)
+    write_catalog(concept_map, all_concepts)
+    print(f"   ✓ Indexed {len(all_concepts)} structures in catalog.sqlite")
+    write_snapshot({'concept_map': concept_map, 'extracted_concepts': all_concepts,
+                    'lesson_templates': lesson_templates, 'concept_hierarchy': hierarchy})
+    print("   ✓ Wrote framework.snapshot for fast query start-up")
     
     # Step 6: Create teacher guide
     print("\n[6/5] Creating teacher guide...")
     create_teacher_guide(concept_map, hierarchy)
     
+    return concept_map, lesson_templates
+
+
+def process_shard(source, shard):
+    """Extract one shard's concepts into its partial extracted_concepts.json"""
+    output_dir = shard_dir(OUTPUT_DIR, shard)
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"Extracting educational concepts for shard {shard[0]}/{shard[1]} -> {output_dir}/")
+    
+    mapper = MolecularBiologyConceptMapper()
+    all_concepts = mapper.process_pdb_files(source, select=shard_filter(shard))
+    json_codec.write(f"{output_dir}/extracted_concepts.json", all_concepts)
+    print(f"   ✓ Extracted concepts from {len(all_concepts)} structures")
+    print("   Once every shard has run: python3 merge_shards.py")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the educational framework from PDB entry JSON')
+    parser.add_argument('--source', default=JSON_DIR,
+                        help=f'Directory of <ID>.json files or an entry pack (default: {JSON_DIR})')
+    parser.add_argument('--shard', type=parse_shard, metavar='i/N',
+                        help='Extract concepts for shard i of N only (0-based, by stable hash of the PDB id) '
+                             f'into {OUTPUT_DIR}/shards/i-of-N/; combine with merge_shards.py')
+    args = parser.parse_args()
+    
+    if args.shard:
+        process_shard(args.source, args.shard)
+        return
+    
+    print("=" * 70)
+    print("MOLECULAR BIOLOGY CONCEPT MAPPER")
+    print("Educational Framework for Teaching Protein Science")
+    print("=" * 70)
+    
+    mapper = MolecularBiologyConceptMapper()
+    
+    # Step 1: Build concept hierarchy
+    print("\n[1/5] Building concept hierarchy...")
+    hierarchy = mapper.build_concept_hierarchy()
+    json_codec.write(f"{OUTPUT_DIR}/concept_hierarchy.json", hierarchy)
+    print("   ✓ Concept hierarchy created")
+    
+    # Step 2: Process PDB structures
+    print("\n[2/5] Extracting educational concepts from PDB structures...")
+    all_concepts = mapper.process_pdb_files(args.source)
+    print(f"   ✓ Extracted concepts from {len(all_concepts)} structures")
+    
+    concept_map, lesson_templates = save_framework(mapper, all_concepts, hierarchy)
+    
     # Final summary
     print("\n" + "=" * 70)
     print("FRAMEWORK CREATION COMPLETE!")
@@ -367,6 +406,8 @@ def main():
     print(f"   • concept_map.json - Frequency and examples")
     print(f"   • lesson_templates.json - Complete lesson plans")
     print(f"   • extracted_concepts.json - Detailed concept data")
+    print("   • catalog.sqlite - Indexed catalog used by query.py")
+    print("   • framework.snapshot - Binary copy the query scripts load at start-up")
     print(f"   • teacher_guide.md - Guide for educators")
     print(f"\n🎯 Next steps:")
     print(f"   1. Review concept_hierarchy.json to understand learning progression")
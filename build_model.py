@@ -1,8 +1,9 @@
-import json
+import argparse
 import os
 import pandas as pd
 import numpy as np
-from pathlib import Path
+from entry_pack import count_entries, iter_entries
+from feature_schema import extract_model_features as extract_features
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestRegressor
@@ -17,70 +18,40 @@ OUTPUT_DIR = "./model_data"
 # Create output directory
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-def extract_features(json_data):
-    """Extract features from PDB JSON data"""
-    features = {}
-    
-    try:
-        # Basic structure info
-        struct_data = json_data.get('struct', {})
-        features['title'] = struct_data.get('title', '')
-        
-        # Polymer info
-        poly_data = json_data.get('polymer', {})
-        features['polymer_count'] = len(poly_data.get('pdb_chains', []))
-        
-        # Get average monomer count
-        monomer_counts = []
-        for chain_data in poly_data.get('pdb_chains', []):
-            monomer_counts.append(len(chain_data.get('monomers', [])))
-        features['avg_monomers'] = np.mean(monomer_counts) if monomer_counts else 0
-        features['max_monomers'] = np.max(monomer_counts) if monomer_counts else 0
-        
-        # Crystallography info
-        exptl_data = json_data.get('exptl', [{}])[0]
-        features['resolution'] = float(exptl_data.get('resolution', 0)) if exptl_data.get('resolution') else 0
-        
-        # Release date (convert to numerical days since epoch)
-        release_date = json_data.get('rcsb_accession_info', {}).get('release_date', '')
-        features['has_release_date'] = 1 if release_date else 0
-        
-        return features
-    except Exception as e:
-        print(f"Error extracting features: {e}")
-        return None
-
 def load_json_files(directory):
-    """Load all JSON files from directory"""
+    """Load all JSON files from directory (or an entry pack)"""
     data = []
-    files = list(Path(directory).glob("*.json"))
+    total = count_entries(directory)
     
-    print(f"Loading {len(files)} JSON files...")
+    print(f"Loading {total} JSON files...")
     
-    for i, json_file in enumerate(files):
+    def report_error(pdb_id, e):
+        print(f"Error loading {pdb_id}: {e}")
+    
+    for i, (pdb_id, json_data) in enumerate(iter_entries(directory, on_error=report_error)):
         if i % 100 == 0:
-            print(f"  Processed {i}/{len(files)}")
+            print(f"  Processed {i}/{total}")
         
-        try:
-            with open(json_file, 'r') as f:
-                json_data = json.load(f)
-                features = extract_features(json_data)
-                if features:
-                    features['pdb_id'] = json_file.stem
-                    data.append(features)
-        except Exception as e:
-            print(f"Error loading {json_file}: {e}")
+        features = extract_features(json_data)
+        if features:
+            features['pdb_id'] = pdb_id
+            data.append(features)
     
     return data
 
 def main():
+    parser = argparse.ArgumentParser(description='Train a model on features extracted from PDB entry JSON')
+    parser.add_argument('--source', default=JSON_DIR,
+                        help=f'Directory of <ID>.json files or an entry pack (default: {JSON_DIR})')
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("PDB Model Builder")
     print("=" * 60)
     
     # Load data
     print("\n1. Loading JSON files...")
-    raw_data = load_json_files(JSON_DIR)
+    raw_data = load_json_files(args.source)
     print(f"   Loaded {len(raw_data)} records")
     
     # Create DataFrame
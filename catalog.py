@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Structure Catalog
+Indexed SQLite copy of the educational framework and the model features,
+so query.py answers lookups and filters with index queries instead of
+loading and scanning extracted_concepts.json.
+
+Tables:
+  structures          one row per structure, in extracted_concepts.json order
+  concepts            concept names with their frequency and most-common rank
+  structure_concepts  which concepts each structure teaches (and in what order)
+  concept_sets        how many structures share each distinct set of concepts
+  features            model features (model_data/features.cols or features.json)
+  statistics          per-complexity and per-method counts for --stats
+  bitmaps             compressed bitsets of structure ids per concept, method and
+                      complexity level, for boolean searches (bitmap_index.py)
+  title_terms         BM25 postings of the words in structure titles (text_index.py)
+  meta                format version, totals and the source files it was built from
+
+build_educational_model.py writes the catalog; query.py rebuilds it from the
+JSON files whenever they are newer than the catalog.
+
+Usage:
+  python3 catalog.py build
+  python3 catalog.py info
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+
+import json_codec
+import text_index
+from bitmap_index import COMPLEXITY, CONCEPT, METHOD, Bitmap
+
+FRAMEWORK_DIR = "./educational_framework"
+CATALOG_PATH = os.path.join(FRAMEWORK_DIR, "catalog.sqlite")
+CONCEPT_MAP = os.path.join(FRAMEWORK_DIR, "concept_map.json")
+EXTRACTED_CONCEPTS = os.path.join(FRAMEWORK_DIR, "extracted_concepts.json")
+FEATURE_STORE = "./model_data/features.cols"
+FEATURES_JSON = "./model_data/features.json"
+CATALOG_VERSION = 3
+
+SQL_TYPES = {'str': 'TEXT', 'd': 'REAL', 'i': 'INTEGER', 'b': 'INTEGER'}
+
+SCHEMA = """
+CREATE TABLE structures (
+    id                       INTEGER PRIMARY KEY,
+    pdb_id                   TEXT NOT NULL,
+    title                    TEXT,
+    complexity_level         TEXT,
+    student_audience         TEXT,
+    key_learning_objectives  TEXT
+);
+CREATE TABLE concepts (
+    id         INTEGER PRIMARY KEY,
+    name       TEXT NOT NULL UNIQUE,
+    frequency  INTEGER NOT NULL,
+    rank       INTEGER
+);
+CREATE TABLE structure_concepts (
+    concept_id    INTEGER NOT NULL,
+    structure_id  INTEGER NOT NULL,
+    position      INTEGER NOT NULL,
+    PRIMARY KEY (concept_id, structure_id)
+) WITHOUT ROWID;
+CREATE TABLE concept_sets (
+    concept_ids  TEXT PRIMARY KEY,
+    count        INTEGER NOT NULL
+);
+CREATE TABLE statistics (
+    kind   TEXT NOT NULL,
+    name   TEXT NOT NULL,
+    count  INTEGER NOT NULL,
+    PRIMARY KEY (kind, name)
+);
+CREATE TABLE bitmaps (
+    kind   TEXT NOT NULL,
+    name   TEXT NOT NULL,
+    count  INTEGER NOT NULL,
+    bits   BLOB NOT NULL,
+    PRIMARY KEY (kind, name)
+);
+CREATE TABLE title_terms (
+    term     TEXT PRIMARY KEY,
+    df       INTEGER NOT NULL,
+    ids      BLOB NOT NULL,
+    weights  BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE meta (
+    name   TEXT PRIMARY KEY,
+    value  TEXT
+)
+"""
+
+INDEXES = """
+CREATE UNIQUE INDEX structures_pdb_id ON structures (pdb_id);
+CREATE INDEX structures_complexity ON structures (complexity_level);
+CREATE INDEX structure_concepts_structure ON structure_concepts (structure_id, position);
+CREATE INDEX features_pdb_id ON features (pdb_id);
+CREATE INDEX features_method ON features (method);
+CREATE INDEX features_resolution ON features (resolution)
+"""
+
+# show_statistics() method groups
+XRAY = 'X-ray Crystallography'
+CRYO_EM = 'Cryo-EM'
+
+
+def method_group(concepts):
+    """Experimental method group of a structure, from the first concept naming one"""
+    for concept in concepts:
+        concept = concept.lower()
+        if 'x-ray' in concept or 'crystallography' in concept:
+            return XRAY
+        elif 'cryo' in concept or 'em' in concept:
+            return CRYO_EM
+    return None
+
+
+def default_sources():
+    """Files the default catalog is built from"""
+    features = os.path.join(FEATURE_STORE, "meta.json")
+    if not os.path.exists(features):
+        features = FEATURES_JSON
+    return [CONCEPT_MAP, EXTRACTED_CONCEPTS, features]
+
+
+def build_catalog(concept_map, all_concepts, feature_records=(), path=CATALOG_PATH, sources=None):
+    """Write the catalog for a framework (and optional feature records); returns the structure count"""
+    from feature_schema import FEATURE_SCHEMA
+    from feature_store import schema_columns  # build-time only, kept off the query start-up path
+
+    tmp = path + '.tmp'
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.executescript(SCHEMA)
+        columns = schema_columns(FEATURE_SCHEMA)
+        conn.execute("CREATE TABLE features (" + ', '.join(
+            f"{name} {SQL_TYPES[typecode]}" for name, (typecode, _) in columns.items()) + ")")
+
+        ranks = {name: rank for rank, (name, _) in enumerate(concept_map.get('most_common_concepts', []))}
+        concept_ids = {}
+        links = []
+        concept_sets = {}
+        complexity = {}
+        methods = {}
+        ordinals = {CONCEPT: {}, METHOD: {}, COMPLEXITY: {}}
+        for structure_id, data in enumerate(all_concepts):
+            ids = []
+            for position, concept in enumerate(dict.fromkeys(data.get('concepts', []))):
+                if concept not in concept_ids:
+                    concept_ids[concept] = len(concept_ids)
+                ids.append(concept_ids[concept])
+                links.append((concept_ids[concept], structure_id, position))
+                ordinals[CONCEPT].setdefault(concept, []).append(structure_id)
+            key = ','.join(map(str, sorted(ids)))
+            concept_sets[key] = concept_sets.get(key, 0) + 1
+            level = data.get('complexity_level', 'Unknown')
+            complexity[level] = complexity.get(level, 0) + 1
+            ordinals[COMPLEXITY].setdefault(level, []).append(structure_id)
+            group = method_group(data.get('concepts', []))
+            if group:
+                methods[group] = methods.get(group, 0) + 1
+
+        conn.executemany(
+            "INSERT INTO structures VALUES (?, ?, ?, ?, ?, ?)",
+            ((structure_id, data['pdb_id'], data.get('title'), data.get('complexity_level'),
+              json_codec.dumps(data.get('student_audience', [])),
+              json_codec.dumps(data.get('key_learning_objectives', [])))
+             for structure_id, data in enumerate(all_concepts)))
+        frequency = {}
+        for concept_id, _, _ in links:
+            frequency[concept_id] = frequency.get(concept_id, 0) + 1
+        conn.executemany("INSERT INTO concepts VALUES (?, ?, ?, ?)",
+                         ((concept_id, name, frequency[concept_id], ranks.get(name))
+                          for name, concept_id in concept_ids.items()))
+        conn.executemany("INSERT INTO structure_concepts VALUES (?, ?, ?)", links)
+        conn.executemany("INSERT INTO concept_sets VALUES (?, ?)", concept_sets.items())
+        structure_ids = {data['pdb_id']: structure_id for structure_id, data in enumerate(all_concepts)}
+
+        def feature_rows():
+            for record in feature_records:
+                if record.get('pdb_id') in structure_ids:
+                    method = record.get('method', 'UNKNOWN')
+                    ordinals[METHOD].setdefault(method, []).append(structure_ids[record['pdb_id']])
+                yield tuple(record.get(name, default) for name, (_, default) in columns.items())
+
+        conn.executemany("INSERT INTO features VALUES (" + ', '.join('?' * len(columns)) + ")",
+                         feature_rows())
+        size = len(all_concepts)
+        conn.executemany("INSERT INTO bitmaps VALUES (?, ?, ?, ?)",
+                         ((kind, name, len(ids), Bitmap.from_ordinals(ids, size).to_blob())
+                          for kind, names in ordinals.items() for name, ids in names.items()))
+        conn.executemany("INSERT INTO statistics VALUES (?, ?, ?)",
+                         [('complexity', name, count) for name, count in complexity.items()] +
+                         [('method', name, count) for name, count in methods.items()])
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ('version', str(CATALOG_VERSION)),
+            ('structures', str(len(all_concepts))),
+            ('total_concepts', str(concept_map.get('total_concepts', len(concept_ids)))),
+            ('sources', json_codec.dumps(json_codec.signature(sources or []))),
+            ('built_at', str(time.time())),
+        ])
+        conn.executemany("INSERT INTO title_terms VALUES (?, ?, ?, ?)",
+                         ((term, len(ids), text_index.to_blob(ids), text_index.to_blob(weights))
+                          for term, (ids, weights) in
+                          text_index.build_postings(data.get('title') for data in all_concepts).items()))
+        conn.executescript(INDEXES)
+        conn.commit()
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+    return len(all_concepts)
+
+
+def write_catalog(concept_map, all_concepts, path=CATALOG_PATH):
+    """Build the default catalog from a framework plus the model features, if extracted"""
+    from feature_store import load_features
+
+    sources = default_sources()
+    try:
+        with load_features(FEATURE_STORE, FEATURES_JSON) as features:
+            return build_catalog(concept_map, all_concepts, features.records(), path, sources)
+    except FileNotFoundError:
+        return build_catalog(concept_map, all_concepts, (), path, sources)
+
+
+def build_from_files(path=CATALOG_PATH):
+    """Build the default catalog from the framework files (or their snapshot) and the feature store"""
+    from framework_snapshot import load_framework
+
+    return write_catalog(*load_framework('concept_map', 'extracted_concepts'), path)
+
+
+class Catalog:
+    """Read-only queries against a catalog file"""
+
+    def __init__(self, path=CATALOG_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        self.meta = dict(self.conn.execute("SELECT name, value FROM meta"))
+        if int(self.meta.get('version', 0)) != CATALOG_VERSION:
+            self.conn.close()
+            raise ValueError(f"{path}: unsupported catalog version {self.meta.get('version')}")
+
+    def __len__(self):
+        return int(self.meta['structures'])
+
+    def is_fresh(self):
+        """True if the files it was built from are unchanged"""
+        recorded = json_codec.decode(self.meta['sources'])
+        return bool(recorded) and json_codec.signature(recorded) == recorded
+
+    def structure(self, pdb_id):
+        """The extracted_concepts.json record of a structure, or None"""
+        row = self.conn.execute(
+            "SELECT id, pdb_id, title, complexity_level, student_audience, key_learning_objectives "
+            "FROM structures WHERE pdb_id = ?", (pdb_id,)).fetchone()
+        if row is None:
+            return None
+        structure_id, pdb_id, title, complexity, audience, objectives = row
+        return {
+            'pdb_id': pdb_id,
+            'concepts': self.concepts_of(structure_id),
+            'complexity_level': complexity,
+            'student_audience': json_codec.decode(audience),
+            'key_learning_objectives': json_codec.decode(objectives),
+            'title': title,
+        }
+
+    def concepts_of(self, structure_id, limit=-1):
+        rows = self.conn.execute(
+            "SELECT c.name FROM structure_concepts sc JOIN concepts c ON c.id = sc.concept_id "
+            "WHERE sc.structure_id = ? ORDER BY sc.position LIMIT ?", (structure_id, limit))
+        return [name for name, in rows]
+
+    def common_concepts(self, text):
+        """[(name, frequency)] of most-common concepts whose name contains text, by rank"""
+        rows = self.conn.execute(
+            "SELECT name, frequency FROM concepts WHERE rank IS NOT NULL AND instr(lower(name), ?) "
+            "ORDER BY rank", (text.lower(),))
+        return rows.fetchall()
+
+    def concept_examples(self, name, among=10, limit=3):
+        """PDB ids of the first `among` structures that have the concept"""
+        rows = self.conn.execute(
+            "SELECT s.pdb_id FROM structure_concepts sc JOIN structures s ON s.id = sc.structure_id "
+            "WHERE sc.concept_id = (SELECT id FROM concepts WHERE name = ?) AND sc.structure_id < ? "
+            "ORDER BY sc.structure_id LIMIT ?", (name, among, limit))
+        return [pdb_id for pdb_id, in rows]
+
+    def with_concept_matching(self, text, limit=10):
+        """(count, first rows) of structures having any concept whose name contains text.
+
+        Rows are (id, pdb_id, title, complexity_level) in catalog order.
+        """
+        matches = self.conn.execute("SELECT id, frequency FROM concepts WHERE instr(lower(name), ?)",
+                                    (text.lower(),)).fetchall()
+        if not matches:
+            return 0, []
+        ids = [concept_id for concept_id, _ in matches]
+        if len(ids) == 1:
+            count = matches[0][1]
+        else:
+            # Structures with any of the concepts, summed over the (few) distinct concept sets
+            wanted = set(ids)
+            count = sum(n for key, n in self.conn.execute("SELECT concept_ids, count FROM concept_sets")
+                        if key and wanted.intersection(map(int, key.split(','))))
+        # First `limit` structures of each concept, walking the (concept_id, structure_id) key
+        first = ' UNION '.join(["SELECT * FROM (SELECT structure_id FROM structure_concepts "
+                                "WHERE concept_id = ? ORDER BY structure_id LIMIT ?)"] * len(ids))
+        rows = self.conn.execute(
+            f"SELECT id, pdb_id, title, complexity_level FROM structures WHERE id IN ({first}) "
+            f"ORDER BY id LIMIT ?",
+            [value for concept_id in ids for value in (concept_id, limit)] + [limit]).fetchall()
+        return count, rows
+
+    def with_complexity_matching(self, text, limit=10):
+        """(count, first rows) of structures whose complexity level contains text"""
+        counts = self.statistics('complexity')
+        levels = [level for level in counts if text.lower() in level.lower()]
+        if not levels:
+            return 0, []
+        marks = ', '.join('?' * len(levels))
+        rows = self.conn.execute(
+            f"SELECT id, pdb_id, title, complexity_level FROM structures "
+            f"WHERE complexity_level IN ({marks}) ORDER BY id LIMIT ?", levels + [limit]).fetchall()
+        return sum(counts[level] for level in levels), rows
+
+    def bitmap_names(self, kind):
+        """Names that have a bitmap of the given kind (concept, method or complexity)"""
+        rows = self.conn.execute("SELECT name FROM bitmaps WHERE kind = ? ORDER BY name", (kind,))
+        return [name for name, in rows]
+
+    def bitmap_blob(self, kind, name):
+        row = self.conn.execute("SELECT bits FROM bitmaps WHERE kind = ? AND name = ?", (kind, name)).fetchone()
+        if row is None:
+            raise KeyError((kind, name))
+        return row[0]
+
+    def rows(self, structure_ids, batch=256):
+        """(id, pdb_id, title, complexity_level) for each id, fetched in batches as consumed"""
+        structure_ids = iter(structure_ids)
+        while True:
+            ids = [structure_id for _, structure_id in zip(range(batch), structure_ids)]
+            if not ids:
+                return
+            marks = ', '.join('?' * len(ids))
+            yield from self.conn.execute(
+                f"SELECT id, pdb_id, title, complexity_level FROM structures WHERE id IN ({marks}) ORDER BY id",
+                ids)
+
+    def search_titles(self, text, limit=10):
+        """Top `limit` structures for the words of text, by BM25 score of their titles.
+
+        Rows are (id, pdb_id, title, complexity_level, score); structures need
+        not contain every word, but those with more (and rarer) ones rank first.
+        """
+        terms = list(dict.fromkeys(text_index.tokenize(text)))
+        if not terms:
+            return []
+        marks = ', '.join('?' * len(terms))
+        postings = self.conn.execute(f"SELECT ids, weights FROM title_terms WHERE term IN ({marks})",
+                                     terms).fetchall()
+        best = text_index.top_k(postings, len(self), limit)
+        rows = {row[0]: row for row in self.rows(sorted(structure_id for structure_id, _ in best))}
+        return [rows[structure_id] + (score,) for structure_id, score in best]
+
+    def statistics(self, kind):
+        """{name: count} precomputed for 'complexity' or 'method'"""
+        rows = self.conn.execute("SELECT name, count FROM statistics WHERE kind = ?", (kind,))
+        return dict(rows)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_catalog(path=CATALOG_PATH, rebuild=True):
+    """Open the catalog, (re)building it from the JSON files if it is missing or stale.
+
+    Raises FileNotFoundError if neither the catalog nor its JSON sources exist.
+    """
+    if os.path.exists(path):
+        try:
+            catalog = Catalog(path)
+        except ValueError:
+            if not rebuild:
+                raise
+        else:
+            if catalog.is_fresh() or not rebuild:
+                return catalog
+            catalog.close()
+    elif not rebuild:
+        raise FileNotFoundError(path)
+    build_from_files(path)
+    return Catalog(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or inspect the indexed structure catalog')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_build = sub.add_parser('build', help='Build the catalog from the framework JSON and the feature store')
+    p_build.add_argument('-o', '--output', default=CATALOG_PATH)
+    p_info = sub.add_parser('info', help='Show catalog contents and freshness')
+    p_info.add_argument('catalog', nargs='?', default=CATALOG_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        count = build_from_files(args.output)
+        print(f"✓ Catalogued {count} structures in {args.output} ({time.perf_counter() - start:.1f}s)")
+    elif args.command == 'info':
+        with Catalog(args.catalog) as catalog:
+            print(f"Structures: {len(catalog)}")
+            for table in ('concepts', 'structure_concepts', 'features', 'bitmaps', 'title_terms'):
+                count = catalog.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                print(f"  {table:<20} {count} rows")
+            print(f"Fresh: {'yes' if catalog.is_fresh() else 'no (sources changed since it was built)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Compact Records
+In-memory form of extracted_concepts.json for the query scripts. As plain
+JSON every record is a dict holding its own copies of the same few concept,
+audience and learning-objective strings; here the structures are columns:
+
+  pdb_id, title             UTF-8 bytes joined in one buffer + offsets array
+  concepts                  code of the record's concept list; each list also
+                            has a bitmask over the concept codes
+  complexity_level          code into the complexity level table
+  student_audience,         code into a table of the distinct lists
+  key_learning_objectives
+
+so 200k structures take a handful of arrays instead of millions of objects
+(benchmarks.py records compares them with tracemalloc). table[i] and
+iteration give Structure rows, read-only mappings that compute each field
+on access, so code written for the dict records keeps working:
+
+  structures = StructureTable.from_records(json_codec.read(path))
+  row = structures.find('1A02')
+  row.get('concepts', [])
+"""
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+# Fields of an extracted_concepts.json record, in their order in the file
+FIELDS = ('pdb_id', 'concepts', 'complexity_level', 'student_audience', 'key_learning_objectives', 'title')
+_ABSENT = {name: 1 << bit for bit, name in enumerate(FIELDS)}
+
+
+class CodeTable:
+    """Distinct values, each with a small int code"""
+
+    __slots__ = ('values', 'codes')
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __getitem__(self, code):
+        return self.values[code]
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getstate__(self):
+        return self.values
+
+    def __setstate__(self, values):
+        self.values = values
+        self.codes = {value: code for code, value in enumerate(values)}
+
+
+class StringColumn:
+    """A column of str (or None) stored as one UTF-8 buffer with offsets"""
+
+    __slots__ = ('data', 'offsets', 'nones')
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array('I', [0])
+        self.nones = set()
+
+    def append(self, value):
+        if value is None:
+            self.nones.add(len(self))
+        else:
+            self.data += value.encode('utf-8')
+        self.offsets.append(len(self.data))
+
+    def __getitem__(self, row):
+        if row in self.nones:
+            return None
+        return self.data[self.offsets[row]:self.offsets[row + 1]].decode('utf-8')
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getstate__(self):
+        return bytes(self.data), self.offsets, self.nones
+
+    def __setstate__(self, state):
+        data, self.offsets, self.nones = state
+        self.data = bytearray(data)
+
+
+class StructureTable:
+    """extracted_concepts.json records stored column-wise"""
+
+    def __init__(self):
+        self.pdb_ids = StringColumn()
+        self.titles = StringColumn()
+        self.concept_names = CodeTable()      # concept -> bit number
+        self.concept_lists = CodeTable()      # tuples of concept names (None for missing)
+        self.concept_masks = []               # bitmask of each concept list
+        self.levels = CodeTable()
+        self.audiences = CodeTable()
+        self.objectives = CodeTable()
+        self.concept_codes = array('I')
+        self.level_codes = array('I')
+        self.audience_codes = array('I')
+        self.objective_codes = array('I')
+        self.absent = array('B')              # bit per FIELDS entry missing from the record
+        self.extras = {}                      # row -> {key: value} for fields beyond FIELDS
+        self.sorted = True                    # pdb_ids ascending, so find() can bisect
+        self._strings = {}
+
+    @classmethod
+    def from_records(cls, records):
+        table = cls()
+        for record in records:
+            table.append(record)
+        return table
+
+    def _list_code(self, table, values):
+        """Code of a list in a table of tuples; a new tuple shares its strings with the others"""
+        key = tuple(values) if values is not None else None
+        code = table.codes.get(key)
+        if code is None:
+            if key is not None:
+                key = tuple(self._strings.setdefault(value, value) if type(value) is str else value
+                            for value in key)
+            code = table.code(key)
+        return code
+
+    def append(self, record):
+        absent = 0
+        for name in FIELDS:
+            if name not in record:
+                absent |= _ABSENT[name]
+        pdb_id = record.get('pdb_id')
+        # A missing id can't be ordered, so any None leaves the table unsorted for good
+        if pdb_id is None:
+            self.sorted = False
+        elif self.sorted and len(self.pdb_ids):
+            self.sorted = self.pdb_ids[len(self.pdb_ids) - 1] <= pdb_id
+        self.pdb_ids.append(pdb_id)
+        self.titles.append(record.get('title'))
+
+        code = self._list_code(self.concept_lists, record.get('concepts'))
+        if code == len(self.concept_masks):
+            mask = 0
+            for name in self.concept_lists[code] or ():
+                mask |= 1 << self.concept_names.code(name)
+            self.concept_masks.append(mask)
+        self.concept_codes.append(code)
+        self.level_codes.append(self.levels.code(record.get('complexity_level')))
+        self.audience_codes.append(self._list_code(self.audiences, record.get('student_audience')))
+        self.objective_codes.append(self._list_code(self.objectives, record.get('key_learning_objectives')))
+        self.absent.append(absent)
+
+        extra = {key: value for key, value in record.items() if key not in _ABSENT}
+        if extra:
+            self.extras[len(self.absent) - 1] = extra
+
+    def __len__(self):
+        return len(self.absent)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [Structure(self, i) for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return Structure(self, row)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield Structure(self, row)
+
+    def find(self, pdb_id):
+        """The row of a PDB id, or None"""
+        if self.sorted:
+            row = bisect_left(self.pdb_ids, pdb_id)
+            if row < len(self) and self.pdb_ids[row] == pdb_id:
+                return Structure(self, row)
+            return None
+        for row in range(len(self)):
+            if self.pdb_ids[row] == pdb_id:
+                return Structure(self, row)
+        return None
+
+    def concept_mask(self, names):
+        """Bitmask of the given concept names (unknown names have no bit)"""
+        mask = 0
+        for name in names:
+            code = self.concept_names.codes.get(name)
+            if code is not None:
+                mask |= 1 << code
+        return mask
+
+    def with_concepts(self, names, match_all=False):
+        """Rows having any (or, with match_all, every) one of the named concepts"""
+        wanted = self.concept_mask(names)
+        if match_all and len(set(names)) != bin(wanted).count('1'):
+            return  # a concept nobody has
+        hits = [(mask & wanted == wanted) if match_all else bool(mask & wanted) for mask in self.concept_masks]
+        for row, code in enumerate(self.concept_codes):
+            if hits[code]:
+                yield Structure(self, row)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_strings']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._strings = {}
+
+
+def _list(values):
+    return list(values) if values is not None else None
+
+
+class Structure(Mapping):
+    """One row of a StructureTable, read like its extracted_concepts.json record"""
+
+    __slots__ = ('table', 'row')
+
+    _GETTERS = {
+        'pdb_id': lambda t, r: t.pdb_ids[r],
+        'concepts': lambda t, r: _list(t.concept_lists[t.concept_codes[r]]),
+        'complexity_level': lambda t, r: t.levels[t.level_codes[r]],
+        'student_audience': lambda t, r: _list(t.audiences[t.audience_codes[r]]),
+        'key_learning_objectives': lambda t, r: _list(t.objectives[t.objective_codes[r]]),
+        'title': lambda t, r: t.titles[r],
+    }
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    @property
+    def concept_mask(self):
+        return self.table.concept_masks[self.table.concept_codes[self.row]]
+
+    def __getitem__(self, key):
+        getter = self._GETTERS.get(key)
+        if getter is not None and not self.table.absent[self.row] & _ABSENT[key]:
+            return getter(self.table, self.row)
+        extra = self.table.extras.get(self.row)
+        if extra is not None and key in extra:
+            return extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        absent = self.table.absent[self.row]
+        for name in FIELDS:
+            if not absent & _ABSENT[name]:
+                yield name
+        yield from self.table.extras.get(self.row, ())
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"Structure({dict(self)!r})"
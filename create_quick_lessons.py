@@ -3,17 +3,17 @@ QUICK START GUIDE FOR TEACHERS
 Generate ready-to-use lesson outlines from the educational framework
 """
 
-import json
 import os
 
+import json_codec
+
 OUTPUT_DIR = "./educational_framework"
 
 def create_quick_start():
     """Create a quick start guide with immediate lesson ideas"""
     
     # Load the concept map
-    with open(f"{OUTPUT_DIR}/concept_map.json") as f:
-        concept_map = json.load(f)
+    concept_map = json_codec.read(f"{OUTPUT_DIR}/concept_map.json")
     
     # Create quick lesson ideas
     quick_lessons = {
@@ -243,8 +243,7 @@ Resources:
     }
     
     # Save quick start guide
-    with open(f"{OUTPUT_DIR}/quick_start_lessons.json", 'w') as f:
-        json.dump(quick_lessons, f, indent=2)
+    json_codec.write(f"{OUTPUT_DIR}/quick_start_lessons.json", quick_lessons)
     
     # Create a text version too
     text_guide = """
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Concurrent PDB Entry Downloader
+Fetches entry JSON from the RCSB data API with a bounded number of requests
+in flight and a token-bucket rate limit, replacing the sequential curl loop
+(and its fixed 0.2 s sleep) in batch_download_json.sh
+
+A SQLite manifest in the output dir records what was fetched, so re-runs skip
+current entries and only revalidate stale ones with conditional GETs.
+
+--bulk asks the RCSB GraphQL endpoint for many entries per request and splits
+the answer back into per-ID documents. Only the selected fields are fetched
+(by default those read by extract_features.py and build_educational_model.py),
+so bulk documents are a subset of the full REST entry. The manifest records
+them as partial: a later run without --bulk downloads the full entries.
+
+Usage:
+  python3 download_entries.py -f ids.txt -o pdb_data
+  python3 download_entries.py -f ids.txt -o pdb_data --concurrency 16 --rate 20
+  python3 download_entries.py -f ids.txt -o pdb_data --max-age 0   # revalidate everything
+  python3 download_entries.py -f ids.txt -o pdb_data --bulk --batch-size 200
+"""
+
+import argparse
+import asyncio
+import http.client
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import json_codec
+from download_manifest import MANIFEST_NAME, DownloadManifest, conditional_headers
+from feature_schema import FEATURE_SCHEMA, MODEL_SCHEMA, schema_paths
+from http_pool import HTTPPool
+
+# Configuration
+BASE_URL = "https://data.rcsb.org/rest/v1/core/entry"
+GRAPHQL_URL = "https://data.rcsb.org/graphql"
+OUTPUT_DIR = "./pdb_data"
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RATE = 10.0          # requests per second
+DEFAULT_RETRIES = 5
+BACKOFF_BASE = 0.5           # seconds, doubled on every retry
+BACKOFF_MAX = 30.0
+DEFAULT_MAX_AGE_HOURS = 12   # manifest entries younger than this are not re-requested
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Connection failures and broken or truncated responses (IncompleteRead, RemoteDisconnected, ...)
+RETRY_ERRORS = (OSError, http.client.HTTPException)
+DEFAULT_BATCH_SIZE = 100
+
+# Entry fields read by the feature schemas (extract_features.py, build_model.py),
+# which also cover MolecularBiologyConceptMapper.extract_biology_concepts
+DEFAULT_FIELDS = schema_paths(FEATURE_SCHEMA, MODEL_SCHEMA)
+
+
+def iter_ids(path):
+    """Stream PDB ids from a comma- or newline-separated file ('-' for stdin)"""
+    f = sys.stdin if path == '-' else open(path, 'r')
+    try:
+        for line in f:
+            for token in line.split(','):
+                token = token.strip()
+                if token:
+                    yield token
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def read_id_file(path):
+    """Read PDB ids from a comma- or newline-separated file"""
+    return list(iter_ids(path))
+
+
+def _umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# Mode of a newly created file; mkstemp's temp files are 0600 and os.replace keeps that
+FILE_MODE = 0o666 & ~_umask()
+
+
+def write_atomic(path, data):
+    """Write bytes to path via a temp file + rename so readers never see partial files"""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.part')
+    try:
+        os.fchmod(fd, FILE_MODE)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class TokenBucket:
+    """Asyncio token bucket: allows `rate` requests per second with bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def build_selection(fields):
+    """Turn dotted field paths into a GraphQL selection set"""
+    tree = {}
+    for field in fields:
+        node = tree
+        for part in field.strip().split('.'):
+            node = node.setdefault(part, {})
+
+    def render(node):
+        return ' '.join(name + (' { ' + render(child) + ' }' if child else '')
+                        for name, child in node.items())
+
+    if 'rcsb_id' not in tree:
+        tree = {'rcsb_id': {}, **tree}
+    return render(tree)
+
+
+def build_entries_query(fields):
+    """GraphQL query fetching the selected fields for a list of entry ids"""
+    return "query($ids: [String!]!) { entries(entry_ids: $ids) { " + build_selection(fields) + " } }"
+
+
+def drop_nulls(value):
+    """Remove null members so GraphQL records match the REST shape, where absent keys are omitted"""
+    if isinstance(value, dict):
+        return {k: drop_nulls(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [drop_nulls(v) for v in value if v is not None]
+    return value
+
+
+def batched(iterable, size):
+    """Yield lists of up to size items"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def feed_queue(queue, items, workers):
+    """Put every item on the queue, then one None per worker to stop it"""
+    for item in items:
+        await queue.put(item)
+    for _ in range(workers):
+        await queue.put(None)
+
+
+def retry_delay(attempt, retry_after=None):
+    """Exponential backoff with jitter, honouring a Retry-After header when given"""
+    if retry_after:
+        try:
+            return min(BACKOFF_MAX, float(retry_after))
+        except ValueError:
+            pass
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+    return delay * (0.5 + random.random() / 2)
+
+
+class EntryDownloader:
+    """Downloads entry JSON documents concurrently into an output directory"""
+
+    def __init__(self, outdir=OUTPUT_DIR, base_url=BASE_URL, concurrency=DEFAULT_CONCURRENCY,
+                 rate=DEFAULT_RATE, retries=DEFAULT_RETRIES, timeout=30,
+                 manifest=None, max_age=None, batch_size=None, fields=None,
+                 graphql_url=GRAPHQL_URL, on_entry=None, write_files=True):
+        self.outdir = outdir
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = max(1, int(concurrency))
+        self.rate = rate
+        self.retries = retries
+        self.pool = HTTPPool(timeout=timeout)
+        self.manifest = manifest
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.graphql_url = graphql_url
+        self.query = build_entries_query(fields or DEFAULT_FIELDS)
+        # Optional coroutine on_entry(pdb_id, body) receiving every downloaded document
+        self.on_entry = on_entry
+        self.write_files = write_files
+        self.stats = {'downloaded': 0, 'not_modified': 0, 'skipped': 0,
+                      'failed': 0, 'retries': 0, 'bytes': 0}
+        self.failed_ids = []
+        self._done = 0
+
+    def _send(self, url, method, headers, body):
+        return self.pool.request(url, method=method, headers=headers, body=body)
+
+    async def request(self, url, method='GET', headers=None, body=None):
+        """Send one request, retrying on 429/5xx, connection errors and broken responses.
+
+        Returns (status, headers, body); status is None if every attempt
+        failed at the connection level.
+        """
+        loop = asyncio.get_running_loop()
+        status, response_headers, response_body = None, {}, b''
+
+        for attempt in range(self.retries + 1):
+            await self.bucket.acquire()
+            try:
+                status, response_headers, response_body = await loop.run_in_executor(
+                    self.executor, self._send, url, method, headers, body)
+            except RETRY_ERRORS as e:
+                status, response_headers, response_body = None, {}, (str(e) or repr(e)).encode()
+
+            if status is not None and status not in RETRY_STATUSES:
+                break
+            if attempt < self.retries:
+                self.stats['retries'] += 1
+                await asyncio.sleep(retry_delay(attempt, response_headers.get('retry-after')))
+
+        return status, response_headers, response_body
+
+    async def fetch(self, pdb_id, headers=None):
+        """GET one entry from the REST endpoint"""
+        return await self.request(f"{self.base_url}/{pdb_id}", headers=headers)
+
+    async def fetch_batch(self, ids):
+        """Fetch many entries with one GraphQL query.
+
+        Returns (status, {ID: record}) with records in the REST entry shape.
+        """
+        payload = json_codec.encode({'query': self.query, 'variables': {'ids': ids}})
+        status, _, body = await self.request(
+            self.graphql_url, method='POST', body=payload,
+            headers={'Content-Type': 'application/json'})
+        if status != 200:
+            return status, {}
+
+        result = json_codec.decode(body)
+        if result.get('errors') and not result.get('data'):
+            print(f"  ✗ GraphQL error: {result['errors'][0].get('message')}")
+            return status, {}
+        entries = (result.get('data') or {}).get('entries') or []
+        return status, {entry['rcsb_id']: drop_nulls(entry) for entry in entries if entry}
+
+    async def download_one(self, pdb_id):
+        """Download one entry to <outdir>/<ID>.json; returns True on success"""
+        path = os.path.join(self.outdir, f"{pdb_id}.json")
+        headers = None
+        if self.manifest is not None:
+            action, row = self.manifest.plan(pdb_id, path, self.max_age)
+            if action == 'skip':
+                self.stats['skipped'] += 1
+                return True
+            if action == 'revalidate':
+                headers = conditional_headers(row)
+
+        status, response_headers, body = await self.fetch(pdb_id, headers)
+        if status == 304 and headers:
+            self.stats['not_modified'] += 1
+            self.manifest.record_not_modified(pdb_id)
+            return True
+        if status == 200:
+            if self.write_files:
+                write_atomic(path, body)
+            self.stats['downloaded'] += 1
+            self.stats['bytes'] += len(body)
+            if self.manifest is not None:
+                self.manifest.record_success(pdb_id, body,
+                                             etag=response_headers.get('etag'),
+                                             last_modified=response_headers.get('last-modified'))
+            if self.on_entry is not None:
+                await self.on_entry(pdb_id, body)
+            return True
+
+        self._record_failure(pdb_id, f"HTTP {status}" if status else body.decode(errors='replace'))
+        print(f"  ✗ Failed to download {self.base_url}/{pdb_id} (status {status})")
+        return False
+
+    def _record_failure(self, pdb_id, error):
+        if self.manifest is not None:
+            self.manifest.record_failure(pdb_id, error)
+        self.stats['failed'] += 1
+        self.failed_ids.append(pdb_id)
+
+    async def download_batch(self, ids):
+        """Download a batch of entries through one GraphQL request"""
+        wanted = []
+        for pdb_id in ids:
+            path = os.path.join(self.outdir, f"{pdb_id}.json")
+            if (self.manifest is not None
+                    and self.manifest.plan(pdb_id, path, self.max_age, partial_ok=True)[0] == 'skip'):
+                self.stats['skipped'] += 1
+            else:
+                wanted.append(pdb_id)
+        if not wanted:
+            return
+
+        status, records = await self.fetch_batch(wanted)
+        for pdb_id in wanted:
+            record = records.get(pdb_id.upper())
+            if record is None:
+                self._record_failure(pdb_id, f"HTTP {status}" if status != 200 else "not in bulk response")
+                print(f"  ✗ Failed to download {pdb_id} in bulk (status {status})")
+                continue
+            body = json_codec.encode(record)
+            if self.write_files:
+                write_atomic(os.path.join(self.outdir, f"{pdb_id}.json"), body)
+            self.stats['downloaded'] += 1
+            self.stats['bytes'] += len(body)
+            if self.manifest is not None:
+                self.manifest.record_success(pdb_id, body, partial=True)
+            if self.on_entry is not None:
+                await self.on_entry(pdb_id, body)
+
+    async def _worker(self, queue):
+        while True:
+            item = await queue.get()
+            try:
+                if item is None:
+                    return
+                batch = item if self.batch_size else [item]
+                try:
+                    if self.batch_size:
+                        await self.download_batch(item)
+                    else:
+                        await self.download_one(item)
+                except Exception as e:
+                    # One bad entry must not take the worker (and with it the run) down
+                    for pdb_id in batch:
+                        self._record_failure(pdb_id, repr(e))
+                    print(f"  ✗ Failed to download {', '.join(batch[:3])}"
+                          f"{' ...' if len(batch) > 3 else ''}: {e!r}")
+                count = len(batch)
+                previous = self._done
+                self._done += count
+                if self._done // 100 > previous // 100:
+                    print(f"  Processed {self._done} entries")
+            finally:
+                queue.task_done()
+
+    async def run(self, ids):
+        """Download every id from an iterable, keeping at most `concurrency` in flight"""
+        if self.write_files:
+            os.makedirs(self.outdir, exist_ok=True)
+        self.bucket = TokenBucket(self.rate)
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.concurrency)]
+
+        items = batched(ids, self.batch_size) if self.batch_size else ids
+        producer = asyncio.create_task(feed_queue(queue, items, len(workers)))
+        try:
+            # Fails as soon as the producer or any worker does, instead of
+            # leaving the other side waiting on the queue forever
+            await asyncio.gather(producer, *workers)
+        finally:
+            for task in (producer, *workers):
+                task.cancel()
+            self.executor.shutdown(wait=True)
+            self.pool.close()
+            if self.manifest is not None:
+                self.manifest.commit()
+
+        return self.stats
+
+
+def download_entries(ids, outdir=OUTPUT_DIR, **options):
+    """Synchronous wrapper: download ids and return (stats, failed_ids)"""
+    downloader = EntryDownloader(outdir=outdir, **options)
+    stats = asyncio.run(downloader.run(ids))
+    return stats, downloader.failed_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Download PDB entry JSON from the RCSB data API concurrently'
+    )
+    parser.add_argument('-f', '--file', required=True,
+                        help="File containing a comma- or newline-separated list of PDB ids ('-' for stdin)")
+    parser.add_argument('-o', '--outdir', default=OUTPUT_DIR, help=f'Output dir (default: {OUTPUT_DIR})')
+    parser.add_argument('--base-url', default=BASE_URL, help=f'Entry endpoint (default: {BASE_URL})')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f'Maximum requests in flight (default: {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                        help=f'Maximum requests per second, 0 for unlimited (default: {DEFAULT_RATE})')
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                        help=f'Retries on 429/5xx responses (default: {DEFAULT_RETRIES})')
+    parser.add_argument('--manifest', help=f'Manifest path (default: <outdir>/{MANIFEST_NAME})')
+    parser.add_argument('--no-manifest', action='store_true',
+                        help='Fetch every id unconditionally without recording a manifest')
+    parser.add_argument('--max-age', type=float, default=DEFAULT_MAX_AGE_HOURS,
+                        help='Hours before a downloaded entry is revalidated '
+                             f'(default: {DEFAULT_MAX_AGE_HOURS})')
+    parser.add_argument('--bulk', action='store_true',
+                        help='Fetch many entries per request through the GraphQL endpoint')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Entries per bulk request (default: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--fields', help='Comma-separated dotted field paths for bulk mode '
+                                         '(default: the fields the extractors read)')
+    parser.add_argument('--graphql-url', default=GRAPHQL_URL,
+                        help=f'GraphQL endpoint for bulk mode (default: {GRAPHQL_URL})')
+    args = parser.parse_args()
+
+    ids = iter_ids(args.file)
+    print(f"Downloading entries listed in {args.file} to {args.outdir} "
+          f"({args.concurrency} concurrent, {args.rate:g} req/s)")
+
+    manifest = None
+    if not args.no_manifest:
+        os.makedirs(args.outdir, exist_ok=True)
+        manifest = DownloadManifest(args.manifest or os.path.join(args.outdir, MANIFEST_NAME))
+
+    start = time.perf_counter()
+    try:
+        stats, failed = download_entries(
+            ids, outdir=args.outdir, base_url=args.base_url,
+            concurrency=args.concurrency, rate=args.rate, retries=args.retries,
+            manifest=manifest, max_age=args.max_age * 3600,
+            batch_size=args.batch_size if args.bulk else None,
+            fields=args.fields.split(',') if args.fields else None,
+            graphql_url=args.graphql_url,
+        )
+    finally:
+        if manifest is not None:
+            manifest.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"\n✓ Downloaded {stats['downloaded']} entries "
+          f"({stats['bytes'] / 1e6:.1f} MB) in {elapsed:.1f}s")
+    if stats['skipped'] or stats['not_modified']:
+        print(f"  Skipped {stats['skipped']} current entries, "
+              f"{stats['not_modified']} unchanged since last fetch (304)")
+    if stats['retries']:
+        print(f"  Retried {stats['retries']} requests")
+    if failed:
+        print(f"✗ {len(failed)} entries failed: {', '.join(failed[:10])}"
+              + (" ..." if len(failed) > 10 else ""))
+        sys.exit(1)
+    print("Download complete!")
+
+
+if __name__ == "__main__":
+    main()
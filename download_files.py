@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Pooled Structure File Downloader
+Python replacement for batch_download.sh: fetches every requested format for
+every id from files.rcsb.org/download in one process over keep-alive
+connections, streams the gzip bodies straight to disk and reports per-format
+throughput at the end
+
+When the entry JSON for an id is already in --entry-dir (pdb_data/ by
+default), formats that cannot exist for it are never requested: sf.cif.gz
+only for diffraction, mr.gz / mr.str.gz only for NMR, pdb.gz / pdb1.gz only
+for structures that fit the legacy PDB format.
+
+Usage:
+  python3 download_files.py -f ids.txt -o structures -c -A
+  python3 download_files.py -f ids.txt -o structures -c -p -x --per-host 4
+  python3 download_files.py -f ids.txt -o structures -s -m --no-skip
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import urllib.parse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import json_codec
+from download_entries import (FILE_MODE, RETRY_ERRORS, RETRY_STATUSES, TokenBucket, feed_queue,
+                              iter_ids, retry_delay)
+from http_pool import HTTPPool
+
+# Configuration
+BASE_URL = "https://files.rcsb.org/download"
+DEFAULT_CONCURRENCY = 8
+DEFAULT_PER_HOST = 6
+DEFAULT_RATE = 20.0
+DEFAULT_RETRIES = 3
+BLOCK_SIZE = 1 << 16
+ENTRY_DIR = "./pdb_data"
+
+# Legacy PDB format limits; larger entries are mmCIF-only
+PDB_FORMAT_MAX_ATOMS = 99999
+PDB_FORMAT_MAX_CHAINS = 62
+
+# format name -> (batch_download.sh flag, file name pattern, help text)
+FORMATS = {
+    'cif': ('-c', '{id}.cif.gz', 'download a cif.gz file for each PDB id'),
+    'pdb': ('-p', '{id}.pdb.gz', 'download a pdb.gz file for each PDB id (not available for large structures)'),
+    'pdb1': ('-a', '{id}.pdb1.gz', 'download a pdb1.gz file (1st bioassembly) for each PDB id (not available for large structures)'),
+    'assembly1': ('-A', '{id}-assembly1.cif.gz', 'download an assembly1.cif.gz file (1st bioassembly) for each PDB id'),
+    'xml': ('-x', '{id}.xml.gz', 'download a xml.gz file for each PDB id'),
+    'sf': ('-s', '{id}-sf.cif.gz', 'download a sf.cif.gz file for each PDB id (diffraction only)'),
+    'mr': ('-m', '{id}.mr.gz', 'download a mr.gz file for each PDB id (NMR only)'),
+    'mrstr': ('-r', '{id}_mr.str.gz', 'download a mr.str.gz for each PDB id (NMR only)'),
+}
+
+
+def file_name(pdb_id, fmt):
+    return FORMATS[fmt][1].format(id=pdb_id)
+
+
+class FormatStats:
+    """Per-format request counts, bytes and transfer time"""
+
+    def __init__(self):
+        self.files = 0
+        self.missing = 0
+        self.failed = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def throughput(self):
+        """MB/s per connection, averaged over successful transfers"""
+        return self.bytes / 1e6 / self.seconds if self.seconds else 0.0
+
+
+class FileDownloader:
+    """Downloads (id, format) pairs over a shared keep-alive pool"""
+
+    def __init__(self, outdir='.', base_url=BASE_URL, concurrency=DEFAULT_CONCURRENCY,
+                 per_host=DEFAULT_PER_HOST, rate=DEFAULT_RATE, retries=DEFAULT_RETRIES, timeout=60):
+        self.outdir = outdir
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = max(1, int(concurrency))
+        self.per_host = max(1, int(per_host))
+        self.rate = rate
+        self.retries = retries
+        self.pool = HTTPPool(timeout=timeout)
+        self.stats = defaultdict(FormatStats)
+        self.retried = 0
+        self._host_slots = {}
+
+    def _host_slot(self, url):
+        """Semaphore limiting requests in flight to the url's host"""
+        host = urllib.parse.urlsplit(url).netloc
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.per_host)
+        return self._host_slots[host]
+
+    def _stream_to_file(self, url, path):
+        """GET url and stream a 200 body to path atomically; returns (status, bytes, headers)"""
+        response = self.pool.open(url)
+        try:
+            return self._save_response(response, url, path)
+        except BaseException:
+            self.pool.discard(url)  # the connection may be left mid-body
+            raise
+
+    def _save_response(self, response, url, path):
+        headers = {k.lower(): v for k, v in response.getheaders()}
+        if response.status != 200:
+            response.read()  # drain so the connection can be reused
+            return response.status, 0, headers
+
+        nbytes = 0
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.', suffix='.part')
+        try:
+            os.fchmod(fd, FILE_MODE)
+            with os.fdopen(fd, 'wb') as f:
+                while True:
+                    block = response.read(BLOCK_SIZE)
+                    if not block:
+                        break
+                    f.write(block)
+                    nbytes += len(block)
+            # read() just stops if the server closes the connection early
+            expected = headers.get('content-length')
+            if expected is not None and nbytes != int(expected):
+                raise ConnectionError(f"{url}: received {nbytes} of {expected} bytes")
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return 200, nbytes, headers
+
+    async def download_one(self, pdb_id, fmt):
+        """Download one file, retrying on 429/5xx; returns the final HTTP status"""
+        loop = asyncio.get_running_loop()
+        name = file_name(pdb_id, fmt)
+        url = f"{self.base_url}/{name}"
+        path = os.path.join(self.outdir, name)
+        stats = self.stats[fmt]
+        status, headers = None, {}
+
+        for attempt in range(self.retries + 1):
+            await self.bucket.acquire()
+            async with self._host_slot(url):
+                start = time.perf_counter()
+                try:
+                    status, nbytes, headers = await loop.run_in_executor(
+                        self.executor, self._stream_to_file, url, path)
+                except RETRY_ERRORS:
+                    status, nbytes, headers = None, 0, {}
+                elapsed = time.perf_counter() - start
+
+            if status is not None and status not in RETRY_STATUSES:
+                break
+            if attempt < self.retries:
+                self.retried += 1
+                await asyncio.sleep(retry_delay(attempt, headers.get('retry-after')))
+
+        if status == 200:
+            stats.files += 1
+            stats.bytes += nbytes
+            stats.seconds += elapsed
+        elif status == 404:
+            stats.missing += 1
+        else:
+            stats.failed += 1
+            print(f"Failed to download {url} (status {status})")
+        return status
+
+    async def _worker(self, queue):
+        while True:
+            job = await queue.get()
+            try:
+                if job is None:
+                    return
+                try:
+                    await self.download_one(*job)
+                except Exception as e:
+                    # One bad file must not take the worker (and with it the run) down
+                    pdb_id, fmt = job
+                    self.stats[fmt].failed += 1
+                    print(f"Failed to download {file_name(pdb_id, fmt)}: {e!r}")
+            finally:
+                queue.task_done()
+
+    async def run(self, jobs):
+        """Download every (id, format) pair from an iterable"""
+        os.makedirs(self.outdir, exist_ok=True)
+        self.bucket = TokenBucket(self.rate)
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.concurrency)]
+
+        producer = asyncio.create_task(feed_queue(queue, jobs, len(workers)))
+        try:
+            # Fails as soon as the producer or any worker does, instead of
+            # leaving the other side waiting on the queue forever
+            await asyncio.gather(producer, *workers)
+        finally:
+            for task in (producer, *workers):
+                task.cancel()
+            self.executor.shutdown(wait=True)
+            self.pool.close()
+
+        return self.stats
+
+
+def load_entry(entry_dir, pdb_id):
+    """Return the already-downloaded entry JSON for pdb_id, or None"""
+    if not entry_dir:
+        return None
+    try:
+        return json_codec.read(os.path.join(entry_dir, f"{pdb_id}.json"))
+    except (OSError, ValueError):
+        return None
+
+
+def pdb_format_compatible(entry):
+    """True if the entry can be expressed in the legacy PDB format"""
+    flag = entry.get('pdbx_database_status', {}).get('pdb_format_compatible')
+    if flag:
+        return flag == 'Y'
+    info = entry.get('rcsb_entry_info', {})
+    atoms = info.get('deposited_atom_count') or 0
+    chains = info.get('deposited_polymer_entity_instance_count') or 0
+    return atoms <= PDB_FORMAT_MAX_ATOMS and chains <= PDB_FORMAT_MAX_CHAINS
+
+
+def skip_reason(entry, fmt):
+    """Return why fmt cannot exist for this entry, or None if it should be requested"""
+    methods = [e.get('method', '') for e in entry.get('exptl', [])]
+    if fmt == 'sf' and not any('DIFFRACTION' in m or 'CRYSTALLOGRAPHY' in m for m in methods):
+        return 'not diffraction'
+    if fmt in ('mr', 'mrstr') and not any('NMR' in m for m in methods):
+        return 'not NMR'
+    if fmt in ('pdb', 'pdb1') and not pdb_format_compatible(entry):
+        return 'too large for PDB format'
+    if fmt in ('pdb1', 'assembly1') and entry.get('rcsb_entry_info', {}).get('assembly_count') == 0:
+        return 'no assemblies'
+    return None
+
+
+def plan_jobs(ids, formats, entry_dir=None, skipped=None):
+    """Yield (id, format) pairs in id-major order.
+
+    With entry_dir, formats ruled out by the entry metadata are left out and
+    counted in skipped[(format, reason)].
+    """
+    for pdb_id in ids:
+        entry = load_entry(entry_dir, pdb_id)
+        for fmt in formats:
+            reason = skip_reason(entry, fmt) if entry is not None else None
+            if reason:
+                if skipped is not None:
+                    skipped[(fmt, reason)] += 1
+                continue
+            yield pdb_id, fmt
+
+
+def print_report(stats, elapsed):
+    """Print per-format counts and throughput"""
+    print("\n" + "=" * 70)
+    print(f"{'Format':<12}{'Files':>8}{'404':>8}{'Failed':>8}{'MB':>10}{'MB/s/conn':>12}")
+    print("-" * 70)
+    total_bytes = 0
+    for fmt in FORMATS:
+        if fmt not in stats:
+            continue
+        s = stats[fmt]
+        total_bytes += s.bytes
+        print(f"{fmt:<12}{s.files:>8}{s.missing:>8}{s.failed:>8}"
+              f"{s.bytes / 1e6:>10.1f}{s.throughput():>12.2f}")
+    print("-" * 70)
+    rate = total_bytes / 1e6 / elapsed if elapsed else 0.0
+    print(f"Total: {total_bytes / 1e6:.1f} MB in {elapsed:.1f}s ({rate:.2f} MB/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Download structure files from RCSB over pooled keep-alive connections'
+    )
+    parser.add_argument('-f', '--file', required=True,
+                        help="File containing a comma- or newline-separated list of PDB ids ('-' for stdin)")
+    parser.add_argument('-o', '--outdir', default='.', help='Output dir (default: current dir)')
+    for fmt, (flag, _, help_text) in FORMATS.items():
+        parser.add_argument(flag, dest=fmt, action='store_true', help=help_text)
+    parser.add_argument('--base-url', default=BASE_URL, help=f'Download endpoint (default: {BASE_URL})')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f'Total requests in flight (default: {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST,
+                        help=f'Requests in flight per host (default: {DEFAULT_PER_HOST})')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                        help=f'Maximum requests per second, 0 for unlimited (default: {DEFAULT_RATE})')
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                        help=f'Retries on 429/5xx responses (default: {DEFAULT_RETRIES})')
+    parser.add_argument('--entry-dir', default=ENTRY_DIR,
+                        help=f'Entry JSON used to skip inapplicable formats (default: {ENTRY_DIR})')
+    parser.add_argument('--no-skip', action='store_true',
+                        help='Request every format for every id regardless of entry metadata')
+    args = parser.parse_args()
+
+    formats = [fmt for fmt in FORMATS if getattr(args, fmt)]
+    if not formats:
+        print("At least one format flag (-c -p -a -A -x -s -m -r) must be provided")
+        sys.exit(1)
+
+    print(f"Downloading {', '.join(formats)} for ids in {args.file} to {args.outdir}")
+    downloader = FileDownloader(
+        outdir=args.outdir, base_url=args.base_url, concurrency=args.concurrency,
+        per_host=args.per_host, rate=args.rate, retries=args.retries,
+    )
+    skipped = defaultdict(int)
+    entry_dir = None if args.no_skip else args.entry_dir
+    jobs = plan_jobs(iter_ids(args.file), formats, entry_dir=entry_dir, skipped=skipped)
+
+    start = time.perf_counter()
+    stats = asyncio.run(downloader.run(jobs))
+    print_report(stats, time.perf_counter() - start)
+    if downloader.retried:
+        print(f"Retried {downloader.retried} requests")
+    if skipped:
+        print(f"Avoided {sum(skipped.values())} requests using entry metadata:")
+        for (fmt, reason), count in sorted(skipped.items()):
+            print(f"  {fmt}: {count} ({reason})")
+
+
+if __name__ == "__main__":
+    main()
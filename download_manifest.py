@@ -0,0 +1,153 @@
+"""
+Download Manifest
+SQLite record of every fetched entry (status, size, checksum, HTTP validators
+and fetch time) so re-runs skip current files, revalidate stale ones with
+conditional GETs and resume cleanly after a crash
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+
+MANIFEST_NAME = ".manifest.sqlite"
+COMMIT_EVERY = 200
+
+STATUS_DONE = 'done'
+STATUS_PARTIAL = 'partial'   # bulk GraphQL document holding only selected fields
+STATUS_FAILED = 'failed'
+COMPLETE = (STATUS_DONE, STATUS_PARTIAL)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    pdb_id        TEXT PRIMARY KEY,
+    status        TEXT NOT NULL,
+    size          INTEGER,
+    sha256        TEXT,
+    etag          TEXT,
+    last_modified TEXT,
+    fetched_at    REAL,
+    error         TEXT
+)
+"""
+
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DownloadManifest:
+    """Per-entry download state backed by a SQLite file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+        self._pending = 0
+
+    def get(self, pdb_id):
+        """Return the manifest row for pdb_id as a dict, or None"""
+        row = self.conn.execute("SELECT * FROM entries WHERE pdb_id = ?", (pdb_id,)).fetchone()
+        return dict(row) if row else None
+
+    def _write(self, sql, params):
+        self.conn.execute(sql, params)
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self.commit()
+
+    def record_success(self, pdb_id, data, etag=None, last_modified=None, fetched_at=None, partial=False):
+        """Record a completed download of `data` bytes (partial: a field subset of the entry)"""
+        self._write(
+            "INSERT OR REPLACE INTO entries "
+            "(pdb_id, status, size, sha256, etag, last_modified, fetched_at, error) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, NULL)",
+            (pdb_id, STATUS_PARTIAL if partial else STATUS_DONE, len(data), sha256_bytes(data),
+             etag, last_modified, fetched_at if fetched_at is not None else time.time()),
+        )
+
+    def record_not_modified(self, pdb_id):
+        """Mark a stale entry as revalidated by a 304 response"""
+        self._write("UPDATE entries SET fetched_at = ?, error = NULL WHERE pdb_id = ?",
+                    (time.time(), pdb_id))
+
+    def record_failure(self, pdb_id, error):
+        """Record a failed download; a previously completed file keeps its metadata"""
+        existing = self.get(pdb_id)
+        if existing and existing['status'] in COMPLETE:
+            self._write("UPDATE entries SET error = ? WHERE pdb_id = ?", (str(error), pdb_id))
+        else:
+            self._write(
+                "INSERT OR REPLACE INTO entries (pdb_id, status, fetched_at, error) "
+                "VALUES (?, ?, ?, ?)",
+                (pdb_id, STATUS_FAILED, time.time(), str(error)),
+            )
+
+    def invalidate(self, pdb_id, error):
+        """Mark an entry as failed so the next run fetches it again"""
+        self._write(
+            "INSERT OR REPLACE INTO entries (pdb_id, status, fetched_at, error) VALUES (?, ?, ?, ?)",
+            (pdb_id, STATUS_FAILED, time.time(), str(error)),
+        )
+
+    def adopt_file(self, pdb_id, path):
+        """Record a file already on disk (e.g. from batch_download_json.sh) as completed"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.record_success(pdb_id, data, fetched_at=os.path.getmtime(path))
+        return self.get(pdb_id)
+
+    def plan(self, pdb_id, path, max_age, partial_ok=False):
+        """Decide what to do for one entry.
+
+        Returns ('skip', row), ('revalidate', row) or ('fetch', row), where
+        row is the manifest record (None for never-seen entries). A partial
+        (bulk) document only counts as downloaded when partial_ok is set.
+        """
+        row = self.get(pdb_id)
+        on_disk = os.path.exists(path)
+
+        if row is None and on_disk:
+            row = self.adopt_file(pdb_id, path)
+        if row is None or row['status'] not in (COMPLETE if partial_ok else (STATUS_DONE,)):
+            return 'fetch', row
+        if not on_disk or os.path.getsize(path) != row['size']:
+            return 'fetch', row
+        if max_age is not None and time.time() - (row['fetched_at'] or 0) < max_age:
+            return 'skip', row
+        return 'revalidate', row
+
+    def counts(self):
+        """Return {status: count} over all entries"""
+        rows = self.conn.execute("SELECT status, COUNT(*) FROM entries GROUP BY status")
+        return {status: count for status, count in rows}
+
+    def commit(self):
+        self.conn.commit()
+        self._pending = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+
+def conditional_headers(row):
+    """Build If-None-Match / If-Modified-Since headers from a manifest row"""
+    headers = {}
+    if row and row.get('etag'):
+        headers['If-None-Match'] = row['etag']
+    if row and row.get('last_modified'):
+        headers['If-Modified-Since'] = row['last_modified']
+    return headers
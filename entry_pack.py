@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Packed Entry Store
+Stores compressed entry JSON documents back to back in one append-only file
+with a sidecar index (ID, offset, length, CRC) instead of tens of thousands of
+loose pdb_data/<ID>.json files
+
+Layout:
+  entries.pack      b"PDBPACK1" followed by zlib-compressed documents
+  entries.pack.idx  one "ID<TAB>offset<TAB>length<TAB>crc32" line per record
+
+Appending the same ID again supersedes the earlier record. Index lines that
+point past the end of the data file (an interrupted append) are ignored.
+
+Usage:
+  python3 entry_pack.py import pdb_data -o pdb_data.pack
+  python3 entry_pack.py export pdb_data.pack -o pdb_data
+  python3 entry_pack.py info pdb_data.pack
+"""
+
+import argparse
+import os
+import sys
+import zlib
+from pathlib import Path
+
+import json_codec
+
+MAGIC = b"PDBPACK1"
+INDEX_SUFFIX = ".idx"
+COMPRESSION_LEVEL = 6
+# What reading one entry can raise: I/O errors, a corrupt member, a CRC mismatch
+READ_ERRORS = (OSError, zlib.error, ValueError)
+
+
+class EntryPack:
+    """Append-only compressed store with random access by PDB id"""
+
+    def __init__(self, path, mode='r'):
+        self.path = str(path)
+        self.index_path = self.path + INDEX_SUFFIX
+        self.mode = mode
+        self.index = {}
+
+        if mode == 'a' and not os.path.exists(self.path):
+            with open(self.path, 'wb') as f:
+                f.write(MAGIC)
+            open(self.index_path, 'w').close()
+
+        self._data = open(self.path, 'rb' if mode == 'r' else 'r+b')
+        if self._data.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{self.path} is not an entry pack")
+        self._load_index()
+        self._index_file = open(self.index_path, 'a') if mode == 'a' else None
+
+    def _load_index(self):
+        size = os.path.getsize(self.path)
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'r') as f:
+            for line in f:
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) != 4:
+                    continue
+                pdb_id, offset, length, crc = parts[0], int(parts[1]), int(parts[2]), int(parts[3])
+                if offset + length <= size:
+                    self.index[pdb_id] = (offset, length, crc)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, pdb_id):
+        return pdb_id in self.index
+
+    def ids(self):
+        """PDB ids in file order"""
+        return [pdb_id for pdb_id, _ in sorted(self.index.items(), key=lambda item: item[1][0])]
+
+    def append(self, pdb_id, data):
+        """Store raw entry bytes under pdb_id"""
+        if self._index_file is None:
+            raise ValueError("pack opened read-only")
+        compressed = zlib.compress(data, COMPRESSION_LEVEL)
+        self._data.seek(0, os.SEEK_END)
+        offset = self._data.tell()
+        self._data.write(compressed)
+        self._data.flush()
+        crc = zlib.crc32(data)
+        self._index_file.write(f"{pdb_id}\t{offset}\t{len(compressed)}\t{crc}\n")
+        self.index[pdb_id] = (offset, len(compressed), crc)
+
+    def _read(self, offset, length, crc, pdb_id):
+        self._data.seek(offset)
+        data = zlib.decompress(self._data.read(length))
+        if zlib.crc32(data) != crc:
+            raise ValueError(f"CRC mismatch for {pdb_id} in {self.path}")
+        return data
+
+    def get_bytes(self, pdb_id):
+        """Return the raw JSON bytes stored for pdb_id"""
+        offset, length, crc = self.index[pdb_id]
+        return self._read(offset, length, crc, pdb_id)
+
+    def get(self, pdb_id):
+        """Return the decoded entry document for pdb_id"""
+        return json_codec.decode(self.get_bytes(pdb_id))
+
+    def iter_bytes(self):
+        """Yield (pdb_id, raw bytes) sequentially in file order"""
+        for pdb_id in self.ids():
+            offset, length, crc = self.index[pdb_id]
+            yield pdb_id, self._read(offset, length, crc, pdb_id)
+
+    def __iter__(self):
+        for pdb_id, data in self.iter_bytes():
+            yield pdb_id, json_codec.decode(data)
+
+    def close(self):
+        self._data.close()
+        if self._index_file is not None:
+            self._index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def is_pack(source):
+    """True if source names an entry pack rather than a directory of JSON files"""
+    path = Path(source)
+    if not path.is_file():
+        return False
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def count_entries(source, select=None):
+    """Number of entries in a directory or pack (only those select(pdb_id) accepts, if given)"""
+    if is_pack(source):
+        with EntryPack(source) as pack:
+            return sum(1 for pdb_id in pack.index if select is None or select(pdb_id))
+    return sum(1 for path in Path(source).glob("*.json") if select is None or select(path.stem))
+
+
+def iter_raw_entries(source, on_error=None, select=None):
+    """Yield (pdb_id, raw JSON bytes) from a directory of <ID>.json files or a pack.
+
+    Unreadable files and corrupt pack members are skipped; on_error(pdb_id, exc)
+    is called for each one when given. select(pdb_id), if given, picks the
+    entries to read (e.g. one shard).
+    """
+    if is_pack(source):
+        with EntryPack(source) as pack:
+            for pdb_id in pack.ids():
+                if select is not None and not select(pdb_id):
+                    continue
+                try:
+                    data = pack.get_bytes(pdb_id)
+                except READ_ERRORS as e:
+                    if on_error:
+                        on_error(pdb_id, e)
+                    continue
+                yield pdb_id, data
+        return
+    for json_file in Path(source).glob("*.json"):
+        if select is not None and not select(json_file.stem):
+            continue
+        try:
+            with open(json_file, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            if on_error:
+                on_error(json_file.stem, e)
+            continue
+        yield json_file.stem, data
+
+
+def iter_entries(source, on_error=None, select=None):
+    """Yield (pdb_id, document) from a directory or pack.
+
+    Entries that cannot be read or decoded are skipped; on_error(pdb_id, exc)
+    is called for each one when given.
+    """
+    for pdb_id, data in iter_raw_entries(source, on_error=on_error, select=select):
+        try:
+            document = json_codec.decode(data)
+        except ValueError as e:
+            if on_error:
+                on_error(pdb_id, e)
+            continue
+        yield pdb_id, document
+
+
+def import_directory(directory, pack_path):
+    """Append every <ID>.json in directory to the pack; returns the count"""
+    count = 0
+    with EntryPack(pack_path, mode='a') as pack:
+        for json_file in sorted(Path(directory).glob("*.json")):
+            with open(json_file, 'rb') as f:
+                pack.append(json_file.stem, f.read())
+            count += 1
+    return count
+
+
+def export_directory(pack_path, directory):
+    """Write every entry in the pack back out as <ID>.json; returns the count"""
+    os.makedirs(directory, exist_ok=True)
+    count = 0
+    with EntryPack(pack_path) as pack:
+        for pdb_id, data in pack.iter_bytes():
+            with open(os.path.join(directory, f"{pdb_id}.json"), 'wb') as f:
+                f.write(data)
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert between pdb_data/ and a packed entry store')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_import = sub.add_parser('import', help='Pack a directory of <ID>.json files')
+    p_import.add_argument('directory')
+    p_import.add_argument('-o', '--output', default='pdb_data.pack')
+
+    p_export = sub.add_parser('export', help='Unpack into a directory of <ID>.json files')
+    p_export.add_argument('pack')
+    p_export.add_argument('-o', '--output', default='pdb_data')
+
+    p_info = sub.add_parser('info', help='Show pack statistics')
+    p_info.add_argument('pack')
+
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        count = import_directory(args.directory, args.output)
+        print(f"✓ Packed {count} entries into {args.output} "
+              f"({os.path.getsize(args.output) / 1e6:.1f} MB)")
+    elif args.command == 'export':
+        count = export_directory(args.pack, args.output)
+        print(f"✓ Exported {count} entries to {args.output}/")
+    elif args.command == 'info':
+        if not is_pack(args.pack):
+            print(f"❌ {args.pack} is not an entry pack")
+            sys.exit(1)
+        with EntryPack(args.pack) as pack:
+            print(f"Entries: {len(pack)}")
+            print(f"Data size: {os.path.getsize(args.pack) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,17 +4,12 @@ Explain Interesting Molecular Structures in the Educational Model
 Query common structures and molecular concepts
 """
 
-import json
+from framework_snapshot import load_framework
 
 def load_data():
     """Load all framework data"""
-    with open('educational_framework/concept_map.json', 'r') as f:
-        concept_map = json.load(f)
-    
-    with open('educational_framework/extracted_concepts.json', 'r') as f:
-        concepts_data = json.load(f)
-    
-    return concept_map, concepts_data
+    # From the binary snapshot when it is up to date, else the JSON files
+    return load_framework('concept_map', 'structures')
 
 def explain_common_structures():
     """Explain the most interesting and common molecular structures"""
@@ -110,7 +105,7 @@ def explain_common_structures():
     
     for pdb_id, description in interesting_pdbs.items():
         # Check if we have this structure
-        has_struct = any(s.get('pdb_id') == pdb_id for s in concepts_data)
+        has_struct = concepts_data.find(pdb_id) is not None
         status = "✓ In your data" if has_struct else "✗ Not in your data"
         print(f"\n  {pdb_id}: {description} [{status}]")
     
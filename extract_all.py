@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Single-Pass Extraction
+Decodes every entry in pdb_data/ (or an entry pack) once and hands the
+parsed document to each registered consumer, instead of extract_features.py
+and build_educational_model.py each re-reading and re-parsing the dataset.
+
+Both consumers write their usual outputs in the same run:
+  model_data/features.cols/, model_data/summary.json
+  educational_framework/concept_hierarchy.json, concept_map.json,
+  lesson_templates.json, extracted_concepts.json, teacher_guide.md
+
+Usage:
+  python3 extract_all.py
+  python3 extract_all.py --source pdb_data.pack
+"""
+
+import argparse
+import time
+
+import build_educational_model
+import extract_features
+import json_codec
+from entry_pack import count_entries, iter_entries
+
+
+class SharedScan:
+    """Decode each entry once and pass it to every registered consumer"""
+
+    def __init__(self, source):
+        self.source = source
+        self.consumers = []
+        self.errors = 0
+
+    def register(self, consumer):
+        """Add a consumer with consume(pdb_id, document) and finish() methods"""
+        self.consumers.append(consumer)
+        return consumer
+
+    def _report_error(self, pdb_id, e):
+        self.errors += 1
+        print(f"Error loading {pdb_id}: {e}")
+
+    def run(self):
+        """Scan the source once; returns the number of decoded entries"""
+        total = count_entries(self.source)
+        print(f"Scanning {total} entries for {len(self.consumers)} consumers...")
+
+        count = 0
+        for pdb_id, document in iter_entries(self.source, on_error=self._report_error):
+            for consumer in self.consumers:
+                consumer.consume(pdb_id, document)
+            count += 1
+            if count % 500 == 0:
+                print(f"  Scanned {count}/{total}")
+
+        for consumer in self.consumers:
+            consumer.finish()
+        return count
+
+
+class FeatureConsumer:
+    """Model features, as written by extract_features.py"""
+
+    def __init__(self, output_dir=extract_features.OUTPUT_DIR):
+        self.output_dir = output_dir
+        self.records = []
+
+    def consume(self, pdb_id, document):
+        features = extract_features.extract_features(document)
+        if features:
+            self.records.append(features)
+
+    def finish(self):
+        print(f"\n📈 Features: {len(self.records)} records")
+        if len(self.records) < 10:
+            print("   ⚠️  Not enough records to build a model!")
+            return
+        # Scan order is arbitrary; sort like extract_features.py so the outputs match its run
+        self.records.sort(key=lambda record: record['pdb_id'])
+        extract_features.save_features(self.records, output_dir=self.output_dir)
+
+
+class ConceptConsumer:
+    """Educational concepts, as written by build_educational_model.py"""
+
+    def __init__(self):
+        self.mapper = build_educational_model.MolecularBiologyConceptMapper()
+        self.concepts = []
+
+    def consume(self, pdb_id, document):
+        concepts = self.mapper.extract_biology_concepts(document, pdb_id)
+        if concepts['concepts']:
+            self.concepts.append(concepts)
+
+    def finish(self):
+        print(f"\n🎓 Concepts: {len(self.concepts)} structures")
+        self.concepts.sort(key=lambda data: data['pdb_id'])
+        hierarchy = self.mapper.build_concept_hierarchy()
+        json_codec.write(f"{build_educational_model.OUTPUT_DIR}/concept_hierarchy.json", hierarchy)
+        build_educational_model.save_framework(self.mapper, self.concepts, hierarchy)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Extract model features and educational concepts in one pass over the entries'
+    )
+    parser.add_argument('--source', default=extract_features.JSON_DIR,
+                        help=f'Directory of <ID>.json files or an entry pack (default: {extract_features.JSON_DIR})')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("SINGLE-PASS EXTRACTION: FEATURES + EDUCATIONAL CONCEPTS")
+    print("=" * 70)
+
+    scan = SharedScan(args.source)
+    features = scan.register(FeatureConsumer())
+    concepts = scan.register(ConceptConsumer())
+
+    start = time.perf_counter()
+    count = scan.run()
+    elapsed = time.perf_counter() - start
+
+    print(f"\n✓ Scanned {count} entries once in {elapsed:.1f}s")
+    print(f"   • {len(features.records)} feature records -> {extract_features.OUTPUT_DIR}/")
+    print(f"   • {len(concepts.concepts)} concept records -> {build_educational_model.OUTPUT_DIR}/")
+    if scan.errors:
+        print(f"   ⚠️  {scan.errors} entries could not be decoded")
+
+
+if __name__ == "__main__":
+    main()
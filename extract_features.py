@@ -1,173 +1,383 @@
-import json
+import argparse
 import os
-from pathlib import Path
-import statistics
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import json_codec
+from entry_pack import READ_ERRORS, EntryPack, count_entries, is_pack, iter_raw_entries
+from extraction_profile import DEFAULT_SLOWEST, PROFILE_NAME, READ_ERROR, ExtractionProfile, profile_bytes
+from feature_cache import CACHE_NAME, FeatureCache, content_digest, scan_source
+from feature_schema import FEATURE_KEYS, FEATURE_SCHEMA_VERSION, extract_features
+from feature_store import write_store
+from selective_json import decode_document
+from sharding import parse_shard, shard_dir, shard_filter
+from streaming_stats import Metric
 
 # Configuration
 JSON_DIR = "./pdb_data"
 OUTPUT_DIR = "./model_data"
+STORE_DIR = os.path.join(OUTPUT_DIR, "features.cols")
+SUMMARY_STATE = "summary_state.json"
+CHUNK_SIZE = 256
 
 # Create output directory
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-def extract_features(json_data):
-    """Extract features from PDB JSON data"""
-    features = {}
+def extract_bytes(data):
+    """Parse raw entry JSON and extract features; None if either step fails.
     
+    Large entries only have the keys the features read decoded.
+    """
     try:
-        features['pdb_id'] = json_data.get('rcsb_id', '')
-        
-        # Experimental method
-        exptl_method = json_data.get('exptl', [{}])[0].get('method', 'UNKNOWN')
-        features['method'] = exptl_method
-        features['is_xray'] = 1 if 'X-RAY' in exptl_method else 0
-        features['is_nmr'] = 1 if 'NMR' in exptl_method else 0
-        features['is_em'] = 1 if 'ELECTRON' in exptl_method or 'CRYO-EM' in exptl_method else 0
-        
-        # Resolution from reflections
-        reflns = json_data.get('reflns', [{}])[0]
-        features['resolution'] = float(reflns.get('d_resolution_high', 0)) if reflns.get('d_resolution_high') else 0
-        
-        # Unit cell
-        cell = json_data.get('cell', {})
-        features['cell_volume'] = float(cell.get('volume', 0)) if cell.get('volume') else 0
-        features['cell_a'] = float(cell.get('length_a', 0)) if cell.get('length_a') else 0
-        features['cell_b'] = float(cell.get('length_b', 0)) if cell.get('length_b') else 0
-        features['cell_c'] = float(cell.get('length_c', 0)) if cell.get('length_c') else 0
-        
-        # Structure info
-        struct = json_data.get('struct', {})
-        features['title'] = struct.get('title', '')
-        
-        # Refinement statistics
-        refine = json_data.get('refine', [{}])[0]
-        features['r_work'] = float(refine.get('ls_R_factor_R_work', 0)) if refine.get('ls_R_factor_R_work') else 0
-        features['r_free'] = float(refine.get('ls_R_factor_R_free', 0)) if refine.get('ls_R_factor_R_free') else 0
-        
-        # Entry info
-        entry_info = json_data.get('rcsb_entry_info', {})
-        features['polymer_entity_count'] = int(entry_info.get('polymer_entity_count', 0)) or 0
-        features['nonpolymer_entity_count'] = int(entry_info.get('nonpolymer_entity_count', 0)) or 0
-        features['water_entity_count'] = int(entry_info.get('water_entity_count', 0)) or 0
-        
-        # Deposition date
-        accession = json_data.get('rcsb_accession_info', {})
-        features['has_deposition_date'] = 1 if accession.get('deposit_date') else 0
-        
-        return features
-    except Exception as e:
+        return extract_features(decode_document(data, FEATURE_KEYS))
+    except ValueError:
+        return None
+
+def extract_item(pdb_id, data, profile=False):
+    """Return (pdb_id, features or None, profile sample or None) for one raw entry"""
+    if profile:
+        features, sample = profile_bytes(data)
+        return pdb_id, features, sample
+    return pdb_id, extract_bytes(data), None
+
+def _extract_chunk(chunk, profile=False):
+    """Parse and extract one chunk of (pdb_id, raw bytes) in a worker process"""
+    start = time.perf_counter()
+    results = [extract_item(pdb_id, data, profile) for pdb_id, data in chunk]
+    return os.getpid(), len(chunk), time.perf_counter() - start, results
+
+def _chunks(items, chunk_size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def extract_parallel(items, total, workers=None, chunk_size=CHUNK_SIZE, profile=False):
+    """Yield extract_item() results for (pdb_id, raw bytes) items using a process pool"""
+    workers = workers or os.cpu_count() or 1
+    per_worker = defaultdict(lambda: [0, 0.0])
+    done = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        chunks = _chunks(items, chunk_size)
+        while True:
+            # Keep a bounded number of chunks in flight so memory stays flat
+            for chunk in chunks:
+                pending.add(pool.submit(_extract_chunk, chunk, profile))
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                pid, count, elapsed, records = future.result()
+                per_worker[pid][0] += count
+                per_worker[pid][1] += elapsed
+                yield from records
+                previous, done = done, done + count
+                if done // 1000 > previous // 1000:
+                    print(f"  Processed {done}/{total}")
+    wall = time.perf_counter() - start
+    
+    print(f"  Throughput: {done / wall if wall else 0:.0f} files/s overall")
+    for i, (pid, (count, elapsed)) in enumerate(sorted(per_worker.items()), 1):
+        rate = count / elapsed if elapsed else 0
+        print(f"    worker {i} (pid {pid}): {count} files, {rate:.0f} files/s")
+
+def _read_errors(profile):
+    """on_error callback recording unreadable files in the profile"""
+    if profile is None:
         return None
+    return lambda pdb_id, e: profile.add_failure(pdb_id, READ_ERROR)
+
+def load_json_files_parallel(directory, workers=None, chunk_size=CHUNK_SIZE, profile=None, select=None):
+    """Extract features with a process pool; records are sorted by pdb_id"""
+    total = count_entries(directory, select)
+    print(f"Loading {total} JSON files with {workers or os.cpu_count()} workers...")
+    
+    results = []
+    items = iter_raw_entries(directory, on_error=_read_errors(profile), select=select)
+    for pdb_id, features, sample in extract_parallel(items, total, workers, chunk_size, profile is not None):
+        if sample:
+            profile.add(pdb_id, sample)
+        if features:
+            results.append((pdb_id, features))
+    # Completion order varies between runs; sort so the outputs are reproducible
+    results.sort(key=lambda item: item[0])
+    return [features for _, features in results]
 
-def load_json_files(directory):
-    """Load all JSON files from directory"""
+def load_json_files_cached(directory, cache, workers=1, profile=None, select=None):
+    """Re-extract only new or changed entries; the rest come from the feature cache.
+    
+    Records are returned sorted by pdb_id. Only re-extracted entries are profiled.
+    """
+    entries = sorted(scan_source(directory, select), key=lambda entry: entry[1])
+    stale = [(key, pdb_id, size, mtime_ns, crc) for key, pdb_id, size, mtime_ns, crc in entries
+             if not cache.is_current(key, size, mtime_ns, crc)]
+    print(f"Loading {len(entries)} JSON files ({len(entries) - len(stale)} cached, "
+          f"{len(stale)} new or changed)...")
+    
+    pending = {}  # pdb_id -> (key, size, mtime_ns, digest)
+    
+    def read_stale():
+        pack = EntryPack(directory) if is_pack(directory) else None
+        try:
+            for key, pdb_id, size, mtime_ns, crc in stale:
+                try:
+                    if pack is not None:
+                        data = pack.get_bytes(pdb_id)
+                    else:
+                        with open(key, 'rb') as f:
+                            data = f.read()
+                except READ_ERRORS:
+                    if profile is not None:
+                        profile.add_failure(pdb_id, READ_ERROR)
+                    continue
+                digest = content_digest(data, crc)
+                # A touched but unchanged file keeps its record without re-parsing
+                if crc is None and cache.refresh_if_unchanged(key, size, mtime_ns, digest):
+                    continue
+                pending[pdb_id] = (key, size, mtime_ns, digest)
+                yield pdb_id, data
+        finally:
+            if pack is not None:
+                pack.close()
+    
+    profiling = profile is not None
+    if workers == 1:
+        extracted = (extract_item(pdb_id, data, profiling) for pdb_id, data in read_stale())
+    else:
+        extracted = extract_parallel(read_stale(), len(stale), workers, profile=profiling)
+    
+    count = 0
+    for pdb_id, features, sample in extracted:
+        if sample:
+            profile.add(pdb_id, sample)
+        key, size, mtime_ns, digest = pending.pop(pdb_id)
+        cache.put(key, pdb_id, size, mtime_ns, digest, features)
+        count += 1
+        if count % 100 == 0:
+            print(f"  Extracted {count}/{len(stale)}")
+    
+    evicted = cache.evict_missing({entry[0] for entry in entries}, directory)
+    cache.commit()
+    print(f"  Re-extracted {count} entries, evicted {evicted} removed entries")
+    
+    records = cache.records(entry[0] for entry in entries)
+    return [records[entry[0]] for entry in entries if entry[0] in records]
+
+def load_json_files(directory, workers=1, profile=None, select=None):
+    """Load all JSON files from directory (or an entry pack); select(pdb_id) limits the entries.
+    
+    Records are returned sorted by pdb_id, whatever the number of workers.
+    """
+    if workers != 1:
+        return load_json_files_parallel(directory, workers, profile=profile, select=select)
+    
     data = []
-    files = list(Path(directory).glob("*.json"))
+    total = count_entries(directory, select)
     
-    print(f"Loading {len(files)} JSON files...")
+    print(f"Loading {total} JSON files...")
     
-    for i, json_file in enumerate(files):
+    items = iter_raw_entries(directory, on_error=_read_errors(profile), select=select)
+    for i, (pdb_id, raw) in enumerate(items):
         if i % 100 == 0 and i > 0:
-            print(f"  Processed {i}/{len(files)}")
+            print(f"  Processed {i}/{total}")
         
-        try:
-            with open(json_file, 'r') as f:
-                json_data = json.load(f)
-                features = extract_features(json_data)
-                if features:
-                    data.append(features)
-        except Exception as e:
-            pass  # Skip files with errors
+        _, features, sample = extract_item(pdb_id, raw, profile is not None)
+        if sample:
+            profile.add(pdb_id, sample)
+        if features:
+            data.append(features)
     
+    # Directory order is arbitrary; sort like the parallel and cached paths
+    data.sort(key=lambda record: record['pdb_id'])
     return data
 
+class FeatureSummary:
+    """Online statistics behind summary.json; constant memory and mergeable across shards"""
+    
+    # summary.json section -> (record field, only count values > 0)
+    METRICS = {
+        'resolution': ('resolution', True),
+        'r_work': ('r_work', True),
+        'r_free': ('r_free', True),
+        'polymer_entities': ('polymer_entity_count', False),
+    }
+    
+    def __init__(self):
+        self.total = 0
+        self.methods = {}
+        self.metrics = {name: Metric() for name in self.METRICS}
+    
+    def add(self, record):
+        self.total += 1
+        method = record['method']
+        self.methods[method] = self.methods.get(method, 0) + 1
+        for name, (field, positive_only) in self.METRICS.items():
+            value = record[field]
+            if value > 0 or not positive_only:
+                self.metrics[name].add(value)
+    
+    def observe(self, records):
+        """Pass records through unchanged while adding them to the summary"""
+        for record in records:
+            self.add(record)
+            yield record
+    
+    def merge(self, other):
+        self.total += other.total
+        for method, count in other.methods.items():
+            self.methods[method] = self.methods.get(method, 0) + count
+        for name, metric in other.metrics.items():
+            self.metrics[name].merge(metric)
+        return self
+    
+    def to_summary(self):
+        """The summary.json document"""
+        summary = {"total_records": self.total}
+        for name, metric in self.metrics.items():
+            summary[name] = metric.summary()
+        summary["methods"] = self.methods
+        return summary
+    
+    def to_state(self):
+        return {
+            'total': self.total,
+            'methods': self.methods,
+            'metrics': {name: metric.to_state() for name, metric in self.metrics.items()},
+        }
+    
+    @classmethod
+    def from_state(cls, state):
+        summary = cls()
+        summary.total = state['total']
+        summary.methods = dict(state['methods'])
+        for name, metric_state in state['metrics'].items():
+            summary.metrics[name] = Metric.from_state(metric_state)
+        return summary
+    
+    def print_report(self):
+        resolution = self.metrics['resolution']
+        print(f"\n   Resolution (Å) - {resolution.stats.count} valid entries:")
+        if resolution.stats.count:
+            print(f"     Range: {resolution.stats.min:.2f} - {resolution.stats.max:.2f}")
+            print(f"     Mean: {resolution.stats.mean:.2f}  Median: {resolution.quantile(0.5):.2f}")
+        
+        print(f"\n   Experimental Methods:")
+        for method, count in sorted(self.methods.items(), key=lambda x: x[1], reverse=True)[:5]:
+            print(f"     {method}: {count}")
+        
+        for name, label in (('r_work', 'R-Work'), ('r_free', 'R-Free')):
+            stats = self.metrics[name].stats
+            if stats.count:
+                print(f"\n   {label} - {stats.count} valid entries:")
+                print(f"     Range: {stats.min:.4f} - {stats.max:.4f}")
+                print(f"     Mean: {stats.mean:.4f}")
+        
+        stats = self.metrics['polymer_entities'].stats
+        if stats.count:
+            print(f"\n   Polymer Entities:")
+            print(f"     Range: {stats.min} - {stats.max}")
+            print(f"     Mean: {stats.mean:.2f}")
+
+def write_summary(summary, output_dir=OUTPUT_DIR):
+    """Write summary.json and the mergeable summary_state.json"""
+    json_codec.write(f"{output_dir}/summary.json", summary.to_summary())
+    json_codec.write(f"{output_dir}/{SUMMARY_STATE}", summary.to_state(), json_codec.COMPACT)
+
+def save_features(raw_data, write_json=False, output_dir=OUTPUT_DIR):
+    """Write the feature store and summary.json, computing statistics in the same pass.
+    
+    Returns the FeatureSummary.
+    """
+    print("[2/4] Saving extracted features...")
+    
+    summary = FeatureSummary()
+    store_dir = os.path.join(output_dir, "features.cols")
+    count = write_store(summary.observe(raw_data), store_dir)
+    print(f"   ✓ {store_dir} ({count} records, columnar)")
+    if write_json:
+        json_codec.write(f"{output_dir}/features.json", raw_data)
+        print(f"   ✓ features.json ({count} records)")
+    
+    write_summary(summary, output_dir)
+    print(f"   ✓ summary.json")
+    
+    print("\n[3/4] Extracted feature statistics:")
+    summary.print_report()
+    return summary
+
 def main():
+    parser = argparse.ArgumentParser(description='Extract model features from PDB entry JSON')
+    parser.add_argument('--source', default=JSON_DIR,
+                        help=f'Directory of <ID>.json files or an entry pack (default: {JSON_DIR})')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='Extraction processes; 0 uses every core (default: 1)')
+    parser.add_argument('--cache',
+                        help=f'Per-entry feature cache; only new or changed entries are re-extracted '
+                             f'(default: {OUTPUT_DIR}/{CACHE_NAME}, per shard with --shard)')
+    parser.add_argument('--no-cache', action='store_true', help='Re-extract every entry')
+    parser.add_argument('--json', action='store_true',
+                        help='Also write the indented model_data/features.json')
+    parser.add_argument('--profile', action='store_true',
+                        help=f'Record per-file timings and failures in {OUTPUT_DIR}/{PROFILE_NAME}')
+    parser.add_argument('--slowest', type=int, default=DEFAULT_SLOWEST,
+                        help=f'Slowest files kept in the profile (default: {DEFAULT_SLOWEST})')
+    parser.add_argument('--shard', type=parse_shard, metavar='i/N',
+                        help='Extract only shard i of N (0-based, by stable hash of the PDB id) into '
+                             f'{OUTPUT_DIR}/shards/i-of-N/; combine with merge_shards.py')
+    args = parser.parse_args()
+    
+    output_dir = shard_dir(OUTPUT_DIR, args.shard) if args.shard else OUTPUT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    select = shard_filter(args.shard)
+    
     print("=" * 70)
     print("PDB MODEL BUILDING - FEATURE EXTRACTION")
+    if args.shard:
+        print(f"Shard {args.shard[0]}/{args.shard[1]} -> {output_dir}/")
     print("=" * 70)
     
     # Load data
     print("\n[1/4] Loading JSON files...")
-    raw_data = load_json_files(JSON_DIR)
-    print(f"   ✓ Loaded {len(raw_data)} records\n")
+    profile = ExtractionProfile(slowest=args.slowest) if args.profile else None
+    if args.no_cache:
+        raw_data = load_json_files(args.source, workers=args.workers or None, profile=profile,
+                                   select=select)
+    else:
+        cache = FeatureCache(args.cache or os.path.join(output_dir, CACHE_NAME), version=FEATURE_SCHEMA_VERSION)
+        try:
+            raw_data = load_json_files_cached(args.source, cache, workers=args.workers or None,
+                                              profile=profile, select=select)
+        finally:
+            cache.close()
+    print(f"   ✓ Loaded {len(raw_data)} records")
+    
+    if profile is not None:
+        report = profile.write(f"{output_dir}/{PROFILE_NAME}")
+        profile.print_report(report)
+        print(f"   ✓ {PROFILE_NAME}")
+    print()
+    
+    if args.shard:
+        # Partial outputs; the record minimum applies to the merged set
+        save_features(raw_data, write_json=args.json, output_dir=output_dir)
+        print(f"\n[4/4] Shard {args.shard[0]}/{args.shard[1]} done. Once every shard has run:")
+        print("  python3 merge_shards.py")
+        return
     
     if len(raw_data) < 10:
         print("   ⚠️  Not enough records to build a model!")
         return
     
-    # Analyze features
-    print("[2/4] Analyzing extracted features...")
-    
-    # Resolution statistics
-    resolutions = [d['resolution'] for d in raw_data if d['resolution'] > 0]
-    print(f"\n   Resolution (Å) - {len(resolutions)} valid entries:")
-    if resolutions:
-        print(f"     Range: {min(resolutions):.2f} - {max(resolutions):.2f}")
-        print(f"     Mean: {statistics.mean(resolutions):.2f}")
-    
-    # Method distribution
-    methods = {}
-    for d in raw_data:
-        m = d['method']
-        methods[m] = methods.get(m, 0) + 1
-    print(f"\n   Experimental Methods:")
-    for method, count in sorted(methods.items(), key=lambda x: x[1], reverse=True)[:5]:
-        print(f"     {method}: {count}")
-    
-    # R-factor statistics
-    r_works = [d['r_work'] for d in raw_data if d['r_work'] > 0]
-    r_frees = [d['r_free'] for d in raw_data if d['r_free'] > 0]
-    
-    if r_works:
-        print(f"\n   R-Work - {len(r_works)} valid entries:")
-        print(f"     Range: {min(r_works):.4f} - {max(r_works):.4f}")
-        print(f"     Mean: {statistics.mean(r_works):.4f}")
-    
-    if r_frees:
-        print(f"\n   R-Free - {len(r_frees)} valid entries:")
-        print(f"     Range: {min(r_frees):.4f} - {max(r_frees):.4f}")
-        print(f"     Mean: {statistics.mean(r_frees):.4f}")
-    
-    # Polymer info
-    poly_counts = [d['polymer_entity_count'] for d in raw_data]
-    print(f"\n   Polymer Entities:")
-    print(f"     Range: {min(poly_counts)} - {max(poly_counts)}")
-    print(f"     Mean: {statistics.mean(poly_counts):.2f}")
-    
-    # Save extracted features
-    print("\n[3/4] Saving extracted features...")
-    
-    with open(f"{OUTPUT_DIR}/features.json", 'w') as f:
-        json.dump(raw_data, f, indent=2)
-    print(f"   ✓ features.json ({len(raw_data)} records)")
-    
-    # Summary statistics
-    summary = {
-        "total_records": len(raw_data),
-        "resolution": {
-            "valid_entries": len(resolutions),
-            "min": min(resolutions) if resolutions else None,
-            "max": max(resolutions) if resolutions else None,
-            "mean": statistics.mean(resolutions) if resolutions else None,
-        },
-        "r_work": {
-            "valid_entries": len(r_works),
-            "mean": statistics.mean(r_works) if r_works else None,
-        },
-        "r_free": {
-            "valid_entries": len(r_frees),
-            "mean": statistics.mean(r_frees) if r_frees else None,
-        },
-        "polymer_entities": {
-            "min": min(poly_counts),
-            "max": max(poly_counts),
-            "mean": statistics.mean(poly_counts),
-        },
-        "methods": methods
-    }
-    
-    with open(f"{OUTPUT_DIR}/summary.json", 'w') as f:
-        json.dump(summary, f, indent=2)
-    print(f"   ✓ summary.json")
+    save_features(raw_data, write_json=args.json)
     
     print("\n[4/4] Ready for model training!")
     print("\n" + "=" * 70)
@@ -0,0 +1,139 @@
+"""
+Extraction Profile
+Optional per-file instrumentation for extract_features.py: decode time,
+extraction time, byte size and failure class of every entry, summarised as
+the slowest N files, a throughput timeline and a failure histogram in
+model_data/extraction_profile.json (next to summary.json)
+"""
+
+import heapq
+import time
+from collections import Counter
+
+import json_codec
+from feature_schema import FEATURE_KEYS, extract_features_strict
+from selective_json import decode_document
+
+PROFILE_NAME = "extraction_profile.json"
+DEFAULT_SLOWEST = 20
+TIMELINE_INTERVAL = 1.0   # seconds per timeline bucket
+FAILURE_EXAMPLES = 10     # ids kept per failure class
+
+# Failure classes
+READ_ERROR = 'read_error'
+DECODE_ERROR = 'decode_error'
+NOT_AN_OBJECT = 'not_an_object'
+
+
+def profile_bytes(data):
+    """Decode and extract one entry, timing each step.
+
+    Returns (features or None, (size, decode seconds, extract seconds, failure class or None)).
+    """
+    start = time.perf_counter()
+    try:
+        document = decode_document(data, FEATURE_KEYS)
+    except ValueError:
+        return None, (len(data), time.perf_counter() - start, 0.0, DECODE_ERROR)
+    decoded = time.perf_counter()
+    if type(document) is not dict:
+        return None, (len(data), decoded - start, 0.0, NOT_AN_OBJECT)
+    try:
+        features = extract_features_strict(document)
+        failure = None
+    except Exception as e:
+        features = None
+        failure = f"extract_error:{type(e).__name__}"
+    return features, (len(data), decoded - start, time.perf_counter() - decoded, failure)
+
+
+class ExtractionProfile:
+    """Collects per-file samples in bounded memory and writes the report"""
+
+    def __init__(self, slowest=DEFAULT_SLOWEST, interval=TIMELINE_INTERVAL):
+        self.slowest_n = slowest
+        self.interval = interval
+        self.start = time.perf_counter()
+        self.files = 0
+        self.bytes = 0
+        self.decode_seconds = 0.0
+        self.extract_seconds = 0.0
+        self._slowest = []            # min-heap of (seconds, pdb_id, size, decode, extract)
+        self.timeline = {}            # bucket -> [files, bytes, failures]
+        self.failures = Counter()
+        self.failure_examples = {}
+
+    def add(self, pdb_id, sample):
+        """Record one (size, decode seconds, extract seconds, failure) sample"""
+        size, decode, extract, failure = sample
+        self.files += 1
+        self.bytes += size
+        self.decode_seconds += decode
+        self.extract_seconds += extract
+
+        item = (decode + extract, pdb_id, size, decode, extract)
+        if len(self._slowest) < self.slowest_n:
+            heapq.heappush(self._slowest, item)
+        elif item > self._slowest[0]:
+            heapq.heapreplace(self._slowest, item)
+
+        bucket = int((time.perf_counter() - self.start) / self.interval)
+        counts = self.timeline.setdefault(bucket, [0, 0, 0])
+        counts[0] += 1
+        counts[1] += size
+        if failure:
+            counts[2] += 1
+            self.add_failure(pdb_id, failure, counted=True)
+
+    def add_failure(self, pdb_id, failure, counted=False):
+        """Record a failure; entries that could not even be read have no sample"""
+        if not counted:
+            self.files += 1
+        self.failures[failure] += 1
+        examples = self.failure_examples.setdefault(failure, [])
+        if len(examples) < FAILURE_EXAMPLES:
+            examples.append(pdb_id)
+
+    def report(self):
+        elapsed = time.perf_counter() - self.start
+        return {
+            'files': self.files,
+            'bytes': self.bytes,
+            'elapsed_seconds': elapsed,
+            'decode_seconds': self.decode_seconds,
+            'extract_seconds': self.extract_seconds,
+            'files_per_second': self.files / elapsed if elapsed else None,
+            'failed': sum(self.failures.values()),
+            'failures': {
+                failure: {'count': count, 'examples': self.failure_examples[failure]}
+                for failure, count in self.failures.most_common()
+            },
+            'slowest': [
+                {'pdb_id': pdb_id, 'seconds': seconds, 'decode_seconds': decode,
+                 'extract_seconds': extract, 'bytes': size}
+                for seconds, pdb_id, size, decode, extract in sorted(self._slowest, reverse=True)
+            ],
+            'timeline': [
+                {'second': bucket * self.interval, 'files': files, 'bytes': size, 'failures': failed}
+                for bucket, (files, size, failed) in sorted(self.timeline.items())
+            ],
+        }
+
+    def write(self, path):
+        report = self.report()
+        json_codec.write(path, report)
+        return report
+
+    def print_report(self, report, top=5):
+        print(f"\n   Profiled {report['files']} files ({report['bytes'] / 1e6:.1f} MB): "
+              f"decode {report['decode_seconds']:.2f}s, extract {report['extract_seconds']:.2f}s")
+        if report['failed']:
+            print(f"   ⚠️  {report['failed']} files failed:")
+            for failure, info in report['failures'].items():
+                print(f"     {failure}: {info['count']} (e.g. {', '.join(info['examples'][:3])})")
+        else:
+            print("   ✓ No failures")
+        if report['slowest']:
+            print("   Slowest files:")
+            for item in report['slowest'][:top]:
+                print(f"     {item['pdb_id']}: {item['seconds'] * 1000:.1f} ms ({item['bytes'] / 1e3:.0f} kB)")
@@ -0,0 +1,135 @@
+"""
+Feature Cache
+SQLite record of the feature record extracted from every entry, keyed by
+source path and validated by size/mtime (loose files) or the stored CRC
+(entry packs), so extract_features.py only re-parses new or changed entries
+"""
+
+import hashlib
+import os
+import sqlite3
+
+import json_codec
+from entry_pack import EntryPack, is_pack
+
+CACHE_NAME = ".feature_cache.sqlite"
+COMMIT_EVERY = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS features (
+    key       TEXT PRIMARY KEY,
+    pdb_id    TEXT NOT NULL,
+    size      INTEGER,
+    mtime_ns  INTEGER,
+    digest    TEXT,
+    record    TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name      TEXT PRIMARY KEY,
+    value     TEXT
+)
+"""
+
+
+def scan_source(source, select=None):
+    """Yield (key, pdb_id, size, mtime_ns, crc) for every entry without reading it"""
+    if is_pack(source):
+        path = os.path.abspath(source)
+        with EntryPack(source) as pack:
+            for pdb_id, (offset, length, crc) in pack.index.items():
+                if select is None or select(pdb_id):
+                    yield f"{path}#{pdb_id}", pdb_id, length, None, crc
+        return
+    with os.scandir(source) as it:
+        for item in it:
+            if select is not None and not select(item.name[:-5]):
+                continue
+            if item.name.endswith('.json') and item.is_file():
+                st = item.stat()
+                yield os.path.abspath(item.path), item.name[:-5], st.st_size, st.st_mtime_ns, None
+
+
+def content_digest(data, crc=None):
+    """Content hash stored with a record; packs reuse their CRC instead of re-hashing"""
+    return f"crc32:{crc}" if crc is not None else hashlib.sha256(data).hexdigest()
+
+
+class FeatureCache:
+    """Per-entry feature records backed by a SQLite file"""
+
+    def __init__(self, path, version=None):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # Records extracted by a different version of the extractor are discarded
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        if version is not None and (row[0] if row else None) != version:
+            self.conn.execute("DELETE FROM features")
+            self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('version', ?)", (version,))
+        self.conn.commit()
+        self._pending = 0
+        self.rows = {key: (size, mtime_ns, digest) for key, size, mtime_ns, digest in
+                     self.conn.execute("SELECT key, size, mtime_ns, digest FROM features")}
+
+    def _write(self, sql, params):
+        self.conn.execute(sql, params)
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self.commit()
+
+    def is_current(self, key, size, mtime_ns, crc):
+        """True if the cached record for key still matches the entry on disk"""
+        row = self.rows.get(key)
+        if row is None:
+            return False
+        if crc is not None:
+            return row == (size, None, f"crc32:{crc}")
+        return row[:2] == (size, mtime_ns)
+
+    def refresh_if_unchanged(self, key, size, mtime_ns, digest):
+        """Keep a record whose file was touched but not changed; True if it was kept"""
+        row = self.rows.get(key)
+        if row is None or row[2] != digest:
+            return False
+        self._write("UPDATE features SET size = ?, mtime_ns = ? WHERE key = ?", (size, mtime_ns, key))
+        self.rows[key] = (size, mtime_ns, row[2])
+        return True
+
+    def records(self, keys):
+        """Return {key: feature record} for the given keys, skipping failed entries"""
+        keys = set(keys)
+        return {key: json_codec.decode(record) for key, record in
+                self.conn.execute("SELECT key, record FROM features WHERE record IS NOT NULL")
+                if key in keys}
+
+    def put(self, key, pdb_id, size, mtime_ns, digest, record):
+        """Store the record extracted from an entry (None if extraction failed)"""
+        self._write(
+            "INSERT OR REPLACE INTO features (key, pdb_id, size, mtime_ns, digest, record) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, pdb_id, size, mtime_ns, digest, json_codec.dumps(record) if record else None),
+        )
+        self.rows[key] = (size, mtime_ns, digest)
+
+    def evict_missing(self, seen_keys, source):
+        """Drop records for entries of this source that no longer exist; returns the count"""
+        base = os.path.abspath(source)
+        if is_pack(source):
+            belongs = lambda key: key.startswith(base + '#')
+        else:
+            belongs = lambda key: '#' not in key and os.path.dirname(key) == base
+        stale = [key for key in self.rows if belongs(key) and key not in seen_keys]
+        for key in stale:
+            self._write("DELETE FROM features WHERE key = ?", (key,))
+            del self.rows[key]
+        return len(stale)
+
+    def commit(self):
+        self.conn.commit()
+        self._pending = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
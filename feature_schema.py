@@ -0,0 +1,157 @@
+"""
+Feature Schema
+Declarative list of the features read from each PDB entry document, shared by
+extract_features.py and build_model.py. Each field is
+
+  (name, path, type, default)
+
+where path is a dotted JSON path ("[0]" takes the first element of a list,
+as for exptl, reflns and refine) or a tuple of paths, and type is
+'str', 'float', 'int', 'flag' or a function of the raw value(s). compile_schema
+turns a schema into one straight-line Python function, so extraction does no
+per-field lookups or interpretation at run time.
+"""
+
+import hashlib
+
+# Value converters used as field types
+
+
+def contains(*needles):
+    """1 if any needle occurs in the (string) value, else 0"""
+    def convert(value):
+        value = value or ''
+        return 1 if any(needle in value for needle in needles) else 0
+    # Expression the compiler inlines instead of calling convert
+    convert.inline = "1 if {0} and (" + " or ".join(f"{n!r} in {{0}}" for n in needles) + ") else 0"
+    return convert
+
+
+def ratio(numerator, denominator):
+    return numerator / denominator if numerator and denominator else 0
+
+
+# Model features written to model_data/features.json
+FEATURE_SCHEMA = [
+    ('pdb_id', 'rcsb_id', 'str', ''),
+    ('method', 'exptl[0].method', 'str', 'UNKNOWN'),
+    ('is_xray', 'exptl[0].method', contains('X-RAY'), 0),
+    ('is_nmr', 'exptl[0].method', contains('NMR'), 0),
+    ('is_em', 'exptl[0].method', contains('ELECTRON', 'CRYO-EM'), 0),
+    ('resolution', 'reflns[0].d_resolution_high', 'float', 0),
+    ('cell_volume', 'cell.volume', 'float', 0),
+    ('cell_a', 'cell.length_a', 'float', 0),
+    ('cell_b', 'cell.length_b', 'float', 0),
+    ('cell_c', 'cell.length_c', 'float', 0),
+    ('title', 'struct.title', 'str', ''),
+    ('r_work', 'refine[0].ls_R_factor_R_work', 'float', 0),
+    ('r_free', 'refine[0].ls_R_factor_R_free', 'float', 0),
+    ('polymer_entity_count', 'rcsb_entry_info.polymer_entity_count', 'int', 0),
+    ('nonpolymer_entity_count', 'rcsb_entry_info.nonpolymer_entity_count', 'int', 0),
+    ('water_entity_count', 'rcsb_entry_info.solvent_entity_count', 'int', 0),
+    ('has_deposition_date', 'rcsb_accession_info.deposit_date', 'flag', 0),
+]
+
+# Features used by build_model.py. Chains and monomer counts come from
+# rcsb_entry_info; the entry JSON has no polymer.pdb_chains or exptl.resolution
+MODEL_SCHEMA = [
+    ('title', 'struct.title', 'str', ''),
+    ('polymer_count', 'rcsb_entry_info.deposited_polymer_entity_instance_count', 'int', 0),
+    ('avg_monomers', ('rcsb_entry_info.deposited_polymer_monomer_count',
+                      'rcsb_entry_info.deposited_polymer_entity_instance_count'), ratio, 0),
+    ('max_monomers', 'rcsb_entry_info.polymer_monomer_count_maximum', 'int', 0),
+    ('resolution', 'reflns[0].d_resolution_high', 'float', 0),
+    ('has_release_date', 'rcsb_accession_info.initial_release_date', 'flag', 0),
+]
+
+
+def schema_paths(*schemas):
+    """Distinct JSON paths read by the given schemas, in first-use order"""
+    paths = []
+    for schema in schemas:
+        for _, path, _, _ in schema:
+            for p in (path if isinstance(path, tuple) else (path,)):
+                p = p.replace('[0]', '')
+                if p not in paths:
+                    paths.append(p)
+    return paths
+
+
+def schema_keys(*schemas):
+    """Top-level document keys read by the given schemas"""
+    return frozenset(path.split('.')[0] for path in schema_paths(*schemas))
+
+
+def compile_schema(schema, name='extract', strict=False):
+    """Compile a schema into a function doc -> record dict.
+
+    A value that fails to convert makes the function return None, or raise
+    when strict is set (used to classify failures).
+    """
+    lines = []
+    namespace = {'__name__': __name__}
+    local_for = {'': 'doc'}
+
+    def resolve(path):
+        """Emit code that walks path once, sharing prefixes with earlier fields"""
+        parts = path.split('.')
+        for i in range(1, len(parts) + 1):
+            prefix = '.'.join(parts[:i])
+            if prefix in local_for:
+                continue
+            parent = local_for['.'.join(parts[:i - 1])]
+            key, is_list = parts[i - 1], parts[i - 1].endswith('[0]')
+            key = key[:-3] if is_list else key
+            var = f"v{len(local_for)}"
+            local_for[prefix] = var
+            get = f"doc.get({key!r})" if parent == 'doc' else f"{parent}.get({key!r}) if {parent} else None"
+            lines.append(f"{var} = {get}")
+            if is_list:
+                lines.append(f"{var} = {var}[0] if {var} else None")
+        return local_for[path]
+
+    values = []
+    for i, (field, path, kind, default) in enumerate(schema):
+        paths = path if isinstance(path, tuple) else (path,)
+        args = [resolve(p) for p in paths]
+        v = args[0]
+        namespace[f"d{i}"] = default
+        if kind == 'str':
+            expr = f"{v} if {v} is not None else d{i}"
+        elif kind == 'float':
+            expr = f"float({v}) if {v} else d{i}"
+        elif kind == 'int':
+            expr = f"int({v}) if {v} else d{i}"
+        elif kind == 'flag':
+            expr = f"1 if {v} else 0"
+        elif hasattr(kind, 'inline'):
+            expr = kind.inline.format(*args)
+        elif callable(kind):
+            namespace[f"f{i}"] = kind
+            lines.append(f"r{i} = f{i}({', '.join(args)})")
+            expr = f"r{i} if r{i} is not None else d{i}"
+        else:
+            raise ValueError(f"unknown type {kind!r} for field {field}")
+        lines.append(f"r{i} = {expr}")
+        values.append(f"{field!r}: r{i}")
+    lines.append("return {" + ", ".join(values) + "}")
+    # Missing sections give None above; anything else malformed drops the record
+    if strict:
+        body = [f"def {name}(doc):"] + ["    " + line for line in lines]
+    else:
+        body = ([f"def {name}(doc):", "    try:"] + ["        " + line for line in lines] +
+                ["    except (ValueError, TypeError, AttributeError, KeyError):", "        return None"])
+
+    source = '\n'.join(body) + '\n'
+    exec(compile(source, f"<schema {name}>", 'exec'), namespace)
+    function = namespace[name]
+    function.source = source
+    return function
+
+
+extract_features = compile_schema(FEATURE_SCHEMA, 'extract_features')
+# Changes whenever the generated feature extractor does (see feature_cache.py)
+FEATURE_SCHEMA_VERSION = hashlib.sha1(extract_features.source.encode()).hexdigest()[:12]
+extract_features_strict = compile_schema(FEATURE_SCHEMA, 'extract_features_strict', strict=True)
+FEATURE_KEYS = schema_keys(FEATURE_SCHEMA)
+extract_model_features = compile_schema(MODEL_SCHEMA, 'extract_model_features')
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Columnar Feature Store
+Binary, column-per-file replacement for model_data/features.json. Numeric
+features are raw typed arrays that readers memory-map on demand (only the
+columns they touch are paged in); string features are stored as codes into a
+string table.
+
+Layout of model_data/features.cols/:
+  meta.json              record count, byte order and {column: type, default}
+  <column>.bin           numeric column: raw 'd' (float64), 'i' (int32) or 'b' (int8) values
+  <column>.bin           string column: 'I' (uint32) codes into <column>.strings.json
+  <column>.strings.json  string table (JSON list, first-seen order)
+
+Column files are plain native arrays, so numpy can also map them directly
+(np.memmap(path, dtype='<f8')).
+
+Usage:
+  python3 feature_store.py info model_data/features.cols
+  python3 feature_store.py export model_data/features.cols -o model_data/features.json
+  python3 feature_store.py import model_data/features.json -o model_data/features.cols
+"""
+
+import argparse
+import mmap
+import os
+import sys
+from array import array
+
+import json_codec
+from feature_schema import FEATURE_SCHEMA
+
+STORE_DIR = "./model_data/features.cols"
+META_NAME = "meta.json"
+FORMAT_VERSION = 1
+
+# Schema type -> array typecode
+TYPECODES = {'float': 'd', 'int': 'i', 'flag': 'b', 'str': 'str'}
+
+
+def schema_columns(schema=FEATURE_SCHEMA):
+    """{name: (typecode, default)} for a feature schema"""
+    columns = {}
+    for name, _, kind, default in schema:
+        if kind in TYPECODES:
+            typecode = TYPECODES[kind]
+        elif hasattr(kind, 'inline'):
+            typecode = 'b'  # contains() flags
+        else:
+            typecode = 'd'
+        columns[name] = (typecode, default)
+    return columns
+
+
+def _write_atomic(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def write_store(records, directory=STORE_DIR, schema=FEATURE_SCHEMA):
+    """Write feature records (dicts) as a columnar store; returns the record count"""
+    os.makedirs(directory, exist_ok=True)
+    columns = schema_columns(schema)
+    values = {name: array('I' if typecode == 'str' else typecode) for name, (typecode, _) in columns.items()}
+    tables = {name: {} for name, (typecode, _) in columns.items() if typecode == 'str'}
+
+    count = 0
+    for record in records:
+        for name, (typecode, default) in columns.items():
+            value = record.get(name, default)
+            if typecode == 'str':
+                table = tables[name]
+                value = '' if value is None else value
+                code = table.get(value)
+                if code is None:
+                    code = table[value] = len(table)
+                values[name].append(code)
+            else:
+                values[name].append(value or 0)
+        count += 1
+
+    for name, column in values.items():
+        _write_atomic(os.path.join(directory, f"{name}.bin"), column.tobytes())
+        if name in tables:
+            _write_atomic(os.path.join(directory, f"{name}.strings.json"),
+                          json_codec.encode(list(tables[name])))
+
+    # meta.json last: a store is only valid once its metadata is in place
+    meta = {
+        'version': FORMAT_VERSION,
+        'count': count,
+        'byteorder': sys.byteorder,
+        'columns': {name: {'type': typecode, 'default': default}
+                    for name, (typecode, default) in columns.items()},
+    }
+    _write_atomic(os.path.join(directory, META_NAME), json_codec.encode(meta, json_codec.PRETTY))
+    return count
+
+
+class FeatureStore:
+    """Read access to a columnar feature store; columns are memory-mapped lazily"""
+
+    def __init__(self, directory=STORE_DIR):
+        self.directory = directory
+        self.meta = json_codec.read(os.path.join(directory, META_NAME))
+        if self.meta['version'] != FORMAT_VERSION:
+            raise ValueError(f"{directory}: unsupported store version {self.meta['version']}")
+        if self.meta['byteorder'] != sys.byteorder:
+            raise ValueError(f"{directory} was written on a {self.meta['byteorder']}-endian machine")
+        self.count = self.meta['count']
+        self.columns = list(self.meta['columns'])
+        self._maps = {}
+        self._strings = {}
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, name):
+        return name in self.meta['columns']
+
+    def _raw(self, name):
+        """Memory-mapped typed view of a column file"""
+        if name not in self._maps:
+            typecode = self.meta['columns'][name]['type']
+            typecode = 'I' if typecode == 'str' else typecode
+            path = os.path.join(self.directory, f"{name}.bin")
+            if self.count == 0:
+                self._maps[name] = (None, memoryview(array(typecode)))
+            else:
+                with open(path, 'rb') as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[name] = (mapped, memoryview(mapped).cast(typecode))
+        return self._maps[name][1]
+
+    def column(self, name):
+        """Numeric column as a memory-mapped sequence; string columns as a list of str"""
+        if self.meta['columns'][name]['type'] == 'str':
+            table = self.strings(name)
+            return [table[code] for code in self._raw(name)]
+        return self._raw(name)
+
+    def codes(self, name):
+        """Codes of a string column (index into strings(name))"""
+        return self._raw(name)
+
+    def strings(self, name):
+        """String table of a string column"""
+        if name not in self._strings:
+            self._strings[name] = json_codec.read(os.path.join(self.directory, f"{name}.strings.json"))
+        return self._strings[name]
+
+    def numpy(self, name):
+        """Zero-copy numpy view of a numeric column (codes for string columns)"""
+        import numpy as np
+        return np.asarray(self._raw(name))
+
+    def records(self):
+        """Yield every record as a dict, as written to features.json"""
+        columns = []
+        for name, info in self.meta['columns'].items():
+            if info['type'] == 'str':
+                columns.append((name, self.column(name), None))
+            else:
+                columns.append((name, self._raw(name), info['default']))
+        for i in range(self.count):
+            # Missing values were stored as 0; give them back their schema default
+            yield {name: (values[i] if default is None or values[i] else default)
+                   for name, values, default in columns}
+
+    def to_json(self, path):
+        """Export the store as features.json (indented unless PDB_JSON_FORMAT says otherwise)"""
+        return json_codec.write(path, list(self.records()))
+
+    def close(self):
+        for mapped, view in self._maps.values():
+            view.release()
+            if mapped is not None:
+                mapped.close()
+        self._maps.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RecordColumns:
+    """FeatureStore-like column access over a list of records (features.json)"""
+
+    def __init__(self, records):
+        self._records = records
+        self.columns = list(records[0]) if records else []
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def column(self, name):
+        return [record[name] for record in self._records]
+
+    def records(self):
+        return iter(self._records)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_features(store_dir=STORE_DIR, json_path="./model_data/features.json"):
+    """Open the columnar store, falling back to features.json for older outputs"""
+    if os.path.exists(os.path.join(store_dir, META_NAME)):
+        return FeatureStore(store_dir)
+    return RecordColumns(json_codec.read(json_path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect, export or build a columnar feature store')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_info = sub.add_parser('info', help='Show columns and sizes')
+    p_info.add_argument('store', nargs='?', default=STORE_DIR)
+
+    p_export = sub.add_parser('export', help='Write the store out as features.json')
+    p_export.add_argument('store', nargs='?', default=STORE_DIR)
+    p_export.add_argument('-o', '--output', default='./model_data/features.json')
+
+    p_import = sub.add_parser('import', help='Build a store from an existing features.json')
+    p_import.add_argument('json_file')
+    p_import.add_argument('-o', '--output', default=STORE_DIR)
+
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        with FeatureStore(args.store) as store:
+            print(f"Records: {len(store)}")
+            for name, info in store.meta['columns'].items():
+                size = os.path.getsize(os.path.join(args.store, f"{name}.bin"))
+                extra = f", {len(store.strings(name))} distinct" if info['type'] == 'str' else ""
+                print(f"  {name:<26} {info['type']:<4} {size / 1e3:>9.1f} kB{extra}")
+    elif args.command == 'export':
+        with FeatureStore(args.store) as store:
+            store.to_json(args.output)
+            print(f"✓ Exported {len(store)} records to {args.output}")
+    elif args.command == 'import':
+        records = json_codec.read(args.json_file)
+        count = write_store(records, args.output)
+        print(f"✓ Stored {count} records in {args.output}/")
+
+
+if __name__ == "__main__":
+    main()
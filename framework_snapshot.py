@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Framework Snapshot
+Binary copy of the educational framework JSON files (concept map, extracted
+concepts, lesson templates, concept hierarchy) that the query scripts load
+instead of parsing the JSON on every start. It also holds 'structures', the
+extracted concepts already in their compact form (compact_records.py).
+
+Layout of educational_framework/framework.snapshot:
+  magic (8 bytes) | header length (uint32 LE) | header (JSON) | sections
+The header holds the format version, the size and mtime of each JSON file
+the snapshot was made from, and each section's offset, length and crc32.
+A section is one document pickled with its repeated strings shared, which
+makes it smaller and faster to load than the JSON; the file is mmapped so
+only the sections asked for are read.
+
+load_framework() uses a section only if the snapshot is valid and its JSON
+file is unchanged, and reads the JSON otherwise, so a stale or damaged
+snapshot never changes an answer. build_educational_model.py writes it.
+
+Environment:
+  PDB_FRAMEWORK_SNAPSHOT=0    always read the JSON files
+
+Usage:
+  python3 framework_snapshot.py build
+  python3 framework_snapshot.py info
+"""
+
+import gc
+import mmap
+import os
+import pickle
+import struct
+import zlib
+
+import json_codec
+from compact_records import StructureTable
+
+FRAMEWORK_DIR = "./educational_framework"
+SNAPSHOT_PATH = os.path.join(FRAMEWORK_DIR, "framework.snapshot")
+SNAPSHOT_VERSION = 2
+MAGIC = b'PDBFWSNP'
+_HEADER_LENGTH = struct.Struct('<I')
+
+# Snapshot sections and the JSON files they are made from
+DOCUMENTS = {
+    'concept_map': os.path.join(FRAMEWORK_DIR, "concept_map.json"),
+    'extracted_concepts': os.path.join(FRAMEWORK_DIR, "extracted_concepts.json"),
+    'lesson_templates': os.path.join(FRAMEWORK_DIR, "lesson_templates.json"),
+    'concept_hierarchy': os.path.join(FRAMEWORK_DIR, "concept_hierarchy.json"),
+    'structures': os.path.join(FRAMEWORK_DIR, "extracted_concepts.json"),
+}
+# Sections built from their JSON document rather than stored as is
+BUILDERS = {
+    'structures': StructureTable.from_records,
+}
+
+ENABLED = os.environ.get('PDB_FRAMEWORK_SNAPSHOT', '1') not in ('', '0')
+
+
+def share_strings(obj, strings):
+    """Copy of a decoded JSON document with equal strings made one object, so pickle stores each once"""
+    if type(obj) is str:
+        return strings.setdefault(obj, obj)
+    if type(obj) is list:
+        return [share_strings(item, strings) for item in obj]
+    if type(obj) is dict:
+        return {strings.setdefault(key, key): share_strings(value, strings) for key, value in obj.items()}
+    return obj
+
+
+def write_snapshot(documents, path=SNAPSHOT_PATH):
+    """Write {name: document} (already saved as their DOCUMENTS JSON files) to the snapshot"""
+    if 'extracted_concepts' in documents:
+        documents = dict(documents, structures=documents['extracted_concepts'])
+    strings = {}
+    sections = {}
+    blobs = []
+    offset = 0
+    for name, document in documents.items():
+        # Round-trip so tuples, non-string keys etc. load exactly as they would from the JSON
+        document = json_codec.decode(json_codec.encode(document))
+        if name in BUILDERS:
+            document = BUILDERS[name](document)
+        blob = pickle.dumps(share_strings(document, strings), protocol=pickle.HIGHEST_PROTOCOL)
+        sections[name] = [offset, len(blob), zlib.crc32(blob)]
+        blobs.append(blob)
+        offset += len(blob)
+    header = json_codec.encode({
+        'version': SNAPSHOT_VERSION,
+        'sources': json_codec.signature(DOCUMENTS[name] for name in documents),
+        'sections': sections,
+    })
+
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC + _HEADER_LENGTH.pack(len(header)) + header)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp, path)
+    return path
+
+
+def read_header(data):
+    """(header, start of sections) of a snapshot, or None if it isn't a valid one"""
+    start = len(MAGIC) + _HEADER_LENGTH.size
+    if data[:len(MAGIC)] != MAGIC or len(data) < start:
+        return None
+    length, = _HEADER_LENGTH.unpack_from(data, len(MAGIC))
+    end = start + length
+    try:
+        header = json_codec.decode(bytes(data[start:end]))
+        if header['version'] != SNAPSHOT_VERSION or not isinstance(header['sources'], dict):
+            return None
+        if any(end + offset + size > len(data) for offset, size, _ in header['sections'].values()):
+            return None
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+    return header, end
+
+
+def load_snapshot(names, path=SNAPSHOT_PATH):
+    """{name: document} for the requested names found fresh and intact in the snapshot"""
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return {}
+    if os.fstat(f.fileno()).st_size == 0:
+        f.close()
+        return {}
+    with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        parsed = read_header(data)
+        if parsed is None:
+            return {}
+        header, base = parsed
+        current = json_codec.signature(DOCUMENTS[name] for name in names)
+        documents = {}
+        for name in names:
+            source = json_codec.resolve(DOCUMENTS[name])
+            if name not in header['sections'] or header['sources'].get(source) != current[source]:
+                continue
+            offset, size, crc = header['sections'][name]
+            with memoryview(data)[base + offset:base + offset + size] as blob:
+                if zlib.crc32(blob) != crc:
+                    continue
+                # Unpickled objects are acyclic; collections while creating
+                # hundreds of thousands of them would only waste time
+                collecting = gc.isenabled()
+                gc.disable()
+                try:
+                    documents[name] = pickle.loads(blob)
+                except (pickle.UnpicklingError, ValueError, EOFError):
+                    continue  # e.g. written by a newer Python's pickle protocol
+                finally:
+                    if collecting:
+                        gc.enable()
+        return documents
+
+
+def load_framework(*names):
+    """The named framework documents, from the snapshot where fresh, else from their JSON files.
+
+    Raises FileNotFoundError like json_codec.read when a JSON file is needed but missing.
+    """
+    documents = load_snapshot(names) if ENABLED else {}
+    for name in names:
+        if name not in documents:
+            documents[name] = json_codec.read(DOCUMENTS[name])
+            if name in BUILDERS:
+                documents[name] = BUILDERS[name](documents[name])
+    return tuple(documents[name] for name in names)
+
+
+def main():
+    import argparse  # CLI only; the query scripts import this module at start-up
+
+    parser = argparse.ArgumentParser(description='Build or inspect the framework snapshot')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('build', help='Write the snapshot from the framework JSON files')
+    p_info = sub.add_parser('info', help='Show the sections and whether each is fresh')
+    p_info.add_argument('snapshot', nargs='?', default=SNAPSHOT_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        documents = {name: json_codec.read(path) for name, path in DOCUMENTS.items() if name not in BUILDERS}
+        print(f"✓ Wrote {write_snapshot(documents)} ({len(documents)} documents)")
+    elif args.command == 'info':
+        with open(args.snapshot, 'rb') as f:
+            parsed = read_header(f.read())
+        if parsed is None:
+            print(f"❌ {args.snapshot} is not a version {SNAPSHOT_VERSION} framework snapshot")
+            return
+        header, _ = parsed
+        fresh = load_snapshot(list(header['sections']), args.snapshot)
+        for name, (_, size, _) in header['sections'].items():
+            state = 'fresh' if name in fresh else 'stale (JSON is used)'
+            print(f"  {name:<20} {size / 1e3:>8.0f} kB  {state}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Keep-alive HTTP connection pool
+Reuses one persistent connection per host per worker thread, so a batch of
+downloads pays the TCP+TLS handshake once per worker instead of once per file
+"""
+
+import http.client
+import threading
+import urllib.parse
+
+DEFAULT_TIMEOUT = 30
+USER_AGENT = "csatstest-downloader/1.0"
+
+
+class HTTPPool:
+    """Thread-local pool of persistent HTTP(S) connections"""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all_connections = []
+
+    def _connection(self, scheme, netloc):
+        """Return this thread's open connection to scheme://netloc"""
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+
+        key = (scheme, netloc)
+        conn = connections.get(key)
+        if conn is None:
+            if scheme == 'https':
+                conn = http.client.HTTPSConnection(netloc, timeout=self.timeout)
+            else:
+                conn = http.client.HTTPConnection(netloc, timeout=self.timeout)
+            connections[key] = conn
+            with self._lock:
+                self._all_connections.append(conn)
+        return conn
+
+    def _drop(self, scheme, netloc):
+        """Close and forget this thread's connection to scheme://netloc"""
+        conn = getattr(self._local, 'connections', {}).pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def discard(self, url):
+        """Close this thread's connection to url's host, e.g. after its response failed mid-body"""
+        parts = urllib.parse.urlsplit(url)
+        self._drop(parts.scheme, parts.netloc)
+
+    def open(self, url, method='GET', headers=None, body=None):
+        """Send a request and return the live http.client response.
+
+        The caller must read the response body completely before issuing
+        another request from the same thread, or discard(url) if reading it
+        fails: the connection is then left mid-response and unusable.
+        """
+        parts = urllib.parse.urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        request_headers = {'User-Agent': USER_AGENT, 'Accept-Encoding': 'identity'}
+        request_headers.update(headers or {})
+
+        # A pooled connection may have been closed by the server while idle;
+        # retry once on a fresh connection before giving up.
+        for attempt in range(2):
+            conn = self._connection(parts.scheme, parts.netloc)
+            try:
+                conn.request(method, path, body=body, headers=request_headers)
+                return conn.getresponse()
+            except (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                    BrokenPipeError, ConnectionResetError):
+                self._drop(parts.scheme, parts.netloc)
+                if attempt == 1:
+                    raise
+            except Exception:
+                self._drop(parts.scheme, parts.netloc)
+                raise
+
+    def request(self, url, method='GET', headers=None, body=None):
+        """Send a request and return (status, lower-cased headers, body bytes)"""
+        response = self.open(url, method=method, headers=headers, body=body)
+        try:
+            data = response.read()
+        except BaseException:
+            self.discard(url)
+            raise
+        return response.status, {k.lower(): v for k, v in response.getheaders()}, data
+
+    def close(self):
+        """Close every connection opened by any thread"""
+        with self._lock:
+            for conn in self._all_connections:
+                conn.close()
+            self._all_connections = []
@@ -1,10 +1,123 @@
+#!/usr/bin/env python3
+"""
+Extract PDB identifiers from saved RCSB search results
+Streams the "result_set" array of one or more paged result files (or a
+directory of them) without loading whole documents, de-duplicates the ids and
+writes them newline-delimited for download_entries.py / download_files.py
+
+Usage:
+  python3 idextract.py                                  # results.json -> ids.txt
+  python3 idextract.py pages/ -o ids.txt --scores scores.tsv
+  python3 idextract.py page1.json page2.json --format comma   # for batch_download.sh
+"""
+
+import argparse
 import json
+from pathlib import Path
+
+CHUNK_SIZE = 1 << 16
+_decoder = json.JSONDecoder()
+
+
+def _skip_separators(buf, pos):
+    """Advance past whitespace and commas between array items"""
+    while pos < len(buf) and buf[pos] in ' \t\r\n,':
+        pos += 1
+    return pos
+
+
+def iter_results(path, chunk_size=CHUNK_SIZE):
+    """Yield (identifier, score) from a search result file, one item at a time.
+
+    Only the current chunk plus one partially read item is held in memory.
+    """
+    with open(path, 'r') as f:
+        buf = ''
+        # Find the opening bracket of the result_set array
+        while True:
+            start = buf.find('"result_set"')
+            if start >= 0:
+                bracket = buf.find('[', start)
+                if bracket >= 0:
+                    buf = buf[bracket + 1:]
+                    break
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            # Keep a tail in case the key straddles the chunk boundary
+            buf = buf[-32:] + chunk if start < 0 else buf + chunk
+
+        pos = 0
+        eof = False
+        while True:
+            pos = _skip_separators(buf, pos)
+            if pos < len(buf) and buf[pos] == ']':
+                return
+            try:
+                item, end = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf = buf[pos:] + chunk
+                pos = 0
+                continue
+            pos = end
+            if isinstance(item, dict) and 'identifier' in item:
+                yield item['identifier'], item.get('score')
+
+
+def expand_inputs(inputs):
+    """Expand directories into their sorted *.json files"""
+    for name in inputs:
+        path = Path(name)
+        if path.is_dir():
+            yield from sorted(path.glob("*.json"))
+        else:
+            yield path
+
+
+def merge_results(inputs):
+    """Yield (identifier, score) across all inputs, first occurrence wins"""
+    seen = set()
+    for path in expand_inputs(inputs):
+        for identifier, score in iter_results(path):
+            if identifier not in seen:
+                seen.add(identifier)
+                yield identifier, score
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract PDB ids from RCSB search result pages')
+    parser.add_argument('inputs', nargs='*', default=['results.json'],
+                        help='Result files or directories of them (default: results.json)')
+    parser.add_argument('-o', '--output', default='ids.txt', help='Output id file (default: ids.txt)')
+    parser.add_argument('--scores', help='Also write "id<TAB>score" lines to this file')
+    parser.add_argument('--format', choices=['newline', 'comma'], default='newline',
+                        help='Id separator; batch_download.sh needs comma (default: newline)')
+    args = parser.parse_args()
+
+    separator = '\n' if args.format == 'newline' else ','
+    count = 0
+    scores_out = open(args.scores, 'w') if args.scores else None
+    try:
+        with open(args.output, 'w') as out:
+            for identifier, score in merge_results(args.inputs):
+                if count:
+                    out.write(separator)
+                out.write(identifier)
+                if scores_out:
+                    scores_out.write(f"{identifier}\t{score}\n")
+                count += 1
+            if args.format == 'newline' and count:
+                out.write('\n')
+    finally:
+        if scores_out:
+            scores_out.close()
 
-with open("results.json") as f:
-    data = json.load(f)
+    print(f"Extracted {count} identifiers to {args.output}")
 
-ids = [item["identifier"] for item in data["result_set"]]
 
-with open("ids.txt", "w") as out:
-    out.write(",".join(ids))
-print(f"Extracted {len(ids)} identifiers to ids.txt")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
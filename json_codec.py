@@ -0,0 +1,183 @@
+"""
+JSON Codec
+The JSON reader and writer every script goes through. Uses the fastest
+installed backend (orjson) and falls back to the stdlib json module.
+Anything orjson refuses to read (NaN, integers over 64 bits, non-UTF-8
+input) or write (unsupported types, NaN and Infinity, which it would turn
+into null) goes through the stdlib instead, so both backends write the same
+values. The bytes are the same too, except for floats in exponent form,
+which orjson spells 0.00001 and 1e20 where the stdlib writes 1e-05 and
+1e+20 (benchmarks.py codec checks both on our outputs).
+
+Output formats for write():
+  pretty    indented with 2 spaces and ASCII-only (\\uXXXX escapes), the
+            long-standing layout of our files
+  compact   no whitespace, UTF-8; smaller and faster to write and read
+and compress=True writes <path>.gz instead. read() accepts any of them and
+looks for <path>.gz when <path> is missing.
+
+Environment:
+  PDB_JSON_BACKEND=json          force the stdlib backend
+  PDB_JSON_FORMAT=compact        default format of every writer
+  PDB_JSON_GZIP=1                gzip every written file by default
+
+Usage:
+  import json_codec
+  data = json_codec.read("educational_framework/concept_map.json")
+  json_codec.write("model_data/summary.json", summary)
+"""
+
+import gzip
+import json
+import math
+import os
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+PRETTY = 'pretty'
+COMPACT = 'compact'
+FORMATS = (PRETTY, COMPACT)
+GZIP_SUFFIX = '.gz'
+GZIP_LEVEL = 6
+_GZIP_MAGIC = b'\x1f\x8b'
+
+# Available decoders, fastest first
+DECODERS = {'orjson': orjson.loads} if orjson is not None else {}
+DECODERS['json'] = json.loads
+
+BACKEND = os.environ.get('PDB_JSON_BACKEND') or next(iter(DECODERS))
+if BACKEND not in DECODERS:
+    raise ValueError(f"PDB_JSON_BACKEND={BACKEND!r} is not available (have: {', '.join(DECODERS)})")
+DEFAULT_FORMAT = os.environ.get('PDB_JSON_FORMAT', PRETTY)
+DEFAULT_GZIP = os.environ.get('PDB_JSON_GZIP', '') not in ('', '0')
+
+if DEFAULT_FORMAT not in FORMATS:
+    raise ValueError(f"PDB_JSON_FORMAT must be one of {', '.join(FORMATS)}, got {DEFAULT_FORMAT!r}")
+
+_ORJSON_OPTIONS = {
+    PRETTY: (orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS) if orjson else None,
+    COMPACT: orjson.OPT_NON_STR_KEYS if orjson else None,
+}
+# Pretty files keep the stdlib's ASCII escapes; compact ones are UTF-8 as orjson writes them
+_STDLIB_OPTIONS = {
+    PRETTY: {'indent': 2},
+    COMPACT: {'separators': (',', ':'), 'ensure_ascii': False},
+}
+_NON_ASCII = re.compile('[^\x00-\x7f]')
+
+
+def decode(data):
+    """Parse a JSON document from bytes or str"""
+    if BACKEND == 'orjson':
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+def _escape(match):
+    """\\uXXXX escape of one non-ASCII character, as json.dumps writes it"""
+    code = ord(match.group())
+    if code > 0xFFFF:
+        code -= 0x10000
+        return '\\u{:04x}\\u{:04x}'.format(0xD800 | code >> 10, 0xDC00 | code & 0x3FF)
+    return '\\u{:04x}'.format(code)
+
+
+def _all_finite(obj):
+    """False if obj holds a NaN or infinite float"""
+    if isinstance(obj, float):
+        return math.isfinite(obj)
+    if isinstance(obj, dict):
+        return all(_all_finite(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return all(_all_finite(value) for value in obj)
+    return True
+
+
+def encode(obj, style=COMPACT, backend=None):
+    """Serialise obj to UTF-8 bytes in the given style (PRETTY or COMPACT)"""
+    if (backend or BACKEND) == 'orjson':
+        try:
+            data = orjson.dumps(obj, option=_ORJSON_OPTIONS[style])
+        except TypeError:
+            pass
+        else:
+            # orjson writes NaN and Infinity as null; only the stdlib keeps them
+            if b'null' not in data or _all_finite(obj):
+                if style == PRETTY and not data.isascii():
+                    data = _NON_ASCII.sub(_escape, data.decode()).encode()
+                return data
+    text = json.dumps(obj, **_STDLIB_OPTIONS[style])
+    try:
+        return text.encode()
+    except UnicodeEncodeError:
+        # Lone surrogates (from \ud800-style escapes) only survive as escapes
+        return json.dumps(obj, **dict(_STDLIB_OPTIONS[style], ensure_ascii=True)).encode()
+
+
+def dumps(obj, style=COMPACT):
+    """Serialise obj to a str (for text files and SQLite text columns)"""
+    return encode(obj, style).decode()
+
+
+def load(f):
+    """Read and parse an open file (text or binary, plain or gzip)"""
+    data = f.read()
+    if isinstance(data, bytes) and data[:2] == _GZIP_MAGIC:
+        data = gzip.decompress(data)
+    return decode(data)
+
+
+def resolve(path):
+    """The file read(path) would open: path itself, or <path>.gz if only that exists"""
+    if not os.path.exists(path) and os.path.exists(path + GZIP_SUFFIX):
+        return path + GZIP_SUFFIX
+    return path
+
+
+def signature(paths):
+    """{file: [size, mtime_ns]} of the files read(path) would open (None if missing), to detect changes"""
+    result = {}
+    for path in paths:
+        path = resolve(path)
+        try:
+            st = os.stat(path)
+            result[path] = [st.st_size, st.st_mtime_ns]
+        except FileNotFoundError:
+            result[path] = None
+    return result
+
+
+def read(path):
+    """Read a JSON file written by write(), in any format; <path>.gz is used if <path> is missing"""
+    with open(resolve(path), 'rb') as f:
+        return load(f)
+
+
+def write(path, obj, style=None, compress=None):
+    """Write obj to path atomically; with compress, to <path>.gz (and any stale <path> is removed).
+
+    Returns the path written.
+    """
+    style = style or DEFAULT_FORMAT
+    compress = DEFAULT_GZIP if compress is None else compress
+    data = encode(obj, style)
+    if compress:
+        stale, path = path, path + GZIP_SUFFIX
+        data = gzip.compress(data, GZIP_LEVEL, mtime=0)
+    else:
+        stale = path + GZIP_SUFFIX
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+    # Never leave an older copy in the other format for read() to find
+    if os.path.exists(stale):
+        os.remove(stale)
+    return path
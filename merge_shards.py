@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Merge Shards
+Combines the partial outputs of sharded runs
+  python3 extract_features.py --shard i/N
+  python3 build_educational_model.py --shard i/N
+into the artifacts a single-node run produces:
+  model_data/features.cols/, features.json, summary.json, summary_state.json
+  educational_framework/concept_hierarchy.json, concept_map.json,
+  lesson_templates.json, extracted_concepts.json, teacher_guide.md
+
+Shards partition entries by PDB id, so merging is a k-way merge of the
+shards' pdb_id-sorted records; a shard that is not sorted (or an id found in
+two shards) stops the merge with an error rather than giving an output that
+differs from a single-node run.
+
+Usage:
+  python3 merge_shards.py                  # shard count taken from the shard directories
+  python3 merge_shards.py --shards 8
+  python3 merge_shards.py --features-only
+"""
+
+import argparse
+import heapq
+import os
+import sys
+
+import build_educational_model
+import extract_features
+import json_codec
+from feature_store import FeatureStore
+from sharding import find_shards
+
+
+def sorted_by_id(records, label):
+    """Pass records through, raising ValueError unless their pdb_ids strictly increase"""
+    previous = None
+    for record in records:
+        pdb_id = record['pdb_id']
+        if previous is not None and pdb_id <= previous:
+            raise ValueError(f"{label} is not sorted by pdb_id ({pdb_id} after {previous}); "
+                             f"re-run the shard extraction")
+        previous = pdb_id
+        yield record
+
+
+def merge_sorted(parts, labels):
+    """k-way merge of pdb_id-sorted record streams, checking the order of each and of the result"""
+    merged = heapq.merge(*(sorted_by_id(part, label) for part, label in zip(parts, labels)),
+                         key=lambda record: record['pdb_id'])
+    return list(sorted_by_id(merged, "the merged shards"))
+
+
+def merge_features(count=None):
+    """Merge the shards' feature stores and check them against their partial summaries"""
+    shards = find_shards(extract_features.OUTPUT_DIR, count)
+    print(f"\n[features] Merging {len(shards)} shards from {extract_features.OUTPUT_DIR}/shards/")
+
+    stores = [FeatureStore(os.path.join(directory, "features.cols")) for directory in shards.values()]
+    partial = extract_features.FeatureSummary()
+    try:
+        for index, directory in shards.items():
+            state = json_codec.read(os.path.join(directory, extract_features.SUMMARY_STATE))
+            state = extract_features.FeatureSummary.from_state(state)
+            if state.total != len(stores[index]):
+                raise ValueError(f"shard {index}: summary covers {state.total} records "
+                                 f"but the store holds {len(stores[index])}")
+            partial.merge(state)
+
+        records = merge_sorted([store.records() for store in stores],
+                               [f"shard {index} ({directory})" for index, directory in shards.items()])
+    finally:
+        for store in stores:
+            store.close()
+
+    for index, store in enumerate(stores):
+        print(f"   shard {index}: {len(store)} records")
+    if len(records) < 10:
+        print("   ⚠️  Not enough records to build a model!")
+        return None
+
+    # Recomputed over the merged stream so summary.json matches a single-node run exactly
+    summary = extract_features.save_features(records, write_json=True)
+    if summary.total != partial.total or summary.methods != partial.methods:
+        print("   ⚠️  Merged shard summaries disagree with the merged records")
+    return len(records)
+
+
+def merge_concepts(count=None):
+    """Merge the shards' extracted concepts and build the full framework from them"""
+    output_dir = build_educational_model.OUTPUT_DIR
+    shards = find_shards(output_dir, count)
+    print(f"\n[concepts] Merging {len(shards)} shards from {output_dir}/shards/")
+
+    parts = []
+    for index, directory in shards.items():
+        part = json_codec.read(os.path.join(directory, "extracted_concepts.json"))
+        print(f"   shard {index}: {len(part)} structures")
+        parts.append(part)
+    all_concepts = merge_sorted(parts, [f"shard {index} ({directory})"
+                                        for index, directory in shards.items()])
+
+    mapper = build_educational_model.MolecularBiologyConceptMapper()
+    hierarchy = mapper.build_concept_hierarchy()
+    json_codec.write(f"{output_dir}/concept_hierarchy.json", hierarchy)
+    build_educational_model.save_framework(mapper, all_concepts, hierarchy)
+    return len(all_concepts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Merge sharded extraction outputs into the single-node artifacts')
+    parser.add_argument('--shards', type=int, metavar='N',
+                        help='Number of shards (default: taken from the shard directories)')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--features-only', action='store_true', help='Merge extract_features.py shards only')
+    group.add_argument('--concepts-only', action='store_true',
+                       help='Merge build_educational_model.py shards only')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("MERGING SHARDED OUTPUTS")
+    print("=" * 70)
+
+    try:
+        features = None if args.concepts_only else merge_features(args.shards)
+        concepts = None if args.features_only else merge_concepts(args.shards)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print("\n✓ Merge complete")
+    if features is not None:
+        print(f"   • {features} feature records -> {extract_features.OUTPUT_DIR}/")
+    if concepts is not None:
+        print(f"   • {concepts} concept records -> {build_educational_model.OUTPUT_DIR}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Streaming mmCIF Coordinate Reader
+Reads the _atom_site loop of a .cif or .cif.gz file (as fetched by
+download_files.py -c / -A) into column-oriented NumPy arrays. The file is
+decompressed in chunks and reading stops at the end of the loop; the loop body
+is tokenised with vectorised NumPy operations, so no Python object is created
+per atom or per value.
+
+Usage:
+  python3 mmcif_reader.py structures/4V6X.cif.gz
+"""
+
+import gzip
+import re
+import sys
+import time
+
+import numpy as np
+
+CHUNK_SIZE = 1 << 20
+LOOP_HEADER = re.compile(rb'(?m)^loop_[ \t]*\r?\n[ \t]*_atom_site\.')
+# A loop ends at the next comment, loop, data item or data block
+LOOP_END = re.compile(rb'\n[ \t]*(?:#|loop_|_|data_)')
+
+# Space, tab, CR and LF are the only bytes <= ' ' that occur in CIF text
+WHITESPACE_MAX = ord(' ')
+
+# Output field -> mmCIF column, tried in order
+FIELDS = {
+    'group': ('group_PDB',),
+    'element': ('type_symbol',),
+    'atom_name': ('label_atom_id', 'auth_atom_id'),
+    'residue_name': ('label_comp_id', 'auth_comp_id'),
+    'chain': ('auth_asym_id', 'label_asym_id'),
+    'residue_number': ('auth_seq_id', 'label_seq_id'),
+    'b_factor': ('B_iso_or_equiv',),
+    'occupancy': ('occupancy',),
+    'model': ('pdbx_PDB_model_num',),
+}
+FLOAT_FIELDS = {'b_factor', 'occupancy'}
+INT_FIELDS = {'residue_number', 'model'}
+
+
+class AtomSite:
+    """Column arrays for every atom in an _atom_site loop"""
+
+    def __init__(self, columns):
+        self.columns = columns  # mmCIF column name -> raw bytes ('S') array
+        self.coords = np.stack([
+            _to_float(columns['Cartn_x']),
+            _to_float(columns['Cartn_y']),
+            _to_float(columns['Cartn_z']),
+        ], axis=1) if 'Cartn_x' in columns else np.zeros((0, 3), dtype=np.float32)
+
+        for field, names in FIELDS.items():
+            raw = next((columns[name] for name in names if name in columns), None)
+            if raw is None:
+                value = None
+            elif field in FLOAT_FIELDS:
+                value = _to_float(raw)
+            elif field in INT_FIELDS:
+                value = _to_int(raw)
+            else:
+                value = raw
+            setattr(self, field, value)
+
+    def __len__(self):
+        return len(self.coords)
+
+    @property
+    def is_hetero(self):
+        return self.group == b'HETATM' if self.group is not None else None
+
+    def chain_ids(self):
+        """Distinct chain ids in file order; atoms without one ('?' / '.' or no chain column) are skipped"""
+        if self.chain is None:
+            return np.array([], dtype='S1')
+        chain = self.chain[~_missing(self.chain)]
+        _, first = np.unique(chain, return_index=True)
+        return chain[np.sort(first)]
+
+
+def _missing(raw):
+    """Mask of '?' and '.' (unknown / inapplicable) values"""
+    return (raw == b'?') | (raw == b'.')
+
+
+def _to_float(raw):
+    values = np.where(_missing(raw), b'nan', raw)
+    return values.astype(np.float32)
+
+
+def _to_int(raw):
+    values = np.where(_missing(raw), b'0', raw)
+    return values.astype(np.int32)
+
+
+def _open(path):
+    with open(path, 'rb') as f:
+        magic = f.read(2)
+    return gzip.open(path, 'rb') if magic == b'\x1f\x8b' else open(path, 'rb')
+
+
+def read_atom_site_block(path, chunk_size=CHUNK_SIZE):
+    """Return (column names, raw loop body bytes) for the _atom_site loop"""
+    with _open(path) as f:
+        buf = b''
+        # 1. Find the loop header
+        while True:
+            match = LOOP_HEADER.search(buf)
+            if match:
+                buf = buf[match.start():]
+                break
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return [], b''
+            buf = buf[-64:] + chunk
+
+        # 2. Read header lines (_atom_site.<name>) until the first data row
+        names = []
+        pos = buf.index(b'\n') + 1
+        while True:
+            end = buf.find(b'\n', pos)
+            while end < 0:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    end = len(buf)
+                    break
+                buf += chunk
+                end = buf.find(b'\n', pos)
+            line = buf[pos:end].strip()
+            if not line.startswith(b'_atom_site.'):
+                break
+            names.append(line[len(b'_atom_site.'):].split()[0].decode())
+            pos = end + 1
+
+        # 3. Collect the body up to the end of the loop, then stop reading
+        parts = []
+        body = buf[pos - 1:]  # keep the newline so LOOP_END can match the first line
+        while True:
+            match = LOOP_END.search(body)
+            if match:
+                parts.append(body[:match.start()])
+                break
+            # Hold back a short tail in case a terminator straddles chunks
+            parts.append(body[:-16])
+            chunk = f.read(chunk_size)
+            if not chunk:
+                parts.append(body[-16:])
+                break
+            body = body[-16:] + chunk
+
+    return names, b''.join(parts)
+
+
+def _gather(data, starts, ends):
+    """Copy variable-length tokens into a fixed-width 'S' array"""
+    lengths = ends - starts
+    width = max(1, int(lengths.max())) if len(lengths) else 1
+    chars = data.take(starts[:, None] + np.arange(width), mode='clip')
+    chars[np.arange(width) >= lengths[:, None]] = 0
+    return chars.view(f'S{width}').ravel()
+
+
+def _strip_quotes(data, starts, ends):
+    """Drop matching quote characters around tokens"""
+    first = data.take(starts)
+    last = data.take(ends - 1)
+    quoted = ((first == ord("'")) | (first == ord('"'))) & (first == last) & (ends - starts >= 2)
+    return starts + quoted, ends - quoted
+
+
+def _tokenize_aligned(data, ws, ncols):
+    """Fast path for column-aligned loops (as written by the wwPDB).
+
+    Every row has the same length and every column starts at the same
+    offset, so columns are plain slices of a (rows, row length) view.
+    Returns None when the loop is not aligned.
+    """
+    newlines = np.flatnonzero(data == ord('\n'))
+    if len(newlines) == 0 or newlines[-1] != data.size - 1:
+        return None
+    stride = int(newlines[0]) + 1
+    nrows = len(newlines)
+    if nrows * stride != data.size or np.any(np.diff(newlines) != stride):
+        return None
+
+    first_row = ws[:stride]
+    col_starts = np.flatnonzero(~first_row & np.concatenate(([True], first_row[:-1])))
+    if len(col_starts) != ncols:
+        return None
+    ws2d = ws.reshape(nrows, stride)
+    if np.any(ws2d[:, col_starts]) or np.any(~ws2d[:, col_starts[1:] - 1]):
+        return None
+    # No row may contain extra tokens beyond the aligned ones
+    token_starts = np.count_nonzero(~ws[1:] & ws[:-1]) + (not ws[0])
+    if token_starts != nrows * ncols:
+        return None
+
+    # Zero the padding once; 'S' arrays ignore trailing NUL bytes
+    padded = (data * (~ws).view(np.uint8)).reshape(nrows, stride)
+    quote = ((data == ord("'")) | (data == ord('"'))).reshape(nrows, stride)
+    quoted_columns = quote[:, col_starts].any(axis=0)
+    bounds = list(col_starts) + [stride - 1]
+    columns = []
+    for c in range(ncols):
+        a, b = bounds[c], bounds[c + 1]
+        if quoted_columns[c]:
+            slab_ws = ws2d[:, a:b]
+            row_offsets = np.arange(nrows) * stride + a
+            lengths = np.argmax(slab_ws, axis=1)
+            lengths[~slab_ws.any(axis=1)] = b - a
+            starts, ends = _strip_quotes(data, row_offsets, row_offsets + lengths)
+            columns.append(_gather(data, starts, ends))
+        else:
+            columns.append(np.ascontiguousarray(padded[:, a:b]).view(f'S{b - a}').ravel())
+    return columns
+
+
+def _tokenize_vectorized(block, ncols):
+    """Split a loop body into per-column raw arrays, or None if it needs the slow path"""
+    block = block.strip(b'\r\n') + b'\n'
+    data = np.frombuffer(block, dtype=np.uint8)
+    if data.size <= 1:
+        return [np.array([], dtype='S1') for _ in range(ncols)]
+
+    ws = data <= WHITESPACE_MAX
+    columns = _tokenize_aligned(data, ws, ncols)
+    if columns is not None:
+        return columns
+
+    edges = np.diff(np.concatenate(([1], ws.view(np.int8), [1])))
+    starts = np.flatnonzero(edges == -1)
+    ends = np.flatnonzero(edges == 1)
+    if len(starts) % ncols:
+        return None
+    # Every row must sit on its own line, otherwise values with spaces or
+    # multi-line rows are present and whitespace splitting is wrong
+    newlines = np.flatnonzero(data == ord('\n'))
+    row_first = np.searchsorted(newlines, starts[::ncols])
+    row_last = np.searchsorted(newlines, ends[ncols - 1::ncols])
+    if np.any(row_first != row_last) or np.any(row_first[1:] == row_last[:-1]):
+        return None
+
+    starts, ends = _strip_quotes(data, starts, ends)
+    starts = starts.reshape(-1, ncols)
+    ends = ends.reshape(-1, ncols)
+    return [_gather(data, starts[:, c], ends[:, c]) for c in range(ncols)]
+
+
+TOKEN = re.compile(rb"""'(.*?)'(?=\s|$)|"(.*?)"(?=\s|$)|(\S+)""", re.S)
+
+
+def _tokenize_slow(block, ncols):
+    """CIF-aware tokenizer for loops with quoted spaces or multi-line rows"""
+    values = [m.group(1) if m.group(1) is not None else
+              m.group(2) if m.group(2) is not None else m.group(3)
+              for m in TOKEN.finditer(block)]
+    values = values[:len(values) - len(values) % ncols]
+    table = np.array(values, dtype=bytes).reshape(-1, ncols)
+    return [np.ascontiguousarray(table[:, c]) for c in range(ncols)]
+
+
+def read_atoms(path):
+    """Read the _atom_site loop of a .cif / .cif.gz file into an AtomSite"""
+    names, block = read_atom_site_block(path)
+    if not names:
+        return AtomSite({})
+    columns = _tokenize_vectorized(block, len(names))
+    if columns is None:
+        columns = _tokenize_slow(block, len(names))
+    return AtomSite(dict(zip(names, columns)))
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 mmcif_reader.py <file.cif[.gz]> ...")
+        sys.exit(1)
+
+    for path in sys.argv[1:]:
+        start = time.perf_counter()
+        atoms = read_atoms(path)
+        elapsed = time.perf_counter() - start
+        print(f"\n🧬 {path}")
+        print(f"   Atoms: {len(atoms)} (read in {elapsed * 1000:.0f} ms)")
+        if len(atoms):
+            print(f"   Chains: {len(atoms.chain_ids()) if atoms.chain is not None else '?'}")
+            print(f"   Hetero atoms: {int(atoms.is_hetero.sum()) if atoms.group is not None else '?'}")
+            # '?' as mmCIF writes an unknown value: no B-factor column, or no value in it
+            known = atoms.b_factor is not None and not np.isnan(atoms.b_factor).all()
+            print(f"   Mean B-factor: {np.nanmean(atoms.b_factor):.2f}" if known else "   Mean B-factor: ?")
+            lo, hi = atoms.coords.min(axis=0), atoms.coords.max(axis=0)
+            print(f"   Extent (Å): {hi[0] - lo[0]:.1f} x {hi[1] - lo[1]:.1f} x {hi[2] - lo[2]:.1f}")
+
+
+if __name__ == "__main__":
+    main()
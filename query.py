@@ -4,45 +4,27 @@ Molecular Biology Educational Model Query System
 Easy command-line interface to search and explore your 1,061 protein structures
 """
 
-import json
 import sys
 import argparse
-from collections import defaultdict
+import sqlite3
+import time
+from itertools import islice
+
+from bitmap_index import BitmapIndex
+from catalog import open_catalog
 
 def load_educational_data():
-    """Load all educational framework data files"""
+    """Open the indexed catalog of the educational framework (rebuilt if the JSON files changed)"""
     try:
-        with open('educational_framework/concept_map.json', 'r') as f:
-            concept_map = json.load(f)
-        
-        with open('educational_framework/extracted_concepts.json', 'r') as f:
-            concepts_data = json.load(f)
-        
-        with open('educational_framework/lesson_templates.json', 'r') as f:
-            lesson_templates = json.load(f)
-        
-        return concept_map, concepts_data, lesson_templates
-    except FileNotFoundError as e:
+        return open_catalog()
+    except (FileNotFoundError, sqlite3.Error, ValueError) as e:
         print(f"❌ Error: Could not find educational framework files: {e}")
         print("💡 Make sure you're in the project directory and have run build_educational_model.py")
         sys.exit(1)
 
-def search_by_concept(query, concept_map, concepts_data):
+def search_by_concept(query, catalog):
     """Search for structures containing a specific concept"""
-    query_lower = query.lower()
-    
-    # Get concept frequencies from the map
-    all_concepts = concept_map.get('most_common_concepts', [])
-    matching_concepts = []
-    
-    for concept_entry in all_concepts:
-        if isinstance(concept_entry, list) and len(concept_entry) >= 2:
-            concept_name, frequency = concept_entry[0], concept_entry[1]
-        else:
-            continue
-        
-        if query_lower in concept_name.lower():
-            matching_concepts.append((concept_name, frequency))
+    matching_concepts = catalog.common_concepts(query)
     
     if not matching_concepts:
         print(f"❌ No concepts found matching '{query}'")
@@ -55,108 +37,129 @@ def search_by_concept(query, concept_map, concepts_data):
         print(f"\n📊 {concept_name}")
         print(f"   Frequency: {frequency} structures")
         
-        # Find examples from the detailed data
-        examples = []
-        for struct in concepts_data[:10]:  # Check first 10 for examples
-            if concept_name in struct.get('concepts', []):
-                examples.append(struct['pdb_id'])
-                if len(examples) >= 3:
-                    break
+        # Examples from the first 10 structures
+        examples = catalog.concept_examples(concept_name, among=10, limit=3)
         
         if examples:
             print(f"   Examples: {', '.join(examples)}")
 
-def search_by_pdb_id(pdb_id, concepts_data):
+def search_by_pdb_id(pdb_id, catalog):
     """Look up a specific PDB ID"""
     pdb_id = pdb_id.upper()
     
-    for struct in concepts_data:
-        if struct.get('pdb_id') == pdb_id:
-            print(f"\n🧬 PDB ID: {pdb_id}")
-            print("-" * 80)
-            print(f"Title: {struct.get('title', 'N/A')}")
-            print(f"Complexity: {struct.get('complexity_level', 'N/A')}")
-            print(f"Student Audience: {', '.join(struct.get('student_audience', []))}")
-            print(f"Concepts:")
-            for concept in struct.get('concepts', []):
-                print(f"  • {concept}")
-            print(f"Learning Objectives:")
-            for objective in struct.get('key_learning_objectives', []):
-                print(f"  • {objective}")
-            return
+    struct = catalog.structure(pdb_id)
+    if struct is not None:
+        print(f"\n🧬 PDB ID: {pdb_id}")
+        print("-" * 80)
+        print(f"Title: {struct.get('title', 'N/A')}")
+        print(f"Complexity: {struct.get('complexity_level', 'N/A')}")
+        print(f"Student Audience: {', '.join(struct.get('student_audience', []))}")
+        print(f"Concepts:")
+        for concept in struct.get('concepts', []):
+            print(f"  • {concept}")
+        print(f"Learning Objectives:")
+        for objective in struct.get('key_learning_objectives', []):
+            print(f"  • {objective}")
+        return
     
-    print(f"❌ PDB ID {pdb_id} not found in your dataset of {len(concepts_data)} structures")
+    print(f"❌ PDB ID {pdb_id} not found in your dataset of {len(catalog)} structures")
 
-def filter_by_method(method, concepts_data):
+def filter_by_method(method, catalog):
     """Filter structures by experimental method"""
-    method_lower = method.lower()
-    matching_structures = []
+    count, rows = catalog.with_concept_matching(method, limit=10)
     
-    for struct in concepts_data:
-        struct_concepts = struct.get('concepts', [])
-        for concept in struct_concepts:
-            if method_lower in concept.lower():
-                matching_structures.append(struct)
-                break
-    
-    if not matching_structures:
+    if not count:
         print(f"❌ No structures found using method '{method}'")
         return
     
-    print(f"\n🔬 Found {len(matching_structures)} structures using '{method}':")
+    print(f"\n🔬 Found {count} structures using '{method}':")
     print("-" * 80)
     
-    for i, struct in enumerate(matching_structures[:10]):  # Show first 10
-        print(f"{i+1}. {struct['pdb_id']}: {struct.get('title', '')[:60]}...")
-        print(f"   Complexity: {struct.get('complexity_level')}")
+    for i, (_, pdb_id, title, complexity) in enumerate(rows):  # Show first 10
+        print(f"{i+1}. {pdb_id}: {(title or '')[:60]}...")
+        print(f"   Complexity: {complexity}")
     
-    if len(matching_structures) > 10:
-        print(f"   ... and {len(matching_structures) - 10} more")
+    if count > 10:
+        print(f"   ... and {count - 10} more")
 
-def filter_by_complexity(level, concepts_data):
+def filter_by_complexity(level, catalog):
     """Filter structures by complexity level"""
-    level_lower = level.lower()
-    matching_structures = [s for s in concepts_data if level_lower in s.get('complexity_level', '').lower()]
+    count, rows = catalog.with_complexity_matching(level, limit=10)
     
-    if not matching_structures:
+    if not count:
         print(f"❌ No structures found with complexity '{level}'")
         return
     
-    print(f"\n📚 Found {len(matching_structures)} structures at '{level}' complexity:")
+    print(f"\n📚 Found {count} structures at '{level}' complexity:")
     print("-" * 80)
     
-    for i, struct in enumerate(matching_structures[:10]):  # Show first 10
-        print(f"{i+1}. {struct['pdb_id']}: {struct.get('title', '')[:60]}...")
-        concepts = struct.get('concepts', [])
-        print(f"   Key concepts: {', '.join(concepts[:3])}")
+    for i, (structure_id, pdb_id, title, _) in enumerate(rows):  # Show first 10
+        print(f"{i+1}. {pdb_id}: {(title or '')[:60]}...")
+        concepts = catalog.concepts_of(structure_id, 3)
+        print(f"   Key concepts: {', '.join(concepts)}")
     
-    if len(matching_structures) > 10:
-        print(f"   ... and {len(matching_structures) - 10} more")
+    if count > 10:
+        print(f"   ... and {count - 10} more")
 
-def show_statistics(concept_map, concepts_data):
+def boolean_search(expression, catalog, limit=10):
+    """Structures matching a boolean concept expression, e.g. "Cryo-EM AND NOT Gene Expression" """
+    index = BitmapIndex(catalog)
+    resolved = {}
+    start = time.perf_counter()
+    try:
+        matches = index.search(expression, resolved)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    count = len(matches)
+    elapsed = (time.perf_counter() - start) * 1000
+    
+    for (kind, term), names in resolved.items():
+        if names != [term]:
+            print(f"   {kind} '{term}' -> {' | '.join(names)}")
+    
+    if not count:
+        print(f"❌ No structures match '{expression}'")
+        return
+    
+    print(f"\n🧮 Found {count} structures matching '{expression}' ({elapsed:.2f} ms):")
+    print("-" * 80)
+    
+    # Only the structures shown are looked up
+    for i, (_, pdb_id, title, complexity) in enumerate(catalog.rows(islice(matches, limit))):
+        print(f"{i+1}. {pdb_id}: {(title or '')[:60]}...")
+        print(f"   Complexity: {complexity}")
+    
+    if count > limit:
+        print(f"   ... and {count - limit} more")
+
+def search_titles(text, catalog, limit=10):
+    """Structures whose titles best match free text, ranked by BM25"""
+    start = time.perf_counter()
+    results = catalog.search_titles(text, limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    
+    if not results:
+        print(f"❌ No structure titles match '{text}'")
+        return
+    
+    print(f"\n📝 Top {len(results)} titles matching '{text}' ({elapsed:.2f} ms):")
+    print("-" * 80)
+    
+    for i, (_, pdb_id, title, complexity, score) in enumerate(results):
+        print(f"{i+1}. {pdb_id}: {(title or '')[:60]}...")
+        print(f"   Score: {score:.2f}   Complexity: {complexity}")
+
+def show_statistics(catalog):
     """Show overall dataset statistics"""
     print("\n📈 DATASET STATISTICS")
     print("=" * 80)
-    print(f"Total protein structures: {len(concepts_data)}")
-    print(f"Total unique concepts: {concept_map.get('total_concepts', 'Unknown')}")
-    
-    # Count by complexity
-    complexity_counts = defaultdict(int)
-    method_counts = defaultdict(int)
+    print(f"Total protein structures: {len(catalog)}")
+    print(f"Total unique concepts: {catalog.meta.get('total_concepts', 'Unknown')}")
     
-    for struct in concepts_data:
-        complexity = struct.get('complexity_level', 'Unknown')
-        complexity_counts[complexity] += 1
-        
-        # Count experimental methods from concepts
-        concepts = struct.get('concepts', [])
-        for concept in concepts:
-            if 'x-ray' in concept.lower() or 'crystallography' in concept.lower():
-                method_counts['X-ray Crystallography'] += 1
-                break
-            elif 'cryo' in concept.lower() or 'em' in concept.lower():
-                method_counts['Cryo-EM'] += 1
-                break
+    # Counted when the catalog was built
+    complexity_counts = catalog.statistics('complexity')
+    method_counts = catalog.statistics('method')
     
     print(f"\nComplexity Levels:")
     for level, count in sorted(complexity_counts.items()):
@@ -190,6 +193,15 @@ Filter by complexity:
   python3 query.py --complexity "basic"
   python3 query.py --complexity "advanced"
 
+Search structure titles (ranked by BM25):
+  python3 query.py --text "topoisomerase"
+  python3 query.py --text "human 80S ribosome" --limit 20
+
+Boolean concept search (AND, OR, NOT, parentheses; method: and complexity: terms):
+  python3 query.py --where "Cryo-EM AND Enzyme Function AND NOT Gene Expression"
+  python3 query.py --where "(Drug Design OR Ligand Binding) AND complexity:Advanced"
+  python3 query.py --where 'method:"X-RAY DIFFRACTION" AND NOT Data Quality' --limit 50
+
 Show dataset statistics:
   python3 query.py --stats
 
@@ -212,6 +224,11 @@ def main():
     parser.add_argument('--pdb', '-p', help='Look up specific PDB ID')
     parser.add_argument('--method', '-m', help='Filter by experimental method')
     parser.add_argument('--complexity', '-x', help='Filter by complexity level')
+    parser.add_argument('--where', '-w', metavar='EXPR',
+                        help='Boolean concept search, e.g. "Cryo-EM AND NOT Gene Expression"')
+    parser.add_argument('--text', '-t', help='Free-text search of structure titles, best matches first')
+    parser.add_argument('--limit', '-n', type=int, default=10,
+                        help='Structures to list for --where and --text (default: 10)')
     parser.add_argument('--stats', '-s', action='store_true', help='Show dataset statistics')
     
     args = parser.parse_args()
@@ -223,31 +240,36 @@ def main():
     
     # Load data
     print("🔄 Loading educational framework data...")
-    concept_map, concepts_data, lesson_templates = load_educational_data()
-    
-    # Handle quick query (positional argument)
-    if args.query:
-        query = args.query
-        # Check if it looks like a PDB ID (4 characters, alphanumeric)
-        if len(query) == 4 and query.isalnum():
-            search_by_pdb_id(query, concepts_data)
-        else:
-            search_by_concept(query, concept_map, concepts_data)
-        return
+    catalog = load_educational_data()
     
-    # Handle specific flags
-    if args.concept:
-        search_by_concept(args.concept, concept_map, concepts_data)
-    elif args.pdb:
-        search_by_pdb_id(args.pdb, concepts_data)
-    elif args.method:
-        filter_by_method(args.method, concepts_data)
-    elif args.complexity:
-        filter_by_complexity(args.complexity, concepts_data)
-    elif args.stats:
-        show_statistics(concept_map, concepts_data)
-    else:
-        show_help()
+    with catalog:
+        # Handle quick query (positional argument)
+        if args.query:
+            query = args.query
+            # Check if it looks like a PDB ID (4 characters, alphanumeric)
+            if len(query) == 4 and query.isalnum():
+                search_by_pdb_id(query, catalog)
+            else:
+                search_by_concept(query, catalog)
+            return
+        
+        # Handle specific flags
+        if args.concept:
+            search_by_concept(args.concept, catalog)
+        elif args.pdb:
+            search_by_pdb_id(args.pdb, catalog)
+        elif args.method:
+            filter_by_method(args.method, catalog)
+        elif args.complexity:
+            filter_by_complexity(args.complexity, catalog)
+        elif args.where:
+            boolean_search(args.where, catalog, args.limit)
+        elif args.text:
+            search_titles(args.text, catalog, args.limit)
+        elif args.stats:
+            show_statistics(catalog)
+        else:
+            show_help()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
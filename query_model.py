@@ -4,30 +4,23 @@ Query the Educational Molecular Biology Model
 Explain interesting structures and concepts
 """
 
-import json
 from collections import defaultdict
 
+from framework_snapshot import load_framework
+
 def load_data():
     """Load all framework data"""
-    with open('educational_framework/concept_map.json', 'r') as f:
-        concept_map = json.load(f)
-    
-    with open('educational_framework/extracted_concepts.json', 'r') as f:
-        concepts_data = json.load(f)
-    
-    with open('educational_framework/concept_hierarchy.json', 'r') as f:
-        concept_hierarchy = json.load(f)
-    
-    return concept_map, concepts_data, concept_hierarchy
+    # From the binary snapshot when it is up to date, else the JSON files
+    return load_framework('concept_map', 'structures', 'concept_hierarchy')
 
 def find_common_structures(concepts_data, min_frequency=5):
     """Find the most commonly appearing molecular structures"""
     structure_types = defaultdict(list)
     
-    # Handle both list and dict formats
-    items = concepts_data if isinstance(concepts_data, list) else concepts_data.items()
+    # Handle both record sequences (list or StructureTable) and dict formats
+    items = concepts_data.items() if isinstance(concepts_data, dict) else concepts_data
     
-    if isinstance(concepts_data, list):
+    if not isinstance(concepts_data, dict):
         for data in items:
             pdb_id = data.get('pdb_id', 'unknown')
             if 'experimental_method' in data:
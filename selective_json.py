@@ -0,0 +1,115 @@
+"""
+Selective JSON Decoding
+Decodes only chosen top-level keys of a JSON object document. The rest of
+the document is skipped without building Python objects for it: a
+vectorised structural scan (numpy) finds the quotes and brackets, the
+bracket depth at each string locates the top-level keys, and only the
+wanted values are handed to the stdlib decoder.
+
+Skipped values are checked for balanced brackets but not fully validated.
+Documents the scan does not handle (escaped quotes, not an object, numpy
+not installed) fall back to a full decode, so decoded values always match
+one.
+
+The scan only pays off on large documents, and later the faster the full
+decoder is (see benchmarks.py decode); decode_document() uses it from
+SELECTIVE_MIN_BYTES[json_codec.BACKEND] up and a full decode below.
+
+Usage:
+  document = decode_keys(raw_bytes, {'exptl', 'struct'})
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import json_codec
+
+# Document size from which the scan beats a full decode, per json_codec backend
+SELECTIVE_MIN_BYTES = {'json': 24 * 1024, 'orjson': 512 * 1024}
+
+_QUOTE = ord('"')
+_COLON = ord(':')
+_OPEN = ord('{')        # '[' | 32 == '{'
+_CLOSE = ord('}')       # ']' | 32 == '}'
+_WHITESPACE = b' \t\n\r'
+
+
+def _top_level_members(data):
+    """[(key bytes, value start, value end)] of a top-level object, or None if the scan can't tell"""
+    if b'\\' in data and b'\\"' in data:
+        return None  # escaped quotes would break the quote pairing below
+    stripped = data.strip(_WHITESPACE)
+    if stripped[:1] != b'{' or stripped[-1:] != b'}':
+        return None
+
+    chars = np.frombuffer(data, dtype=np.uint8)
+    folded = chars | 32
+    structural = np.flatnonzero((chars == _QUOTE) | (folded == _OPEN) | (folded == _CLOSE))
+    kinds = folded[structural]
+    is_quote = kinds == _QUOTE
+    quotes_seen = np.cumsum(is_quote, dtype=np.int32)
+    if quotes_seen[-1] % 2:
+        return None
+    # Brackets after an odd number of quotes are inside strings and don't count
+    in_string = (quotes_seen & 1).astype(bool)
+    step = (kinds == _OPEN).view(np.int8) - (kinds == _CLOSE).view(np.int8)
+    step[in_string] = 0
+    depth = np.cumsum(step, dtype=np.int32)
+    if depth[-1] != 0 or depth.min() < 0:
+        return None
+
+    # Opening quotes of strings directly inside the root object: keys and string values
+    quotes = structural[is_quote]
+    top = quotes_seen[is_quote & in_string & (depth == 1)] - 1
+    starts = quotes[top]
+    ends = quotes[top + 1]
+
+    members = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        colon = end + 1
+        while data[colon] in _WHITESPACE:
+            colon += 1
+        if data[colon] != _COLON:
+            continue  # a string value, not a key
+        if members:
+            members[-1][2] = start
+        members.append([data[start + 1:end], colon + 1, None])
+    if members:
+        members[-1][2] = int(structural[-1])
+    return members
+
+
+def decode_keys(data, keys):
+    """Decode the top-level object in data (bytes or str), keeping only `keys`.
+
+    Non-object documents are returned whole, as a full decode would.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    members = _top_level_members(data) if np is not None else None
+    if members is None:
+        document = json_codec.decode(data)
+        if type(document) is dict:
+            return {key: value for key, value in document.items() if key in keys}
+        return document
+
+    result = {}
+    for raw_key, start, end in members:
+        key = raw_key.decode('utf-8')
+        if '\\' in key:
+            key = json_codec.decode(b'"' + raw_key + b'"')
+        if key in keys:
+            # Slices end at the separator before the next key
+            result[key] = json_codec.decode(data[start:end].rstrip(_WHITESPACE + b','))
+    return result
+
+
+def decode_document(data, keys, min_bytes=None):
+    """Full decode for small documents, decode_keys(data, keys) for large ones"""
+    if min_bytes is None:
+        min_bytes = SELECTIVE_MIN_BYTES[json_codec.BACKEND]
+    if len(data) >= min_bytes:
+        return decode_keys(data, keys)
+    return json_codec.decode(data)
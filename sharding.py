@@ -0,0 +1,77 @@
+"""
+Sharding
+Splits the entries between N independent extraction runs by a stable hash
+of the PDB id (crc32, so every machine and Python process agrees), and
+locates the partial outputs each shard writes:
+
+  model_data/shards/<i>-of-<N>/            features.cols/, summary.json, summary_state.json
+  educational_framework/shards/<i>-of-<N>/ extracted_concepts.json
+
+merge_shards.py combines them into the single-node artifacts.
+"""
+
+import argparse
+import os
+import re
+import zlib
+
+SHARDS_DIR = "shards"
+_SHARD_NAME = re.compile(r'^(\d+)-of-(\d+)$')
+
+
+def parse_shard(text):
+    """argparse type for --shard i/N (0 <= i < N)"""
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {text!r}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index must be in 0..N-1, got {text!r}")
+    return index, count
+
+
+def shard_of(pdb_id, count):
+    """Shard number of a PDB id, independent of id case and of the process"""
+    return zlib.crc32(pdb_id.upper().encode()) % count
+
+
+def shard_filter(shard):
+    """select(pdb_id) predicate for one (index, count) shard, or None for all entries"""
+    if shard is None:
+        return None
+    index, count = shard
+    return lambda pdb_id: shard_of(pdb_id, count) == index
+
+
+def shard_dir(output_dir, shard):
+    """Directory holding one shard's partial outputs"""
+    index, count = shard
+    return os.path.join(output_dir, SHARDS_DIR, f"{index}-of-{count}")
+
+
+def find_shards(output_dir, count=None):
+    """{index: directory} of the shards written under output_dir.
+
+    With count=None the shard count is taken from the directories found; it
+    must be unambiguous. Raises ValueError if any shard of the set is missing.
+    """
+    root = os.path.join(output_dir, SHARDS_DIR)
+    found = {}
+    if os.path.isdir(root):
+        for name in os.listdir(root):
+            match = _SHARD_NAME.match(name)
+            if match:
+                index, n = int(match.group(1)), int(match.group(2))
+                found.setdefault(n, {})[index] = os.path.join(root, name)
+    if count is None:
+        if not found:
+            raise ValueError(f"no shards found in {root}")
+        if len(found) > 1:
+            raise ValueError(f"{root} holds shards of several runs ({', '.join(f'N={n}' for n in sorted(found))}); "
+                             f"pass --shards")
+        count = next(iter(found))
+    shards = found.get(count, {})
+    missing = [i for i in range(count) if i not in shards]
+    if missing:
+        raise ValueError(f"missing shards {', '.join(f'{i}/{count}' for i in missing)} in {root}")
+    return dict(sorted(shards.items()))
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Download-to-Features Streaming Pipeline
+Feeds every downloaded entry straight into extract_features.extract_features
+and the educational concept extractor without writing pdb_data/*.json first.
+Downloading, parsing/extraction (in a process pool) and collecting the
+results run concurrently, connected by bounded queues so a slow stage
+applies backpressure instead of buffering the downloaded documents.
+
+Once the last entry is through, the results are written with the batch
+scripts' own writers, so the outputs are those of extract_features.py and
+build_educational_model.py:
+  model_data/features.cols/, summary.json
+  educational_framework/*.json, catalog.sqlite, framework.snapshot, teacher_guide.md
+Streamed entries are merged into the existing outputs by PDB id, replacing
+their old records, so a refresh of some ids updates them in place; with
+--replace the outputs hold the streamed entries only.
+
+Usage:
+  python3 stream_pipeline.py -f ids.txt
+  python3 stream_pipeline.py -f ids.txt --replace
+  python3 stream_pipeline.py -f ids.txt --tee pdb_data          # also keep raw JSON
+  python3 stream_pipeline.py -f ids.txt --tee pdb_data.pack --bulk
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import build_educational_model
+import extract_features
+import json_codec
+from download_entries import (BASE_URL, DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY, DEFAULT_RATE,
+                              GRAPHQL_URL, EntryDownloader, iter_ids, write_atomic)
+from entry_pack import EntryPack
+from feature_store import load_features
+
+DEFAULT_QUEUE_SIZE = 64
+
+_mapper = None
+
+
+def process_entry(pdb_id, body):
+    """Parse one entry body and run both extractors (runs in a worker process).
+
+    Returns (features, concepts), concepts None for an entry without any,
+    or None if the body does not parse.
+    """
+    global _mapper
+    if _mapper is None:
+        _mapper = build_educational_model.MolecularBiologyConceptMapper()
+
+    try:
+        json_data = json_codec.decode(body)
+    except ValueError:
+        return None
+    features = extract_features.extract_features(json_data)
+    concepts = _mapper.extract_biology_concepts(json_data, pdb_id)
+    if not concepts['concepts']:
+        concepts = None
+    return features, concepts
+
+
+def existing_features():
+    """{pdb_id: record} of the current feature outputs (empty if there are none)"""
+    try:
+        with load_features(extract_features.STORE_DIR, f"{extract_features.OUTPUT_DIR}/features.json") as store:
+            return {record['pdb_id']: record for record in store.records()}
+    except FileNotFoundError:
+        return {}
+
+
+def existing_concepts():
+    """{pdb_id: record} of the current extracted_concepts.json (empty if there is none)"""
+    try:
+        records = json_codec.read(f"{build_educational_model.OUTPUT_DIR}/extracted_concepts.json")
+    except FileNotFoundError:
+        return {}
+    return {record['pdb_id']: record for record in records}
+
+
+class StreamPipeline:
+    """Bounded-queue pipeline: downloader -> extractors -> collector"""
+
+    def __init__(self, tee=None, workers=None, queue_size=DEFAULT_QUEUE_SIZE):
+        self.tee = tee
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.stats = {'entries': 0, 'features': 0, 'concepts': 0, 'failed': 0}
+        # Latest result per PDB id, so an id streamed twice is stored once
+        self.features = {}   # pdb_id -> feature record
+        self.concepts = {}   # pdb_id -> concept record, or None for an entry without concepts
+
+    async def on_entry(self, pdb_id, body):
+        """Downloader callback; blocks when the extractors fall behind"""
+        await self.raw_queue.put((pdb_id, body))
+
+    async def _download(self, downloader, ids):
+        await downloader.run(ids)
+        for _ in range(self.workers):
+            await self.raw_queue.put(None)
+
+    async def _extractor(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self.raw_queue.get()
+            if item is None:
+                await self.out_queue.put(None)
+                return
+            pdb_id, body = item
+            result = await loop.run_in_executor(self.process_pool, process_entry, pdb_id, body)
+            await self.out_queue.put((pdb_id, body, result))
+
+    def _open_tee(self):
+        if not self.tee:
+            return None
+        if self.tee.endswith('.pack'):
+            return EntryPack(self.tee, mode='a')
+        os.makedirs(self.tee, exist_ok=True)
+        return None
+
+    async def _collector(self):
+        pack = self._open_tee()
+        finished = 0
+        try:
+            while True:
+                item = await self.out_queue.get()
+                if item is None:
+                    # One None from each extractor once the downloads are through
+                    finished += 1
+                    if finished == self.workers:
+                        return
+                    continue
+                pdb_id, body, result = item
+                self.stats['entries'] += 1
+
+                if pack is not None:
+                    pack.append(pdb_id, body)
+                elif self.tee:
+                    write_atomic(os.path.join(self.tee, f"{pdb_id}.json"), body)
+
+                if result is None:
+                    self.stats['failed'] += 1
+                else:
+                    features, concepts = result
+                    if features is not None:
+                        self.features[pdb_id] = features
+                    self.concepts[pdb_id] = concepts
+                if self.stats['entries'] % 100 == 0:
+                    print(f"  Extracted {self.stats['entries']} entries")
+        finally:
+            if pack is not None:
+                pack.close()
+
+    def save(self, replace=False, write_json=False):
+        """Write the collected records through the batch scripts' writers"""
+        features = {} if replace else existing_features()
+        features.update(self.features)
+        concepts = {} if replace else existing_concepts()
+        for pdb_id, record in self.concepts.items():
+            if record is None:
+                concepts.pop(pdb_id, None)
+            else:
+                concepts[pdb_id] = record
+        self.stats['features'] = len(features)
+        self.stats['concepts'] = len(concepts)
+
+        print()
+        extract_features.save_features([features[pdb_id] for pdb_id in sorted(features)],
+                                       write_json=write_json)
+
+        mapper = build_educational_model.MolecularBiologyConceptMapper()
+        hierarchy = mapper.build_concept_hierarchy()
+        json_codec.write(f"{build_educational_model.OUTPUT_DIR}/concept_hierarchy.json", hierarchy)
+        build_educational_model.save_framework(mapper, [concepts[pdb_id] for pdb_id in sorted(concepts)],
+                                               hierarchy)
+
+    async def run(self, downloader, ids):
+        """Download ids with downloader and stream them through extraction"""
+        self.raw_queue = asyncio.Queue(maxsize=self.queue_size)
+        self.out_queue = asyncio.Queue(maxsize=self.queue_size)
+        downloader.on_entry = self.on_entry
+        downloader.write_files = False
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            self.process_pool = pool
+            tasks = [asyncio.create_task(self._download(downloader, ids))]
+            tasks += [asyncio.create_task(self._extractor()) for _ in range(self.workers)]
+            tasks.append(asyncio.create_task(self._collector()))
+            try:
+                # Fails as soon as any stage does, instead of leaving the others
+                # blocked on a full queue forever
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                # Let the cancelled stages unwind (the collector closes the tee pack)
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+        return self.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Stream downloaded PDB entries straight into feature and concept extraction'
+    )
+    parser.add_argument('-f', '--file', required=True,
+                        help="File containing a comma- or newline-separated list of PDB ids ('-' for stdin)")
+    parser.add_argument('--replace', action='store_true',
+                        help='Write only the streamed entries instead of merging them into the existing outputs')
+    parser.add_argument('--json', action='store_true',
+                        help='Also write the indented model_data/features.json')
+    parser.add_argument('--tee', help='Also archive raw entries to this directory or .pack file')
+    parser.add_argument('--workers', type=int, help='Extraction processes (default: CPU count)')
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help=f'Entries buffered between stages (default: {DEFAULT_QUEUE_SIZE})')
+    parser.add_argument('--base-url', default=BASE_URL, help=f'Entry endpoint (default: {BASE_URL})')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f'Maximum requests in flight (default: {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                        help=f'Maximum requests per second, 0 for unlimited (default: {DEFAULT_RATE})')
+    parser.add_argument('--bulk', action='store_true',
+                        help='Fetch many entries per request through the GraphQL endpoint')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Entries per bulk request (default: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--graphql-url', default=GRAPHQL_URL,
+                        help=f'GraphQL endpoint for bulk mode (default: {GRAPHQL_URL})')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("STREAMING DOWNLOAD -> FEATURE EXTRACTION")
+    print("=" * 70)
+
+    downloader = EntryDownloader(
+        base_url=args.base_url, concurrency=args.concurrency, rate=args.rate,
+        batch_size=args.batch_size if args.bulk else None, graphql_url=args.graphql_url,
+    )
+    pipeline = StreamPipeline(tee=args.tee, workers=args.workers, queue_size=args.queue_size)
+
+    start = time.perf_counter()
+    stats = asyncio.run(pipeline.run(downloader, iter_ids(args.file)))
+    elapsed = time.perf_counter() - start
+    pipeline.save(replace=args.replace, write_json=args.json)
+
+    print(f"\n✓ Streamed {stats['entries']} entries in {elapsed:.1f}s")
+    print(f"   • {stats['features']} feature records -> {extract_features.OUTPUT_DIR}/")
+    print(f"   • {stats['concepts']} concept records -> {build_educational_model.OUTPUT_DIR}/")
+    if stats['failed']:
+        print(f"   ⚠️  {stats['failed']} entries could not be parsed")
+    if downloader.failed_ids:
+        print(f"   ✗ {len(downloader.failed_ids)} downloads failed")
+    if args.tee:
+        print(f"   • Raw entries archived to {args.tee}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Streaming Statistics
+Constant-memory, mergeable accumulators for summary.json: Welford
+mean/variance with min/max and exact counts, and a log-bucketed quantile
+sketch (relative error ALPHA) for the median and percentiles. Partial
+summaries (e.g. from shards) combine with merge() and round-trip through
+to_state()/from_state() as plain JSON.
+"""
+
+import math
+from collections import Counter
+
+ALPHA = 0.01          # relative accuracy of sketch quantiles
+MAX_BUCKETS = 2048    # buckets kept per sign; the lowest ones are collapsed beyond this
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+class RunningStats:
+    """Count, mean, variance (Welford), min and max of a stream of numbers"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        if self.min is None or x < self.min:
+            self.min = x
+        if self.max is None or x > self.max:
+            self.max = x
+
+    def merge(self, other):
+        """Fold another RunningStats into this one (Chan et al. parallel update)"""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        """Sample variance (None for fewer than two values)"""
+        return self.m2 / (self.count - 1) if self.count > 1 else None
+
+    @property
+    def stdev(self):
+        variance = self.variance
+        return math.sqrt(variance) if variance is not None else None
+
+    def to_state(self):
+        return [self.count, self.mean, self.m2, self.min, self.max]
+
+    @classmethod
+    def from_state(cls, state):
+        stats = cls()
+        stats.count, stats.mean, stats.m2, stats.min, stats.max = state
+        return stats
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with relative accuracy alpha (DDSketch-style log buckets)"""
+
+    def __init__(self, alpha=ALPHA, max_buckets=MAX_BUCKETS):
+        self.alpha = alpha
+        self.max_buckets = max_buckets
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = Counter()
+        self.negative = Counter()
+        self.zero = 0
+        self.count = 0
+
+    def _index(self, x):
+        return math.ceil(math.log(x) / self._log_gamma)
+
+    def _value(self, index):
+        # Midpoint of bucket (gamma^(i-1), gamma^i], within alpha of every value in it
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def _collapse(self, buckets):
+        """Merge the lowest buckets so at most max_buckets remain"""
+        if len(buckets) <= self.max_buckets:
+            return
+        indices = sorted(buckets)
+        excess = indices[:len(indices) - self.max_buckets + 1]
+        buckets[excess[-1]] += sum(buckets.pop(i) for i in excess[:-1])
+
+    def add(self, x):
+        self.count += 1
+        if x > 0:
+            self.positive[self._index(x)] += 1
+            if len(self.positive) > self.max_buckets:
+                self._collapse(self.positive)
+        elif x < 0:
+            self.negative[self._index(-x)] += 1
+            if len(self.negative) > self.max_buckets:
+                self._collapse(self.negative)
+        else:
+            self.zero += 1
+
+    def merge(self, other):
+        if other.alpha != self.alpha:
+            raise ValueError("cannot merge sketches with different accuracy")
+        self.positive.update(other.positive)
+        self.negative.update(other.negative)
+        self.zero += other.zero
+        self.count += other.count
+        self._collapse(self.positive)
+        self._collapse(self.negative)
+        return self
+
+    def quantile(self, q):
+        """Approximate q-quantile (0 <= q <= 1), None when empty"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.negative, reverse=True):
+            seen += self.negative[index]
+            if seen > rank:
+                return -self._value(index)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.positive):
+            seen += self.positive[index]
+            if seen > rank:
+                return self._value(index)
+        return self._value(max(self.positive))
+
+    def to_state(self):
+        return {
+            'alpha': self.alpha,
+            'zero': self.zero,
+            'positive': {str(i): c for i, c in self.positive.items()},
+            'negative': {str(i): c for i, c in self.negative.items()},
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(alpha=state['alpha'])
+        sketch.zero = state['zero']
+        sketch.positive = Counter({int(i): c for i, c in state['positive'].items()})
+        sketch.negative = Counter({int(i): c for i, c in state['negative'].items()})
+        sketch.count = sketch.zero + sum(sketch.positive.values()) + sum(sketch.negative.values())
+        return sketch
+
+
+class Metric:
+    """RunningStats plus a QuantileSketch for one feature"""
+
+    def __init__(self):
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch()
+
+    def add(self, x):
+        self.stats.add(x)
+        self.sketch.add(x)
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def summary(self):
+        """min/max/mean/stdev/median and percentiles, as written to summary.json"""
+        stats = self.stats
+        result = {
+            'valid_entries': stats.count,
+            'min': stats.min,
+            'max': stats.max,
+            'mean': stats.mean if stats.count else None,
+            'stdev': stats.stdev,
+            'median': self.quantile(0.5),
+        }
+        for p in PERCENTILES:
+            result[f'p{p}'] = self.quantile(p / 100)
+        return result
+
+    def quantile(self, q):
+        """Sketch quantile clamped to the exact min/max"""
+        value = self.sketch.quantile(q)
+        if value is None:
+            return None
+        return min(max(value, self.stats.min), self.stats.max)
+
+    def to_state(self):
+        return {'stats': self.stats.to_state(), 'sketch': self.sketch.to_state()}
+
+    @classmethod
+    def from_state(cls, state):
+        metric = cls()
+        metric.stats = RunningStats.from_state(state['stats'])
+        metric.sketch = QuantileSketch.from_state(state['sketch'])
+        return metric
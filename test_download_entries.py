@@ -0,0 +1,246 @@
+"""
+Tests for download_entries.py against a local http.server stub of the RCSB
+entry endpoint
+
+  python3 -m unittest test_download_entries
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import download_entries
+import verify_downloads
+from download_entries import EntryDownloader
+from download_manifest import DownloadManifest
+
+
+def entry_body(pdb_id):
+    return json.dumps({'rcsb_id': pdb_id, 'struct': {'title': 'x' * 2000}}).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """GET /entry/<ID> serves entry_body(ID) with an ETag, honouring If-None-Match.
+
+    server.truncate[ID] is the number of upcoming responses for ID that send
+    only part of the body and then close the connection. POST /graphql
+    answers an entries query with {rcsb_id, struct.title} for every id not
+    in server.missing.
+    """
+
+    protocol_version = 'HTTP/1.1'  # keep-alive, so the client pool reuses connections
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        pdb_id = self.path.rsplit('/', 1)[-1]
+        body = entry_body(pdb_id)
+        etag = f'"{pdb_id}-v1"'
+        with self.server.lock:
+            self.server.requests.append((pdb_id, self.headers.get('If-None-Match')))
+            truncate = self.server.truncate.get(pdb_id, 0)
+            if truncate:
+                self.server.truncate[pdb_id] = truncate - 1
+
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        if truncate:
+            self.wfile.write(body[:50])
+            self.close_connection = True
+        else:
+            self.wfile.write(body)
+
+    def do_POST(self):
+        query = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        ids = query['variables']['ids']
+        with self.server.lock:
+            self.server.requests.append(('graphql', tuple(ids)))
+        entries = [{'rcsb_id': pdb_id.upper(), 'struct': {'title': 'bulk'}, 'exptl': None}
+                   for pdb_id in ids if pdb_id not in self.server.missing]
+        body = json.dumps({'data': {'entries': entries}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubServer:
+    def __init__(self, handler):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.lock = threading.Lock()
+        self.httpd.requests = []
+        self.httpd.truncate = {}
+        self.httpd.missing = set()
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self.httpd
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class DownloaderTestCase(unittest.TestCase):
+    handler = StubHandler
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.outdir)
+        self.server = StubServer(self.handler)
+        self.httpd = self.server.__enter__()
+        self.addCleanup(self.server.__exit__)
+        patcher = mock.patch.object(download_entries, 'BACKOFF_BASE', 0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def download(self, ids, **options):
+        options.setdefault('rate', 0)
+        downloader = EntryDownloader(outdir=self.outdir, base_url=self.server.url + '/entry',
+                                     graphql_url=self.server.url + '/graphql', **options)
+        # A hang (e.g. a deadlocked queue) fails the test instead of blocking the suite
+        asyncio.run(asyncio.wait_for(downloader.run(ids), timeout=20))
+        return downloader
+
+    def manifest(self):
+        manifest = DownloadManifest(os.path.join(self.outdir, download_entries.MANIFEST_NAME))
+        self.addCleanup(manifest.close)
+        return manifest
+
+
+class TestEntryDownloader(DownloaderTestCase):
+
+    def test_truncated_body_is_retried(self):
+        ids = [f"{n}ABC" for n in range(1, 9)]
+        self.httpd.truncate.update({pdb_id: 1 for pdb_id in ids})
+        downloader = self.download(ids, concurrency=2)
+
+        self.assertEqual(downloader.failed_ids, [])
+        self.assertEqual(downloader.stats['downloaded'], 8)
+        self.assertGreaterEqual(downloader.stats['retries'], 8)
+        for pdb_id in ids:
+            with open(os.path.join(self.outdir, f"{pdb_id}.json"), 'rb') as f:
+                self.assertEqual(f.read(), entry_body(pdb_id))
+
+    def test_persistent_truncation_fails_without_hanging(self):
+        ids = [f"{n}ABC" for n in range(1, 9)]
+        self.httpd.truncate.update({pdb_id: 10 for pdb_id in ids})
+        downloader = self.download(ids, concurrency=2, retries=1)
+
+        self.assertEqual(sorted(downloader.failed_ids), ids)
+        self.assertFalse(any(name.endswith('.json') for name in os.listdir(self.outdir)))
+
+    def test_entry_error_does_not_stop_the_run(self):
+        async def on_entry(pdb_id, body):
+            raise ValueError(f"cannot use {pdb_id}")
+
+        ids = [f"{n}ABC" for n in range(1, 9)]
+        downloader = self.download(ids, concurrency=2, on_entry=on_entry)
+        self.assertEqual(sorted(downloader.failed_ids), ids)
+
+    def test_not_modified_revalidation(self):
+        ids = ['1ABC', '2ABC']
+        self.download(ids, manifest=self.manifest())
+        path = os.path.join(self.outdir, '1ABC.json')
+        mtime = os.stat(path).st_mtime_ns
+
+        del self.httpd.requests[:]
+        downloader = self.download(ids, manifest=self.manifest(), max_age=0)
+        self.assertEqual(downloader.stats['not_modified'], 2)
+        self.assertEqual(downloader.stats['downloaded'], 0)
+        self.assertEqual(sorted(self.httpd.requests), [('1ABC', '"1ABC-v1"'), ('2ABC', '"2ABC-v1"')])
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+
+        del self.httpd.requests[:]
+        downloader = self.download(ids, manifest=self.manifest(), max_age=3600)
+        self.assertEqual(downloader.stats['skipped'], 2)
+        self.assertEqual(self.httpd.requests, [])
+
+    def test_written_files_follow_umask(self):
+        self.download(['1ABC'])
+        mode = stat.S_IMODE(os.stat(os.path.join(self.outdir, '1ABC.json')).st_mode)
+        self.assertEqual(mode, download_entries.FILE_MODE)
+
+
+class TestBulkDownload(DownloaderTestCase):
+
+    def test_bulk_documents_are_partial(self):
+        ids = [f"{n}ABC" for n in range(1, 6)]
+        downloader = self.download(ids, manifest=self.manifest(), batch_size=2, max_age=3600)
+        self.assertEqual(downloader.stats['downloaded'], 5)
+        self.assertEqual(len([r for r in self.httpd.requests if r[0] == 'graphql']), 3)
+        with open(os.path.join(self.outdir, '1ABC.json'), 'rb') as f:
+            self.assertEqual(json.loads(f.read()), {'rcsb_id': '1ABC', 'struct': {'title': 'bulk'}})
+        self.assertEqual(self.manifest().counts(), {'partial': 5})
+
+        # Another bulk run finds them current
+        del self.httpd.requests[:]
+        downloader = self.download(ids, manifest=self.manifest(), batch_size=2, max_age=3600)
+        self.assertEqual(downloader.stats['skipped'], 5)
+        self.assertEqual(self.httpd.requests, [])
+
+        # A full run replaces them with the REST documents
+        downloader = self.download(ids, manifest=self.manifest(), max_age=3600)
+        self.assertEqual(downloader.stats['skipped'], 0)
+        self.assertEqual(downloader.stats['downloaded'], 5)
+        with open(os.path.join(self.outdir, '1ABC.json'), 'rb') as f:
+            self.assertEqual(f.read(), entry_body('1ABC'))
+        self.assertEqual(self.manifest().counts(), {'done': 5})
+
+        # and bulk mode keeps the full documents
+        downloader = self.download(ids, manifest=self.manifest(), batch_size=2, max_age=3600)
+        self.assertEqual(downloader.stats['skipped'], 5)
+
+    def test_entries_missing_from_bulk_response_fail(self):
+        ids = ['1ABC', '2ABC', '3ABC']
+        self.httpd.missing.add('2ABC')
+        downloader = self.download(ids, manifest=self.manifest(), batch_size=10)
+        self.assertEqual(downloader.failed_ids, ['2ABC'])
+        self.assertFalse(os.path.exists(os.path.join(self.outdir, '2ABC.json')))
+
+        downloader = self.download(ids, manifest=self.manifest(), max_age=3600)
+        self.assertEqual(downloader.stats['downloaded'], 3)
+        self.assertEqual(downloader.failed_ids, [])
+
+
+class TestVerifyRedownload(DownloaderTestCase):
+
+    def test_redownload_marks_manifest_done(self):
+        ids = ['1ABC', '2ABC']
+        self.download(ids, manifest=self.manifest())
+        with open(os.path.join(self.outdir, '1ABC.json'), 'wb') as f:
+            f.write(b'{"rcsb_id": "1A')
+
+        bad, _ = verify_downloads.verify([self.outdir], workers=1)
+        self.assertEqual([item[1] for item in bad['entry']], ['1ABC'])
+        self.assertEqual(self.manifest().get('1ABC')['status'], 'failed')
+
+        verify_downloads.redownload(bad, base_url=self.server.url + '/entry')
+        self.assertEqual(self.manifest().counts(), {'done': 2})
+        bad, _ = verify_downloads.verify([self.outdir], workers=1)
+        self.assertEqual(bad, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
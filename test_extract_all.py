@@ -0,0 +1,68 @@
+"""
+Tests that extract_all.py writes the same feature artifacts as extract_features.py
+
+  python3 -m unittest test_extract_all
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import extract_features
+from entry_pack import EntryPack
+from extract_all import FeatureConsumer, SharedScan
+
+SAMPLE_SIZE = 40
+
+
+def read_tree(directory):
+    """{relative path: bytes} of every file under directory"""
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                files[os.path.relpath(path, directory)] = f.read()
+    return files
+
+
+class TestFeatureParity(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        names = sorted(name for name in os.listdir(extract_features.JSON_DIR) if name.endswith('.json'))
+        if len(names) < SAMPLE_SIZE:
+            self.skipTest(f"needs {SAMPLE_SIZE} entries in {extract_features.JSON_DIR}")
+
+        # Pack the entries in reverse id order, so a scan that keeps source order differs
+        self.source = os.path.join(self.tmp, 'sample.pack')
+        with EntryPack(self.source, mode='a') as pack:
+            for name in reversed(names[:SAMPLE_SIZE]):
+                with open(os.path.join(extract_features.JSON_DIR, name), 'rb') as f:
+                    pack.append(name[:-len('.json')], f.read())
+
+    def test_single_pass_matches_extract_features(self):
+        batch_dir = os.path.join(self.tmp, 'batch')
+        single_dir = os.path.join(self.tmp, 'single')
+        os.makedirs(batch_dir)
+        os.makedirs(single_dir)
+
+        with redirect_stdout(StringIO()):
+            records = extract_features.load_json_files(self.source)
+            extract_features.save_features(records, output_dir=batch_dir)
+
+            scan = SharedScan(self.source)
+            scan.register(FeatureConsumer(output_dir=single_dir))
+            scan.run()
+
+        batch = read_tree(batch_dir)
+        self.assertIn('summary.json', batch)
+        self.assertEqual(read_tree(single_dir), batch)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+Tests for stream_pipeline.py with a stand-in downloader
+
+  python3 -m unittest test_stream_pipeline
+"""
+
+import asyncio
+import unittest
+from unittest import mock
+
+import stream_pipeline
+from stream_pipeline import StreamPipeline
+
+
+def broken_extraction(pdb_id, body):
+    """Stands in for process_entry in the worker processes"""
+    raise RuntimeError(f"extraction crashed on {pdb_id}")
+
+
+class ListDownloader:
+    """Hands a fixed body for each id to on_entry, as EntryDownloader.run does"""
+
+    def __init__(self, body):
+        self.body = body
+        self.on_entry = None
+        self.write_files = True
+        self.failed_ids = []
+
+    async def run(self, ids):
+        for pdb_id in ids:
+            await self.on_entry(pdb_id, self.body)
+
+
+class TestStreamPipeline(unittest.TestCase):
+
+    def run_pipeline(self, body, count=50):
+        pipeline = StreamPipeline(workers=1, queue_size=2)
+        ids = [f"{n}ABC" for n in range(count)]
+        # Stages blocked on a full queue would show up as a timeout (or a stuck run) here
+        return asyncio.run(asyncio.wait_for(pipeline.run(ListDownloader(body), ids), timeout=20))
+
+    def test_extractor_failure_stops_the_pipeline(self):
+        with mock.patch.object(stream_pipeline, 'process_entry', broken_extraction):
+            with self.assertRaises(RuntimeError):
+                self.run_pipeline(b'{}')
+
+    def test_unparsable_entries_are_counted(self):
+        stats = self.run_pipeline(b'{"rcsb_id": ', count=10)
+        self.assertEqual(stats['entries'], 10)
+        self.assertEqual(stats['failed'], 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Title Text Index
+BM25 search over structure titles. Titles are tokenised into lowercase
+words (minus a few stopwords) and indexed term -> (structure ids, weights),
+where each weight is that structure's full BM25 contribution for the term,
+length normalisation included. A query then only adds up the postings of
+its words (numpy bincount, or a dict without numpy) and keeps the top k;
+nothing per structure has to be loaded.
+
+The postings live in the catalog (catalog.py, table title_terms) as
+little-endian uint32 id and float32 weight arrays.
+"""
+
+import heapq
+import math
+import re
+import sys
+from array import array
+
+# BM25 parameters (the usual defaults)
+K1 = 1.2
+B = 0.75
+
+STOPWORDS = frozenset("""
+a an and as at by for from in into of on or the to with
+""".split())
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    """Index terms of a title or query: lowercase words, stopwords dropped"""
+    return [word for word in _WORD.findall((text or '').lower()) if word not in STOPWORDS]
+
+
+def build_postings(titles):
+    """{term: (ids array('I'), weights array('f'))} for titles listed by structure id"""
+    tokenized = [tokenize(title) for title in titles]
+    count = len(tokenized)
+    average = sum(map(len, tokenized)) / count if count else 0
+    frequencies = {}
+    for structure_id, words in enumerate(tokenized):
+        counts = {}
+        for word in words:
+            counts[word] = counts.get(word, 0) + 1
+        norm = K1 * (1 - B + B * len(words) / average) if average else K1
+        for word, tf in counts.items():
+            frequencies.setdefault(word, []).append((structure_id, tf * (K1 + 1) / (tf + norm)))
+
+    postings = {}
+    for word, entries in frequencies.items():
+        idf = math.log(1 + (count - len(entries) + 0.5) / (len(entries) + 0.5))
+        postings[word] = (array('I', (structure_id for structure_id, _ in entries)),
+                          array('f', (idf * weight for _, weight in entries)))
+    return postings
+
+
+def to_blob(values):
+    """Little-endian bytes of an array('I') or array('f')"""
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def from_blob(typecode, blob):
+    values = array(typecode)
+    values.frombytes(blob)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def top_k(postings, size, k):
+    """[(structure id, score)] of the k best-scoring structures over the given postings"""
+    if not postings:
+        return []
+    try:
+        import numpy as np  # here rather than at the top: it takes longer to import than a query
+    except ImportError:
+        np = None
+    if np is not None:
+        ids = np.concatenate([np.frombuffer(ids, dtype='<u4') for ids, _ in postings])
+        weights = np.concatenate([np.frombuffer(weights, dtype='<f4') for _, weights in postings])
+        scores = np.bincount(ids, weights, minlength=size)
+        matched = min(k, int(np.count_nonzero(scores)))
+        if not matched:
+            return []
+        best = np.argpartition(-scores, matched - 1)[:matched]
+        best = best[np.lexsort((best, -scores[best]))]
+        return [(int(structure_id), float(scores[structure_id])) for structure_id in best]
+
+    scores = {}
+    for ids, weights in postings:
+        for structure_id, weight in zip(from_blob('I', ids), from_blob('f', weights)):
+            scores[structure_id] = scores.get(structure_id, 0.0) + weight
+    return heapq.nsmallest(k, scores.items(), key=lambda item: (-item[1], item[0]))
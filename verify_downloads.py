@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Download Integrity Verifier
+Checks every downloaded file in parallel: gzip CRC and length trailers for
+.gz structure files, well-formed JSON for entry documents, and size/sha256
+against the download manifest when one is present. Bad files are re-queued:
+their manifest rows are marked failed, their ids are written to a re-queue
+list, and --redownload fetches just those again.
+
+Usage:
+  python3 verify_downloads.py pdb_data
+  python3 verify_downloads.py pdb_data structures --workers 8 --redownload
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import os
+import re
+import sys
+import time
+import zlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import json_codec
+from download_manifest import COMPLETE, MANIFEST_NAME, DownloadManifest
+
+REQUEUE_FILE = "requeue_ids.txt"
+BLOCK_SIZE = 1 << 20
+CHUNKSIZE = 64
+
+
+def _format_patterns():
+    """Regexes mapping structure file names back to (id, format)"""
+    from download_files import FORMATS
+    patterns = []
+    for fmt, (_, pattern, _) in FORMATS.items():
+        regex = '^' + re.escape(pattern).replace(re.escape('{id}'), r'(?P<id>[0-9A-Za-z]+)') + '$'
+        patterns.append((fmt, re.compile(regex)))
+    # Longest patterns first so "X-sf.cif.gz" is not read as a plain cif
+    patterns.sort(key=lambda item: -len(item[1].pattern))
+    return patterns
+
+
+def classify(name, patterns):
+    """Return (pdb_id, format) for a downloaded file name; format 'entry' for <ID>.json"""
+    if name.endswith('.json'):
+        return name[:-5], 'entry'
+    for fmt, regex in patterns:
+        match = regex.match(name)
+        if match:
+            return match.group('id'), fmt
+    return None, None
+
+
+def check_file(path, expected=None):
+    """Verify one file; returns (path, problem) with problem None when the file is good"""
+    try:
+        if path.endswith('.gz'):
+            # Reading to EOF makes gzip validate the CRC32 and ISIZE trailer
+            with gzip.open(path, 'rb') as f:
+                while f.read(BLOCK_SIZE):
+                    pass
+            return path, None
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        if expected is not None:
+            size, sha256 = expected
+            if size is not None and len(data) != size:
+                return path, f"size {len(data)} != recorded {size}"
+            if sha256 and hashlib.sha256(data).hexdigest() != sha256:
+                return path, "checksum mismatch"
+        json_codec.decode(data)
+        return path, None
+    except (OSError, EOFError, zlib.error, gzip.BadGzipFile) as e:
+        return path, f"corrupt gzip: {e}"
+    except ValueError as e:
+        return path, f"invalid JSON: {e}"
+
+
+def _check_job(job):
+    return check_file(*job)
+
+
+def collect_files(directories):
+    """Yield candidate files and leftover temp files from each directory"""
+    for directory in directories:
+        for path in sorted(Path(directory).iterdir()):
+            if path.is_file():
+                yield directory, path
+
+
+def verify(directories, workers=None):
+    """Check all files; returns (bad, partial) where bad maps format -> [(dir, id, path, problem)]"""
+    patterns = _format_patterns()
+    manifests = {}
+    jobs = []
+    meta = {}
+    partial = []
+
+    for directory, path in collect_files(directories):
+        name = path.name
+        if name.endswith('.part'):
+            partial.append(str(path))
+            continue
+        pdb_id, fmt = classify(name, patterns)
+        if fmt is None:
+            continue
+
+        expected = None
+        if fmt == 'entry':
+            if directory not in manifests:
+                manifest_path = os.path.join(directory, MANIFEST_NAME)
+                manifests[directory] = DownloadManifest(manifest_path) if os.path.exists(manifest_path) else None
+            manifest = manifests[directory]
+            row = manifest.get(pdb_id) if manifest else None
+            if row and row['status'] in COMPLETE:
+                expected = (row['size'], row['sha256'])
+
+        jobs.append((str(path), expected))
+        meta[str(path)] = (directory, pdb_id, fmt)
+
+    print(f"Verifying {len(jobs)} files with {workers or os.cpu_count()} workers...")
+    bad = defaultdict(list)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for i, (path, problem) in enumerate(pool.map(_check_job, jobs, chunksize=CHUNKSIZE)):
+            if i % 1000 == 0 and i > 0:
+                print(f"  Checked {i}/{len(jobs)}")
+            if problem:
+                directory, pdb_id, fmt = meta[path]
+                bad[fmt].append((directory, pdb_id, path, problem))
+
+    # Re-queue bad entry documents in their manifest so the next run refetches them
+    for directory, pdb_id, path, problem in bad.get('entry', []):
+        manifest = manifests.get(directory)
+        if manifest is not None:
+            manifest.invalidate(pdb_id, f"verify: {problem}")
+    for manifest in manifests.values():
+        if manifest is not None:
+            manifest.close()
+
+    return bad, partial
+
+
+def redownload(bad, base_url=None):
+    """Fetch only the bad files again"""
+    from download_entries import EntryDownloader
+    from download_files import FileDownloader
+
+    entries = defaultdict(list)
+    for directory, pdb_id, _, _ in bad.get('entry', []):
+        entries[directory].append(pdb_id)
+    for directory, ids in entries.items():
+        options = {'base_url': base_url} if base_url else {}
+        # The manifest rows verify() marked failed go back to done as each entry is fetched
+        manifest = DownloadManifest(os.path.join(directory, MANIFEST_NAME))
+        try:
+            downloader = EntryDownloader(outdir=directory, manifest=manifest, **options)
+            asyncio.run(downloader.run(ids))
+        finally:
+            manifest.close()
+        print(f"  Re-downloaded {downloader.stats['downloaded']}/{len(ids)} entries into {directory}")
+
+    files = defaultdict(list)
+    for fmt, items in bad.items():
+        if fmt == 'entry':
+            continue
+        for directory, pdb_id, _, _ in items:
+            files[directory].append((pdb_id, fmt))
+    for directory, jobs in files.items():
+        downloader = FileDownloader(outdir=directory)
+        stats = asyncio.run(downloader.run(jobs))
+        print(f"  Re-downloaded {sum(s.files for s in stats.values())}/{len(jobs)} files into {directory}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verify downloaded PDB files and re-queue bad ones')
+    parser.add_argument('directories', nargs='+', help='Download directories to check')
+    parser.add_argument('--workers', type=int, help='Verification processes (default: CPU count)')
+    parser.add_argument('--requeue', default=REQUEUE_FILE,
+                        help=f'Write ids of bad files here (default: {REQUEUE_FILE})')
+    parser.add_argument('--redownload', action='store_true', help='Fetch the bad files again')
+    parser.add_argument('--base-url', help='Entry endpoint used by --redownload')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    bad, partial = verify(args.directories, workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    total_bad = sum(len(items) for items in bad.values())
+    print(f"\n✓ Verification finished in {elapsed:.1f}s")
+    if partial:
+        print(f"⚠️  {len(partial)} leftover partial downloads (.part files):")
+        for path in partial[:10]:
+            print(f"   {path}")
+    if not total_bad:
+        print("✓ All files are intact")
+        return
+
+    print(f"✗ {total_bad} bad files:")
+    for fmt, items in sorted(bad.items()):
+        print(f"  {fmt}: {len(items)}")
+        for _, _, path, problem in items[:5]:
+            print(f"    {path}: {problem}")
+
+    ids = sorted({pdb_id for items in bad.values() for _, pdb_id, _, _ in items})
+    with open(args.requeue, 'w') as f:
+        f.write('\n'.join(ids) + '\n')
+    print(f"Re-queued {len(ids)} ids in {args.requeue}")
+
+    if args.redownload:
+        print("\nRe-downloading bad files...")
+        redownload(bad, base_url=args.base_url)
+    else:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()